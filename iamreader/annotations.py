@@ -3,6 +3,7 @@ from collections import defaultdict
 from pathlib import Path
 from typing import List, Dict, Optional, Generator, Tuple
 
+from .profiling import PROFILER
 from .utils import LOG
 
 RE_FILE_NAME = re.compile('^((?:(?:\d|xx)_?)+).?\s+([^\n]+)$')
@@ -75,7 +76,9 @@ class Annotations:
 
     def __init__(self, *, index_fpath: Path):
         self.fpath = index_fpath
-        nodes = self.parse()
+
+        with PROFILER.stage('parse', file=index_fpath.name):
+            nodes = self.parse()
         self.nodes = nodes
         self.by_filename: Dict[str, AnnotationNode] = {
             node.filename: node
@@ -1 +1,5 @@
 from .annotator import annotate
+from .labels import LabelIndex
+from .splitter import split
+from .trimmer import trim, TrimParams
+from .loudness import loudness, LoudnessParams
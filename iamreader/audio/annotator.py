@@ -1,13 +1,21 @@
-import logging
 from datetime import datetime
 from pathlib import Path
 from typing import List
 
+from .covers import CoverCache
+from .id3 import write_tag, build_frames
 from ..annotations import Annotations
-from ..utils import LOG, list_files, PATH_FILE_INDEX
+from ..probe import ProbeIndex, MediaInfo
+from ..profiling import PROFILER
+from ..progress import Progress
+from ..project import Project
+from ..utils import LOG, list_files
 
-logger = logging.getLogger('eyed3')
-logger.setLevel(logging.ERROR)
+MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+}
 
 
 def annotate_single(
@@ -19,29 +27,22 @@ def annotate_single(
     idx: int = 0,
     cover: Path = None,
 ):
-    from eyed3 import load as load_audio
-    from eyed3.id3 import ID3_V2_3, Tag, frames
+    with PROFILER.stage('tag', file=filepath.name):
 
-    audio = load_audio(filepath)
+        picture = None
 
-    tag: Tag = audio.tag
-    if tag is None:
-        tag = audio.initTag()
+        if cover and cover.exists():
+            picture = (cover.read_bytes(), MIME_TYPES.get(cover.suffix.lower(), 'image/jpeg'))
 
-    tag.artist = artist
-    tag.album = album
-    tag.title = title
-
-    if idx:
-        tag.track_num = idx
-
-    tag.genre = 'Audiobook'
-    tag.release_date = datetime.now().year
-
-    if cover.exists():
-        tag.images.set(frames.ImageFrame.FRONT_COVER, cover.read_bytes(), f'image/{cover.suffix}')
-
-    tag.save(version=ID3_V2_3)
+        write_tag(filepath, build_frames(
+            artist=artist,
+            album=album,
+            title=title,
+            genre='Audiobook',
+            year=datetime.now().year,
+            track=idx,
+            picture=picture,
+        ))
 
 
 def annotate_media(
@@ -49,16 +50,47 @@ def annotate_media(
     audio_files: List[Path],
     annotations: Annotations,
     cover: Path,
+    probe: ProbeIndex = None,
+    chapter_covers: Path = None,
+    cover_cache: CoverCache = None,
 ):
+    """Annotates audio files using text index.
+
+    :param audio_files:
+    :param annotations:
+    :param cover: Cover image to embed into every file.
+    :param probe: Media facts index.
+    :param chapter_covers: Directory with per chapter cover images (<filename>.png).
+        If set, such images are embedded instead of the common cover.
+    :param cover_cache: Cache used to prepare chapter cover images for embedding.
+
+    """
+
+    progress = Progress('annotate', total=len(audio_files))
+    duration_total = 0
 
     for idx, (filename, filepath, candidate_annotation) in enumerate(annotations.iter_for_files(audio_files), 1):
 
         if not candidate_annotation:
             LOG.warning(f'No annotation for "{filename}". Skipped.')
+            progress.skip_item()
             continue
 
         title = candidate_annotation.title
-        LOG.info(f'Annotating "{filename}" -> {title} ...')
+        duration = ''
+
+        if probe:
+            info = probe.get(filepath)
+            duration_total += info.duration
+            duration = f' [{info}]'
+
+        LOG.info(f'Annotating "{filename}"{duration} -> {title} ...')
+        progress.start_item(filename)
+
+        cover_file = cover
+
+        if chapter_covers and (cover_chapter := chapter_covers / f'{filename}.png').exists():
+            cover_file = cover_cache.get(cover_chapter)
 
         annotate_single(
             filepath=filepath,
@@ -66,20 +98,38 @@ def annotate_media(
             album=candidate_annotation.get_title_first(),
             title=title,
             idx=idx,
-            cover=cover,
+            cover=cover_file,
         )
+        progress.finish_item()
+
+    if duration_total:
+        LOG.info(f'Total duration: {MediaInfo(duration=duration_total)}')
 
 
 def annotate(
     *,
-    path_resources: Path,
-    path_audio_in: Path,
+    project: Project,
+    chapter_covers: bool = False,
 ):
-    LOG.debug(f'{path_resources=}')
-    LOG.debug(f'{path_audio_in=}')
-
-    annotate_media(
-        audio_files=list_files(path_audio_in, ext='mp3'),
-        annotations=Annotations(index_fpath=PATH_FILE_INDEX),
-        cover=path_resources / 'cover.jpg',
-    )
+    """Annotates project audio files.
+
+    :param project:
+    :param chapter_covers: Embed per chapter covers made by 'video generate'.
+
+    """
+    LOG.debug(f'{project=}')
+
+    probe = ProbeIndex(project.path_file_probe)
+
+    try:
+        annotate_media(
+            audio_files=list_files(project.path_out_audio, ext='mp3'),
+            annotations=Annotations(index_fpath=project.path_file_index),
+            cover=project.path_resources / 'cover.jpg',
+            probe=probe,
+            chapter_covers=project.path_out_images if chapter_covers else None,
+            cover_cache=CoverCache(project.path_cache_covers),
+        )
+
+    finally:
+        probe.save()
@@ -0,0 +1,65 @@
+import threading
+from hashlib import sha1
+from os import makedirs
+from pathlib import Path
+from typing import Dict
+
+from ..utils import LOG
+
+
+class CoverCache:
+    """Content-addressed cache of cover images downscaled and encoded into JPEG
+    for embedding into audio files.
+
+    Every distinct source image is encoded just once.
+
+    """
+    def __init__(self, path: Path, *, size: int = 500, quality: int = 85):
+        """
+        :param path: Cache directory.
+        :param size: Max width and height of an encoded image.
+        :param quality: JPEG quality.
+
+        """
+        self.path = path
+        self.size = size
+        self.quality = quality
+        self._known: Dict[str, Path] = {}
+        self._lock = threading.Lock()
+
+    def get(self, source: Path) -> Path:
+        """Returns a path to an encoded cover for the given source image.
+
+        :param source:
+
+        """
+        data = source.read_bytes()
+        digest = sha1(data + f'|{self.size}|{self.quality}'.encode()).hexdigest()
+
+        if cached := self._known.get(digest):
+            return cached
+
+        fpath = self.path / f'{digest}.jpg'
+
+        if not fpath.exists():
+            self._encode(source, fpath)
+
+        with self._lock:
+            self._known[digest] = fpath
+
+        return fpath
+
+    def _encode(self, source: Path, fpath: Path):
+        from PIL import Image
+
+        LOG.debug(f'Encoding cover {source} -> {fpath} ...')
+
+        makedirs(self.path, exist_ok=True)
+        fpath_tmp = fpath.with_name(f'.{fpath.name}.{threading.get_ident()}')
+
+        with Image.open(f'{source}') as img:
+            img = img.convert('RGB')
+            img.thumbnail((self.size, self.size))
+            img.save(f'{fpath_tmp}', format='JPEG', quality=self.quality, optimize=True)
+
+        fpath_tmp.replace(fpath)
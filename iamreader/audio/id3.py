@@ -0,0 +1,305 @@
+from mmap import mmap
+from pathlib import Path
+from shutil import copyfileobj
+from typing import List, Tuple, Dict, Optional
+
+from ..utils import LOG
+
+PADDING = 4096
+"""Bytes reserved after tag frames on a file rewrite, to allow further in place updates."""
+
+PICTURE_FRONT_COVER = 3
+
+CODECS = {0: 'latin-1', 1: 'utf-16', 2: 'utf-16-be', 3: 'utf-8'}
+"""Text encodings by their ID3v2 codes. UTF-16BE (2) and UTF-8 (3) are only available in ID3v2.4."""
+
+FRAMES_ENCODED = {'COMM', 'USLT', 'WXXX', 'APIC', 'GEOB', 'USER', 'SYLT', 'OWNE', 'COMR'}
+"""Frames having text encoding byte first, besides text (T*) ones."""
+
+TypeFrame = Tuple[str, bytes]
+
+
+def syncsafe_decode(data: bytes) -> int:
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def syncsafe_encode(value: int) -> bytes:
+    return bytes(((value >> 21) & 0x7F, (value >> 14) & 0x7F, (value >> 7) & 0x7F, value & 0x7F))
+
+
+def encode_texts(*texts: str) -> bytes:
+    """Encodes null separated strings prefixed with ID3v2.3 text encoding byte.
+    Latin-1 is used if possible, UTF-16 otherwise.
+
+    :param texts:
+
+    """
+    try:
+        return b'\x00' + b'\x00'.join(text.encode('latin-1') for text in texts)
+
+    except UnicodeEncodeError:
+        return b'\x01' + b'\x00\x00'.join(text.encode('utf-16') for text in texts)
+
+
+def split_encoded(data: bytes, *, encoding: int) -> Tuple[bytes, bytes]:
+    """Splits encoded text data at the first null terminator.
+
+    :param data:
+    :param encoding: ID3v2 text encoding code (see CODECS).
+
+    """
+    if encoding in (1, 2):
+        # two bytes wide terminator at a character boundary
+        for idx in range(0, len(data) - 1, 2):
+            if data[idx:idx + 2] == b'\x00\x00':
+                return data[:idx], data[idx + 2:]
+
+        return data, b''
+
+    head, _, tail = data.partition(b'\x00')
+    return head, tail
+
+
+def text_frame(frame_id: str, text: str) -> TypeFrame:
+    """Builds ID3v2.3 text frame. Latin-1 is used if possible, UTF-16 otherwise.
+
+    :param frame_id: E.g. TIT2
+    :param text:
+
+    """
+    return frame_id, encode_texts(text)
+
+
+def comment_frame(text: str, *, description: str = '', language: str = 'eng') -> TypeFrame:
+    """Builds ID3v2.3 comment (COMM) frame.
+
+    :param text:
+    :param description: Short content description.
+    :param language: ISO-639-2 language code.
+
+    """
+    encoded = encode_texts(description, text)
+    return 'COMM', encoded[:1] + language.encode('latin-1') + encoded[1:]
+
+
+def picture_frame(image: bytes, *, mime: str, picture_type: int = PICTURE_FRONT_COVER) -> TypeFrame:
+    """Builds ID3v2.3 attached picture (APIC) frame with no description.
+
+    :param image: Image bytes.
+    :param mime: E.g. image/jpeg
+    :param picture_type:
+
+    """
+    return 'APIC', b'\x00' + mime.encode('latin-1') + b'\x00' + bytes((picture_type,)) + b'\x00' + image
+
+
+def get_picture_type(data: bytes) -> int:
+    """Returns picture type from APIC frame data."""
+    mime_end = data.find(b'\x00', 1)
+    return data[mime_end + 1] if mime_end != -1 and mime_end + 1 < len(data) else -1
+
+
+def transcode_frame(frame_id: str, data: bytes) -> Optional[bytes]:
+    """Converts ID3v2.4 frame data with UTF-16BE or UTF-8 text into ID3v2.3 one.
+    Returns None if the frame layout is not known, so it can't be converted.
+
+    :param frame_id:
+    :param data:
+
+    """
+    encoding = data[0]
+    codec = CODECS[encoding]
+
+    def decode(chunk: bytes) -> str:
+        return chunk.decode(codec, errors='replace')
+
+    if frame_id in ('TXXX', 'COMM', 'USLT'):
+        # [language,] description, text
+        prefix_len = 1 if frame_id == 'TXXX' else 4
+        description, text = split_encoded(data[prefix_len:], encoding=encoding)
+        encoded = encode_texts(decode(description), decode(text).rstrip('\x00'))
+        return encoded[:1] + data[1:prefix_len] + encoded[1:]
+
+    if frame_id[:1] == 'T':
+        # ID3v2.4 values are null separated
+        return encode_texts(decode(data[1:]).rstrip('\x00').replace('\x00', '/'))
+
+    return None
+
+
+def read_tag(fpath: Path) -> Tuple[int, List[TypeFrame]]:
+    """Reads ID3v2 tag from a file start.
+    Returns a tuple: tag size on disk (header, frames and padding; 0 if no tag), frames.
+
+    Frames are only returned if they can be written in ID3v2.3:
+    ID3v2.4 text is converted into ID3v2.3 encodings (or the frame is dropped),
+    frames altered by format flags (e.g. compressed) are dropped.
+
+    :param fpath:
+
+    """
+    with open(fpath, 'rb') as f:
+        header = f.read(10)
+
+        if len(header) < 10 or header[:3] != b'ID3':
+            return 0, []
+
+        version, flags = header[3], header[5]
+        size = syncsafe_decode(header[6:10])
+        size_total = 10 + size + (10 if flags & 0x10 else 0)
+
+        if version not in (3, 4) or flags & 0xC0:
+            # ID3v2.2, unsynchronisation and extended headers are not supported: frames are dropped
+            LOG.debug(f'ID3v2.{version} tag (flags {flags}) frames in {fpath} are not preserved')
+            return size_total, []
+
+        body = f.read(size)
+
+    frames = []
+    offset = 0
+
+    while offset + 10 <= len(body):
+        frame_id = body[offset:offset + 4]
+
+        if not frame_id.strip(b'\x00') or not frame_id.isalnum():
+            # padding
+            break
+
+        size_raw = body[offset + 4:offset + 8]
+        frame_size = syncsafe_decode(size_raw) if version == 4 else int.from_bytes(size_raw, 'big')
+        format_flags = body[offset + 9]
+        data = body[offset + 10:offset + 10 + frame_size]
+        offset += 10 + frame_size
+        frame_id = frame_id.decode()
+
+        if format_flags:
+            # e.g. compressed, encrypted or unsynchronised data
+            LOG.debug(f'{frame_id} frame (format flags {format_flags}) in {fpath} is not preserved')
+            continue
+
+        if (
+            version == 4 and data[:1] in (b'\x02', b'\x03') and
+            (frame_id[:1] == 'T' or frame_id in FRAMES_ENCODED)
+        ):
+            # UTF-16BE and UTF-8 are not available in ID3v2.3
+            if (data := transcode_frame(frame_id, data)) is None:
+                LOG.debug(f'{frame_id} frame in {fpath} is not preserved')
+                continue
+
+        frames.append((frame_id, data))
+
+    return size_total, frames
+
+
+def render_frames(frames: List[TypeFrame]) -> bytes:
+    return b''.join(
+        frame_id.encode() + len(data).to_bytes(4, 'big') + b'\x00\x00' + data
+        for frame_id, data in frames
+    )
+
+
+def render_tag(body: bytes, *, size: int) -> bytes:
+    """Renders ID3v2.3 tag with the given frames data padded with zeros.
+
+    :param body: Frames data.
+    :param size: Total tag size (including header and padding).
+
+    """
+    return b'ID3\x03\x00\x00' + syncsafe_encode(size - 10) + body + b'\x00' * (size - 10 - len(body))
+
+
+def write_tag(fpath: Path, frames: List[TypeFrame], *, replace_pictures: Optional[List[int]] = None):
+    """Writes ID3v2.3 tag frames into the file, preserving existing frames of other types.
+    The file is not written at all if the frames are already there.
+
+    The tag is updated in place (memory-mapped) if it fits into the existing tag space
+    (including padding), otherwise the file is rewritten streaming
+    the audio data into a new file with some padding reserved for future updates.
+
+    :param fpath:
+    :param frames: Frames to set. Existing frames with the same IDs are replaced.
+    :param replace_pictures: Picture types to replace. Other existing pictures are kept.
+
+    """
+    size_existing, frames_existing = read_tag(fpath)
+
+    replaced = {frame_id for frame_id, _ in frames}
+    replace_pictures = set(replace_pictures or [PICTURE_FRONT_COVER])
+
+    def is_kept(frame: TypeFrame) -> bool:
+        frame_id, data = frame
+
+        if frame_id == 'APIC':
+            return get_picture_type(data) not in replace_pictures
+
+        return frame_id not in replaced
+
+    body = render_frames([frame for frame in frames_existing if is_kept(frame)] + frames)
+
+    if size_existing and body == render_frames(frames_existing):
+        # not touched, so that modification time (and caches keyed by it, see ProbeIndex) is kept
+        LOG.debug(f'Tag is up to date: {fpath}')
+        return
+
+    if size_existing and 10 + len(body) <= size_existing:
+        LOG.debug(f'Updating tag in place: {fpath}')
+
+        with open(fpath, 'r+b') as f, mmap(f.fileno(), size_existing) as mapped:
+            mapped[:size_existing] = render_tag(body, size=size_existing)
+            mapped.flush()
+
+        return
+
+    LOG.debug(f'Rewriting file to fit the tag: {fpath}')
+
+    fpath_tmp = fpath.with_name(f'.{fpath.name}.tag')
+
+    try:
+        with open(fpath, 'rb') as f_src, open(fpath_tmp, 'wb') as f_dst:
+            f_dst.write(render_tag(body, size=10 + len(body) + PADDING))
+            f_src.seek(size_existing)
+            copyfileobj(f_src, f_dst, 1024 * 1024)
+
+        fpath_tmp.replace(fpath)
+
+    finally:
+        fpath_tmp.unlink(missing_ok=True)
+
+
+def build_frames(
+    *,
+    artist: str,
+    album: str,
+    title: str,
+    genre: str = '',
+    year: int = 0,
+    track: int = 0,
+    picture: Optional[Tuple[bytes, str]] = None,
+) -> List[TypeFrame]:
+    """Builds common ID3v2.3 frames.
+
+    :param artist:
+    :param album:
+    :param title:
+    :param genre:
+    :param year:
+    :param track:
+    :param picture: Front cover (image bytes, mime type).
+
+    """
+    values: Dict[str, str] = {
+        'TPE1': artist,
+        'TALB': album,
+        'TIT2': title,
+        'TCON': genre,
+        'TYER': f'{year or ""}',
+        'TRCK': f'{track or ""}',
+    }
+
+    frames = [text_frame(frame_id, value) for frame_id, value in values.items() if value]
+
+    if picture:
+        image, mime = picture
+        frames.append(picture_frame(image, mime=mime))
+
+    return frames
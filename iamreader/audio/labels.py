@@ -0,0 +1,195 @@
+from bisect import bisect_right
+from json import loads
+from pathlib import Path
+from typing import Optional, List, Iterable, Generator, Tuple
+
+from ..annotations import Annotations, AnnotationNode
+from ..rc.actions import ActionBase, ChapterAction, CheckpointAction, FootnoteAction
+from ..utils import LOG
+
+
+class Label:
+    """Audacity label."""
+
+    def __init__(self, *, start: float, end: float, text: str = ''):
+        self.start = start
+        self.end = end
+        self.text = text
+        self.action: Optional[ActionBase] = None
+
+        if text.startswith('{'):
+            try:
+                self.action = ActionBase.deserialize(loads(text))
+
+            except ValueError:
+                LOG.debug(f'Label at {start} is not an action: {text}')
+
+    def __str__(self):
+        return f'{self.start}\t{self.end}\t{self.text}'
+
+
+class Region:
+    """Time region of a recording. End is None for a region lasting till the end of a recording."""
+
+    def __init__(self, *, start: float, end: Optional[float] = None):
+        self.start = start
+        self.end = end
+
+    def __str__(self):
+        return f'{self.start}-{"" if self.end is None else self.end}'
+
+    @property
+    def duration(self) -> Optional[float]:
+        end = self.end
+        return None if end is None else end - self.start
+
+    def contains(self, position: float) -> bool:
+        end = self.end
+        return self.start <= position and (end is None or position < end)
+
+
+class Chapter(Region):
+
+    def __init__(self, *, start: float, end: Optional[float] = None, node: Optional[AnnotationNode] = None):
+        super().__init__(start=start, end=end)
+        self.node = node
+
+    @property
+    def filename(self) -> str:
+        node = self.node
+        return node.filename if node else ''
+
+
+def iter_labels(fpath: Path) -> Generator[Label, None, None]:
+    """Reads labels from a label file exported from Audacity (File -> Export -> Export Labels).
+
+    :param fpath:
+
+    """
+    with open(f'{fpath}') as f:
+
+        for line in f:
+
+            if line.startswith('\\'):
+                # spectral selection data for a previous label
+                continue
+
+            start, _, rest = line.rstrip('\n').partition('\t')
+
+            if not rest:
+                continue
+
+            end, _, text = rest.partition('\t')
+
+            yield Label(start=float(start), end=float(end), text=text)
+
+
+def dump_labels(labels: Iterable[Label], fpath: Path):
+    """Writes labels into a file suitable for Audacity import (File -> Import -> Labels).
+
+    :param labels:
+    :param fpath:
+
+    """
+    with open(f'{fpath}', 'w') as f:
+        for label in labels:
+            f.write(f'{label}\n')
+
+
+class LabelIndex:
+    """Time-indexed chapters, checkpoints and footnote regions
+    restored from RC action labels.
+
+    """
+
+    def __init__(self, labels: Iterable[Label]):
+        chapters: List[Chapter] = []
+        checkpoints: List[float] = []
+        footnotes: List[Region] = []
+        footnote: Optional[Region] = None
+
+        for label in labels:
+            action = label.action
+            position = label.start
+
+            if isinstance(action, ChapterAction):
+                if chapters:
+                    chapters[-1].end = position
+                chapters.append(Chapter(start=position))
+
+            elif isinstance(action, CheckpointAction):
+                checkpoints.append(position)
+
+            elif isinstance(action, FootnoteAction):
+
+                if action.begin:
+                    if footnote:
+                        LOG.warning(f'Footnote {footnote} is not closed, but a new one begins at {position}')
+                    footnote = Region(start=position)
+                    footnotes.append(footnote)
+
+                elif footnote:
+                    footnote.end = position
+                    footnote = None
+
+                else:
+                    LOG.warning(f'Footnote end at {position} without a beginning. Skipped.')
+
+        self.chapters = chapters
+        self.checkpoints = checkpoints
+        self.footnotes = footnotes
+        self._chapter_starts = [chapter.start for chapter in chapters]
+
+    @classmethod
+    def from_file(cls, fpath: Path) -> 'LabelIndex':
+        return cls(iter_labels(fpath))
+
+    def get_chapter(self, position: float) -> Optional[Chapter]:
+        """Returns a chapter for the given position (seconds).
+
+        :param position:
+
+        """
+        idx = bisect_right(self._chapter_starts, position) - 1
+
+        if idx < 0:
+            return None
+
+        return self.chapters[idx]
+
+    def get_footnotes(self, region: Region) -> List[Region]:
+        """Returns footnote regions intersecting with the given region.
+
+        :param region:
+
+        """
+        start = region.start
+        end = region.end
+
+        return [
+            footnote for footnote in self.footnotes
+            if (end is None or footnote.start < end) and (footnote.end is None or footnote.end > start)
+        ]
+
+    def bind_annotations(self, annotations: Annotations) -> List[Tuple[Chapter, AnnotationNode]]:
+        """Binds chapters to index file nodes having file names (in order of appearance).
+
+        :param annotations:
+
+        """
+        nodes = [node for node in annotations.nodes if node.filename]
+        chapters = self.chapters
+
+        if len(nodes) != len(chapters):
+            LOG.warning(
+                f'Chapters count in labels ({len(chapters)}) differs from '
+                f'file entries count in index ({len(nodes)}). Extra items are ignored.'
+            )
+
+        bound = []
+
+        for chapter, node in zip(chapters, nodes):
+            chapter.node = node
+            bound.append((chapter, node))
+
+        return bound
@@ -0,0 +1,251 @@
+import re
+from functools import partial
+from json import loads, dumps
+from pathlib import Path
+from time import perf_counter
+from typing import List, Dict, Optional
+
+from ..ffmpeg import ffmpeg, atomic_output, validate_duration
+from ..utils import LOG, list_files, iter_concurrently
+
+RE_DURATION = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+RE_SAMPLE_RATE = re.compile(r'Audio: .+?, (\d+) Hz')
+
+FILENAME_LOUDNESS = '.loudness.json'
+
+
+class LoudnessParams:
+    """Loudness normalization parameters.
+
+    Files with integrated loudness deviating from `target` more than `tolerance`
+    or with true peak above `peak` are normalized.
+
+    """
+    def __init__(self, *, target: float = -19, tolerance: float = 1, peak: float = -1.5, lra: float = 11):
+        self.target = target
+        self.tolerance = tolerance
+        self.peak = peak
+        self.lra = lra
+
+    def is_outlier(self, measurement: dict) -> bool:
+        return (
+            abs(measurement['input_i'] - self.target) > self.tolerance or
+            measurement['input_tp'] > self.peak
+        )
+
+
+def measure_single(fpath: Path) -> dict:
+    """Measures integrated loudness (LUFS), true peak (dBTP) and loudness range (LU)
+    in a single streaming ffmpeg pass.
+
+    :param fpath:
+
+    """
+    time_started = perf_counter()
+
+    result = ffmpeg('-i', f'{fpath}', '-map', '0:a', '-af', 'loudnorm=print_format=json', '-f', 'null', '-')
+    stderr = result.stderr
+
+    measurement = {
+        key: float(value)
+        for key, value in loads(stderr[stderr.rindex('{'):stderr.rindex('}') + 1]).items()
+        if key.startswith('input_')
+    }
+
+    duration = 0
+    if match := RE_DURATION.search(stderr):
+        hours, minutes, seconds = match.groups()
+        duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+    rate = 0
+    if match := RE_SAMPLE_RATE.search(stderr):
+        rate = int(match.group(1))
+
+    measurement.update({
+        'duration': duration,
+        'rate': rate,
+        'time': perf_counter() - time_started,
+    })
+
+    return measurement
+
+
+def normalize_single(fpath: Path, *, measurement: dict, params: LoudnessParams) -> dict:
+    """Normalizes loudness (in place) using the previous measurement (linear mode of two-pass loudnorm).
+    Returns a new measurement.
+
+    :param fpath:
+    :param measurement:
+    :param params:
+
+    """
+    time_started = perf_counter()
+
+    loudnorm = ':'.join([
+        f'loudnorm=I={params.target}',
+        f'TP={params.peak}',
+        f'LRA={params.lra}',
+        f"measured_I={measurement['input_i']}",
+        f"measured_TP={measurement['input_tp']}",
+        f"measured_LRA={measurement['input_lra']}",
+        f"measured_thresh={measurement['input_thresh']}",
+        'linear=true',
+    ])
+
+    with atomic_output(fpath) as fpath_tmp:
+        ffmpeg(
+            '-i', f'{fpath}',
+            '-map', '0:a', '-map_metadata', '0',
+            '-af', loudnorm,
+            # loudnorm upsamples to 192 kHz, restore
+            '-ar', f"{int(measurement['rate']) or 44100}",
+            '-c:a', 'libmp3lame', '-q:a', '2',
+            f'{fpath_tmp}'
+        )
+        validate_duration(fpath_tmp, expected=measurement['duration'])
+
+    time_normalize = perf_counter() - time_started
+
+    measurement = measure_single(fpath)
+    measurement['time_normalize'] = time_normalize
+
+    return measurement
+
+
+def process_single(fpath: Path, *, known: Dict[str, dict], params: LoudnessParams, normalize: bool) -> dict:
+    """Measures the file (unless already measured) and normalizes it if required.
+    Returns the file measurement.
+
+    :param fpath:
+    :param known: Known measurements by file names (see LoudnessIndex).
+    :param params:
+    :param normalize:
+
+    """
+    measurement = known.get(fpath.name)
+
+    if measurement is None:
+        measurement = measure_single(fpath)
+
+    else:
+        measurement['time'] = 0
+
+    measurement['time_normalize'] = 0
+
+    if normalize and params.is_outlier(measurement):
+        LOG.info(f"Normalizing \"{fpath.name}\" ({measurement['input_i']} LUFS) ...")
+        measurement = normalize_single(fpath, measurement=measurement, params=params)
+
+    return measurement
+
+
+class LoudnessIndex:
+    """Sidecar index of loudness measurements. Entries are invalidated on file size or modification time change."""
+
+    def __init__(self, fpath: Path):
+        self.fpath = fpath
+        self._data: Dict[str, dict] = {}
+
+        if fpath.exists():
+            self._data = loads(fpath.read_text())
+
+    def get(self, fpath: Path) -> Optional[dict]:
+        entry = self._data.get(fpath.name)
+
+        if entry is None:
+            return None
+
+        stat = fpath.stat()
+
+        if entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+            return None
+
+        return entry['measurement']
+
+    def set(self, fpath: Path, measurement: dict):
+        stat = fpath.stat()
+        self._data[fpath.name] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'measurement': {key: value for key, value in measurement.items() if not key.startswith('time')},
+        }
+
+    def save(self):
+        self.fpath.write_text(dumps(self._data, indent=2))
+
+
+def loudness_media(
+    *,
+    audio_files: List[Path],
+    index: LoudnessIndex,
+    params: LoudnessParams,
+    normalize: bool = True,
+    workers: int = None,
+):
+    audio_files = sorted(audio_files)
+    known = {fpath.name: measurement for fpath in audio_files if (measurement := index.get(fpath)) is not None}
+    measurements: Dict[Path, dict] = {}
+
+    try:
+        # analysis and encoding are CPU bound, processes are used
+        for fpath, measurement in iter_concurrently(
+            partial(process_single, known=known, params=params, normalize=normalize),
+            audio_files,
+            workers=workers,
+            processes=True,
+        ):
+            # recorded at once: the file may be normalized in place already
+            index.set(fpath, measurement)
+            measurements[fpath] = measurement
+
+    finally:
+        index.save()
+
+    duration_total = 0
+    time_total = 0
+
+    LOG.info(f"{'file':<20} {'min':>6} {'LUFS':>6} {'dBTP':>6} {'LU':>5} {'measure s':>9} {'norm s':>7}")
+
+    for fpath in audio_files:
+        measurement = measurements[fpath]
+
+        duration = measurement['duration']
+        time_spent = measurement['time'] + measurement['time_normalize']
+        duration_total += duration
+        time_total += time_spent
+
+        flag = '*' if params.is_outlier(measurement) else ''
+
+        LOG.info(
+            f'{fpath.name:<20} '
+            f'{duration / 60:>6.1f} '
+            f"{measurement['input_i']:>6.1f} "
+            f"{measurement['input_tp']:>6.1f} "
+            f"{measurement['input_lra']:>5.1f} "
+            f"{measurement['time']:>9.1f} "
+            f"{measurement['time_normalize']:>7.1f}{flag}"
+        )
+
+    if duration_total:
+        LOG.info(
+            f'Processed {duration_total / 3600:.2f} h of audio in {time_total:.1f} sec '
+            f'({time_total / (duration_total / 3600):.1f} sec per hour).'
+        )
+
+
+def loudness(
+    *,
+    path_audio_in: Path,
+    params: LoudnessParams = None,
+    normalize: bool = True,
+    workers: int = None,
+):
+    LOG.debug(f'{path_audio_in=}')
+
+    loudness_media(
+        audio_files=list_files(path_audio_in, ext='mp3'),
+        index=LoudnessIndex(path_audio_in / FILENAME_LOUDNESS),
+        params=params or LoudnessParams(),
+        normalize=normalize,
+        workers=workers,
+    )
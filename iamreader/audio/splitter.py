@@ -0,0 +1,77 @@
+from os import makedirs
+from pathlib import Path
+from typing import List, Tuple
+
+from .labels import LabelIndex, Chapter
+from ..annotations import Annotations
+from ..ffmpeg import ffmpeg, atomic_output, validate_duration
+from ..project import Project
+from ..utils import LOG, run_concurrently
+
+
+def split_single(*, source: Path, chapter: Chapter, dest: Path):
+    """Cuts a chapter from a source recording without reencoding.
+
+    Since the stream is copied, cuts land on audio frame boundaries
+    (about 26 ms for MP3) next to the chapter labels, not exactly on them.
+
+    :param source:
+    :param chapter:
+    :param dest:
+
+    """
+    LOG.info(f'Cutting "{dest.name}" [{chapter}] ...')
+
+    args = ['-ss', f'{chapter.start}', '-i', f'{source}']
+
+    duration = chapter.duration
+    if duration is not None:
+        args.extend(['-t', f'{duration}'])
+
+    with atomic_output(dest) as dest_tmp:
+        ffmpeg(*args, '-map', '0:a', '-c', 'copy', '-map_metadata', '-1', f'{dest_tmp}')
+        validate_duration(dest_tmp, expected=duration or 0)
+
+
+def split_media(
+    *,
+    source: Path,
+    labels: LabelIndex,
+    annotations: Annotations,
+    dest: Path,
+    workers: int = None,
+) -> List[Path]:
+
+    makedirs(dest, exist_ok=True)
+
+    tasks: List[Tuple[Chapter, Path]] = []
+
+    for chapter, node in labels.bind_annotations(annotations):
+        tasks.append((chapter, dest / f'{node.filename}{source.suffix}'))
+
+    def cut(task: Tuple[Chapter, Path]) -> Path:
+        chapter, fpath = task
+        split_single(source=source, chapter=chapter, dest=fpath)
+        return fpath
+
+    return run_concurrently(cut, tasks, workers=workers)
+
+
+def split(
+    *,
+    project: Project,
+    path_source: Path,
+    path_labels: Path,
+    workers: int = None,
+):
+    LOG.debug(f'{project=}')
+    LOG.debug(f'{path_source=}')
+    LOG.debug(f'{path_labels=}')
+
+    split_media(
+        source=path_source,
+        labels=LabelIndex.from_file(path_labels),
+        annotations=Annotations(index_fpath=project.path_file_index),
+        dest=project.path_out_audio,
+        workers=workers,
+    )
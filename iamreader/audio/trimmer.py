@@ -0,0 +1,172 @@
+import re
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from typing import List, Tuple, Iterable
+
+from ..ffmpeg import ffmpeg, atomic_output, validate_duration
+from ..probe import probe_mp3
+from ..utils import LOG, list_files, run_concurrently
+
+CUT_MIN = 0.01
+"""Shortest interval worth cutting (seconds)."""
+
+RE_SILENCE = re.compile(r'silence_(start|end): (-?[\d.]+)')
+
+TypeInterval = Tuple[float, float]
+
+
+class TrimParams:
+    """Silence compression parameters. Mirror Audacity's TruncateSilence ones.
+
+    Silence is a run of audio quieter than `threshold` lasting longer than `minimum` seconds.
+    Such silence excess (above `minimum`) is compressed to `compress` percent.
+
+    """
+    def __init__(self, *, threshold: float = -20, minimum: float = 0.5, compress: float = 80):
+        self.threshold = threshold
+        self.minimum = minimum
+        self.compress = compress
+
+
+def detect_silence(fpath: Path, *, threshold: float, minimum: float, duration: float) -> List[TypeInterval]:
+    """Detects silent intervals (seconds) in an audio file.
+
+    Samples are analyzed by ffmpeg silencedetect filter, not passed into Python.
+
+    :param fpath:
+    :param threshold: dBFS
+    :param minimum: Minimal silence duration (seconds).
+    :param duration: File duration (seconds).
+
+    """
+    result = ffmpeg(
+        '-i', f'{fpath}',
+        '-map', '0:a:0',
+        '-af', f'silencedetect=noise={threshold}dB:d={minimum}',
+        '-f', 'null', '-',
+    )
+    return parse_silences(result.stderr.splitlines(), duration=duration)
+
+
+def parse_silences(lines: Iterable[str], *, duration: float) -> List[TypeInterval]:
+    """Gathers silent intervals (seconds) from ffmpeg silencedetect filter log lines.
+
+    :param lines:
+    :param duration: Media duration to end a silence lasting till the end of media.
+
+    """
+    silences = []
+    silence_start = None
+
+    for line in lines:
+
+        if not (match := RE_SILENCE.search(line)):
+            continue
+
+        kind, position = match.groups()
+        # a silence at the very beginning may be reported slightly before it
+        position = max(float(position), 0)
+
+        if kind == 'start':
+            silence_start = position
+
+        elif silence_start is not None:
+            silences.append((silence_start, position))
+            silence_start = None
+
+    if silence_start is not None and duration > silence_start:
+        silences.append((silence_start, duration))
+
+    return silences
+
+
+def get_cuts(silences: List[TypeInterval], *, minimum: float, compress: float) -> List[TypeInterval]:
+    """Calculates intervals to be cut out of silent ones,
+    so that a silence excess is compressed, and its edges are left intact.
+
+    :param silences:
+    :param minimum:
+    :param compress: Percent.
+
+    """
+    cuts = []
+
+    for start, end in silences:
+        duration = end - start
+        keep = minimum + (duration - minimum) * compress / 100
+        margin = keep / 2
+
+        if duration - keep >= CUT_MIN:
+            cuts.append((round(start + margin, 3), round(end - margin, 3)))
+
+    return cuts
+
+
+def trim_single(fpath: Path, *, params: TrimParams) -> Tuple[Path, int, float]:
+    """Compresses silence in the given file (in place).
+    Returns a tuple: file path, cuts count, seconds cut.
+
+    :param fpath:
+    :param params:
+
+    """
+    time_started = perf_counter()
+
+    duration = probe_mp3(fpath).duration
+    silences = detect_silence(
+        fpath,
+        threshold=params.threshold,
+        minimum=params.minimum,
+        duration=duration,
+    )
+    cuts = get_cuts(silences, minimum=params.minimum, compress=params.compress)
+    removed = sum(end - start for start, end in cuts)
+
+    if cuts:
+        selection = '+'.join(f'between(t,{start},{end})' for start, end in cuts)
+        expected = duration - removed
+
+        with atomic_output(fpath) as fpath_tmp:
+            ffmpeg(
+                '-i', f'{fpath}',
+                '-map', '0:a', '-map_metadata', '0',
+                '-af', f"aselect='not({selection})',asetpts=N/SR/TB",
+                '-c:a', 'libmp3lame', '-q:a', '2',
+                f'{fpath_tmp}'
+            )
+            validate_duration(fpath_tmp, expected=expected)
+
+    LOG.info(
+        f'Trimmed "{fpath.name}": {len(cuts)} cuts, {removed:.1f} sec removed '
+        f'[{perf_counter() - time_started:.1f} sec]')
+
+    return fpath, len(cuts), removed
+
+
+def trim_media(*, audio_files: List[Path], params: TrimParams, workers: int = None):
+
+    results = run_concurrently(
+        partial(trim_single, params=params),
+        sorted(audio_files),
+        workers=workers,
+        processes=True,
+    )
+
+    removed = sum(result[2] for result in results)
+    LOG.info(f'Trimmed {len(results)} file(s), {removed:.1f} sec of silence removed.')
+
+
+def trim(
+    *,
+    path_audio_in: Path,
+    params: TrimParams = None,
+    workers: int = None,
+):
+    LOG.debug(f'{path_audio_in=}')
+
+    trim_media(
+        audio_files=list_files(path_audio_in, ext='mp3'),
+        params=params or TrimParams(),
+        workers=workers,
+    )
@@ -0,0 +1,182 @@
+from functools import partial
+from os import cpu_count, makedirs
+from pathlib import Path
+from typing import Optional, Dict, List, Callable, Set
+
+from .annotations import Annotations
+from .audio.annotator import annotate_single
+from .pipeline import Pipeline, Task, POOL_CPU, POOL_IO, POOL_NET
+from .probe import ProbeIndex
+from .project import Project
+from .publishing import ProjectConfig, Service
+from .publishing.config import PRIORITY_DT_PUB
+from .utils import LOG, list_files
+from .video.generator import generate_cover, generate_video, get_cover_text
+
+
+def publish_single(*, service: Service, item: dict):
+    LOG.info(f"{service}: publishing {item['ident']} ...")
+    service.publish_item(item)
+
+
+def add_tasks(
+    pipeline: Pipeline,
+    *,
+    project: Project,
+    service: str = '',
+    filenames: Set[str] = None,
+) -> Callable[[], None]:
+    """Adds the project build tasks into the pipeline.
+    Returns a callable to persist the project state (indexes, config) after the pipeline run.
+
+    :param pipeline:
+    :param project:
+    :param service: Service alias to publish to. If not set, publishing is skipped.
+    :param filenames: Chapters (file names without extension) to build. Default: all.
+
+    """
+    LOG.debug(f'{project=}')
+
+    path_resources = project.path_resources
+    path_out_vid = project.path_out_video
+    path_out_img = project.path_out_images
+
+    makedirs(path_out_vid, exist_ok=True)
+    makedirs(path_out_img, exist_ok=True)
+
+    annotations = Annotations(index_fpath=project.path_file_index)
+    audio_files = list_files(project.path_out_audio, ext='mp3')
+
+    cover_audio = path_resources / 'cover.jpg'
+    cover_template = path_resources / 'bg.png'
+
+    # task names are prefixed to be distinguishable when several projects are built
+    label = project.path.name
+
+    produced: Dict[Path, Task] = {}
+    """Files to tasks producing them."""
+
+    probe = ProbeIndex(project.path_file_probe)
+    durations = {fpath: probe.get(fpath).duration for fpath in audio_files}
+
+    chapters = list(enumerate(annotations.iter_for_files(audio_files), 1))
+    # the longest chapters go first to shorten the overall run
+    chapters.sort(key=lambda chapter: durations[chapter[1][1]], reverse=True)
+
+    for idx, (filename, filepath, annotation) in chapters:
+
+        if filenames is not None and filename not in filenames:
+            continue
+
+        text = get_cover_text(annotation)
+
+        if not text:
+            LOG.warning(f'No annotation for "{filename}". Skipped.')
+            continue
+
+        produced[filepath] = task_tag = pipeline.add(
+            f'tag {label}/{filename}',
+            partial(
+                annotate_single,
+                filepath=filepath,
+                artist=annotation.get_author_first(),
+                album=annotation.get_title_first(),
+                title=annotation.title,
+                idx=idx,
+                cover=cover_audio,
+            ),
+            pool=POOL_IO,
+        )
+
+        image = path_out_img / f'{filename}.png'
+
+        task_cover = pipeline.add(
+            f'cover {label}/{filename}',
+            partial(generate_cover, fpath=image, text=text, template=cover_template),
+        )
+
+        out_video = path_out_vid / f'{filename}.avi'
+
+        produced[out_video] = pipeline.add(
+            f'encode {label}/{filename}',
+            partial(generate_video, fpath=out_video, image=image, audio=filepath, duration=durations[filepath]),
+            deps=[task_tag, task_cover],
+        )
+
+    cfg: Optional[ProjectConfig] = None
+
+    if service:
+        cfg = ProjectConfig(project.path_file_config)
+
+        service_obj: Service = Service.registry[service](
+            config=cfg,
+            annotations=annotations,
+            project=project,
+        )
+        task_prev = None
+
+        source_files = [fpath for fpath in produced if fpath.suffix == f'.{service_obj.file_ext}']
+
+        items = service_obj.materialize_template(source_files=source_files)
+
+        # files are yet to be encoded, so their sizes are unknown: publish in order of publication dates
+        for item in service_obj.prioritize(items, priority=PRIORITY_DT_PUB):
+            task_hash = pipeline.add(
+                f"hash {label}/{item['ident']}",
+                partial(service_obj.hash_item, item),
+                deps=[produced.get(Path(item['fpath']))],
+                pool=POOL_IO,
+            )
+            task_prev = pipeline.add(
+                f"publish {label}/{item['ident']}",
+                partial(publish_single, service=service_obj, item=item),
+                deps=[task_hash, task_prev],
+                pool=POOL_NET,
+            )
+
+    def save():
+        probe.save()
+
+        if cfg:
+            cfg.save()
+            service_obj.log_throughput()
+
+    return save
+
+
+def build(
+    *,
+    projects: List[Project],
+    service: str = '',
+    workers: int = None,
+    filenames: Set[str] = None,
+):
+    """Tags audio, generates covers and videos and (optionally) publishes them
+    using a per chapter dependency graph: tag -> encode <- cover, encode -> hash -> publish.
+
+    Tasks of all the projects are run by the same pipeline, sharing its worker pools
+    (and process wide caches, e.g. fonts, cover templates and HTTP sessions).
+
+    :param projects:
+    :param service: Service alias to publish to. If not set, publishing is skipped.
+    :param workers: Number of CPU bound workers (cover rendering, encoding).
+    :param filenames: Chapters (file names without extension) to build. Default: all.
+
+    """
+    pipeline = Pipeline(pools={
+        POOL_CPU: workers or cpu_count() or 1,
+        POOL_IO: 4,
+        POOL_NET: 1,
+    })
+
+    finalizers = []
+
+    try:
+        for project in projects:
+            finalizers.append(add_tasks(pipeline, project=project, service=service, filenames=filenames))
+
+        pipeline.run()
+
+    finally:
+        for finalize in finalizers:
+            finalize()
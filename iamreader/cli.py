@@ -1,49 +1,130 @@
 #!/usr/bin/env python
 import logging
+from pathlib import Path
 
 import click
 
 from . import VERSION_STR
 from .exceptions import IamreaderException
-from .publishing import media_publish
-from .rc import RemoteControl, RemoteControlUi, RemoteState
-from .utils import configure_logging, PATH_OUT_AUDIO, PATH_RESOURCES, PATH_OUT_VIDEO, PATH_OUT_IMAGES
+from .profiling import PROFILER
+from .progress import set_reporter, REPORTERS, PROGRESS_LOG
+from .publishing import media_publish, media_sync, media_status
+from .rc import RemoteControl, RemoteControlUi, RemoteState, SessionLog, SessionStats
+from .project import Project
+from .utils import configure_logging
 from .video import generate as video_generate
-from .audio import annotate as audio_annotate
+from .build import build as project_build
+from .watch import watch as project_watch
+from .audio import (
+    annotate as audio_annotate, split as audio_split, trim as audio_trim, loudness as audio_loudness,
+    TrimParams, LoudnessParams,
+)
 
 
 @click.group()
 @click.version_option(version=VERSION_STR)
 @click.option('--debug', help='Show debug messages', is_flag=True)
-def entry_point(debug):
+@click.option('--profile', help='Show per stage timings and save a trace into iamreader_trace.json', is_flag=True)
+@click.option('--cprofile', help='Also run under cProfile and save stats into iamreader.prof', is_flag=True)
+@click.option(
+    '--progress', help='Progress reporting: log messages, live status line or JSON lines events',
+    type=click.Choice(list(REPORTERS)), default=PROGRESS_LOG, show_default=True,
+)
+@click.pass_context
+def entry_point(ctx, debug, profile, cprofile, progress):
     """iamreader command line utilities."""
     configure_logging(logging.DEBUG if debug else None)
+    set_reporter(progress)
 
+    if profile or cprofile:
+        PROFILER.enable()
+        profiler_c = None
 
-@entry_point.command()
-def rc():
+        if cprofile:
+            from cProfile import Profile
+            profiler_c = Profile()
+            profiler_c.enable()
+
+        def finalize():
+            if profiler_c:
+                profiler_c.disable()
+                profiler_c.dump_stats('iamreader.prof')
+
+            PROFILER.log_summary()
+            PROFILER.dump_trace(Path('iamreader_trace.json'))
+
+        ctx.call_on_close(finalize)
+
+
+@entry_point.group(invoke_without_command=True)
+@click.pass_context
+def rc(ctx):
     """Launches a Remote Control UI for Audacity"""
+    if ctx.invoked_subcommand:
+        return
+
     state = RemoteState()
     window = RemoteControlUi(
         remote_control=RemoteControl(remote_state=state),
-        remote_state=state
+        remote_state=state,
+        session_log=SessionLog(Project.current().path_file_sessions),
     )
     window.bind_shortcuts()
     window.loop()
 
 
+@rc.command()
+@click.option('--log', help='Session log file path', type=click.Path(exists=True, dir_okay=False))
+def stats(log):
+    """Shows recording throughput metrics from RC session log."""
+    fpath = Path(log) if log else Project.current().path_file_sessions
+
+    if not fpath.exists():
+        raise IamreaderException(f'No session log found: {fpath}')
+
+    metrics = SessionStats(fpath).aggregate()
+
+    def minutes(seconds: float) -> str:
+        return f'{seconds / 60:.1f}'
+
+    click.echo('week      sessions  hours  rec min  done min  done/h  rerec  utter s')
+
+    for week, data in metrics.items():
+        click.echo(
+            f"{week:<9} "
+            f"{data['sessions']:>8} "
+            f"{data['duration'] / 3600:>6.1f} "
+            f"{minutes(data['recorded']):>8} "
+            f"{minutes(data['finished']):>9} "
+            f"{data['finished_per_hour']:>7.1f} "
+            f"{data['rerecord_ratio']:>6.0%} "
+            f"{data['utterance_avg']:>8.1f}"
+        )
+
+
 @entry_point.group()
 def video():
     """Video related commands."""
 
 @video.command()
-def generate():
+@click.option('--text-box', help='Cover text box: X,Y,WIDTH,HEIGHT', default='')
+@click.option('--batch', help='Videos to encode by a single ffmpeg process (faster for short chapters)', default=1)
+def generate(text_box, batch):
     """Generates video from audio and text index file."""
+    box = None
+
+    if text_box:
+        try:
+            box = tuple(map(int, text_box.split(',')))
+            assert len(box) == 4
+
+        except (ValueError, AssertionError):
+            raise click.BadParameter('Four comma separated integers are expected.', param_hint='--text-box')
+
     video_generate(
-        path_resources=PATH_RESOURCES,
-        path_audio_in=PATH_OUT_AUDIO,
-        path_out_vid=PATH_OUT_VIDEO,
-        path_out_img=PATH_OUT_IMAGES,
+        project=Project.current(),
+        text_box=box,
+        batch=batch,
     )
 
 
@@ -53,21 +134,144 @@ def audio():
 
 
 @audio.command()
-def annotate():
+@click.option('--chapter-covers', help="Embed per chapter covers made by 'video generate'", is_flag=True)
+def annotate(chapter_covers):
     """Annotates audio using text index file."""
     audio_annotate(
-        path_resources=PATH_RESOURCES,
-        path_audio_in=PATH_OUT_AUDIO,
+        project=Project.current(),
+        chapter_covers=chapter_covers,
+    )
+
+
+@audio.command()
+@click.argument('master', type=click.Path(exists=True, dir_okay=False))
+@click.argument('labels', type=click.Path(exists=True, dir_okay=False))
+@click.option('--jobs', help='Number of parallel cuts', type=int)
+def split(master, labels, jobs):
+    """Splits a master recording into chapters using a label track
+    exported from Audacity."""
+    audio_split(
+        project=Project.current(),
+        path_source=Path(master),
+        path_labels=Path(labels),
+        workers=jobs,
+    )
+
+
+@audio.command()
+@click.option('--threshold', help='Silence threshold (dB)', type=float, default=-20, show_default=True)
+@click.option('--minimum', help='Minimal silence duration (sec)', type=float, default=0.5, show_default=True)
+@click.option('--compress', help='Compress silence excess to (percent)', type=float, default=80, show_default=True)
+@click.option('--jobs', help='Number of files processed in parallel', type=int)
+def trim(threshold, minimum, compress, jobs):
+    """Compresses silence in audio files."""
+    audio_trim(
+        path_audio_in=Project.current().path_out_audio,
+        params=TrimParams(threshold=threshold, minimum=minimum, compress=compress),
+        workers=jobs,
+    )
+
+
+@audio.command()
+@click.option('--target', help='Target integrated loudness (LUFS)', type=float, default=-19, show_default=True)
+@click.option('--tolerance', help='Allowed deviation from target (LU)', type=float, default=1, show_default=True)
+@click.option('--peak', help='Max true peak (dBTP)', type=float, default=-1.5, show_default=True)
+@click.option('--measure-only', help='Do not normalize outliers', is_flag=True)
+@click.option('--jobs', help='Number of files processed in parallel', type=int)
+def loudness(target, tolerance, peak, measure_only, jobs):
+    """Measures loudness of audio files and normalizes outliers."""
+    audio_loudness(
+        path_audio_in=Project.current().path_out_audio,
+        params=LoudnessParams(target=target, tolerance=tolerance, peak=peak),
+        normalize=not measure_only,
+        workers=jobs,
     )
 
 
 @video.command()
 @click.argument('service')
-def publish(service):
+@click.option('--jobs', help='Number of media published concurrently (default: from project config)', type=int)
+def publish(service, jobs):
     """Publish media at a remote service."""
     media_publish(
+        project=Project.current(),
+        service=service,
+        concurrency=jobs,
+    )
+
+
+@video.command()
+@click.argument('service')
+@click.option('--dry-run', help='Only show differences', is_flag=True)
+def sync(service, dry_run):
+    """Updates metadata of published media which has changed since publishing."""
+    diffs = media_sync(
+        project=Project.current(),
+        service=service,
+        dry_run=dry_run,
+    )
+
+    for item, diff in diffs:
+        click.echo(f"{item['ident']} [{item.get('ident_remote', '')}]")
+
+        for key, (old, new) in diff.items():
+            click.echo(f'  {key}: {old!r} -> {new!r}')
+
+    click.echo(f'{len(diffs)} item(s) changed')
+
+
+@video.command()
+@click.argument('service')
+@click.option('--wait', help='Wait till all published media are processed', is_flag=True)
+def status(service, wait):
+    """Checks processing statuses of published media. Failed ones are published again on next 'publish'."""
+    pending = media_status(
+        project=Project.current(),
+        service=service,
+        wait=wait,
+    )
+    click.echo(f'{pending} item(s) pending')
+
+
+@entry_point.command()
+@click.option('--publish', 'service', help='Also publish media at the given remote service', default='')
+@click.option('--jobs', help='Number of parallel encodings', type=int)
+def build(service, jobs):
+    """Annotates audio, generates and optionally publishes video, chapter by chapter."""
+    project_build(
+        projects=[Project.current()],
         service=service,
-        path_resources=PATH_RESOURCES,
+        workers=jobs,
+    )
+
+
+@entry_point.command()
+@click.argument('paths', nargs=-1, required=True, type=click.Path(exists=True, file_okay=False))
+@click.option('--publish', 'service', help='Also publish media at the given remote service', default='')
+@click.option('--jobs', help='Number of parallel encodings', type=int)
+def batch(paths, service, jobs):
+    """Builds several projects (directories) in one process, like 'build' does for the current one."""
+    projects = [Project(Path(path).resolve()) for path in paths]
+
+    for project in projects:
+        project.validate()
+
+    project_build(
+        projects=projects,
+        service=service,
+        workers=jobs,
+    )
+
+
+@entry_point.command()
+@click.option('--jobs', help='Number of parallel encodings', type=int)
+@click.option('--poll', help='Poll for changes instead of using inotify', is_flag=True)
+def watch(jobs, poll):
+    """Watches resources and rebuilds chapters affected by changes."""
+    project_watch(
+        project=Project.current(),
+        workers=jobs,
+        poll=poll,
     )
 
 
@@ -9,3 +9,11 @@ class RemoteControlException(IamreaderException):
 
 class ServiceException(IamreaderException):
     """Base exception for interaction with services."""
+
+
+class QuotaException(ServiceException):
+    """Remote API quota of a service credential is exceeded."""
+
+
+class FfmpegException(IamreaderException):
+    """ffmpeg invocation failed."""
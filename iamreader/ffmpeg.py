@@ -0,0 +1,145 @@
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from subprocess import run, CompletedProcess, Popen, PIPE
+from typing import Generator, Callable, List
+
+from .exceptions import FfmpegException
+from .utils import LOG
+
+DURATION_TOLERANCE = 1.5
+"""Max difference (seconds) between an output duration and an expected one."""
+
+
+def ffmpeg(*args: str, progress: Callable[[dict], None] = None) -> CompletedProcess:
+    """Runs ffmpeg with the given arguments. Raises FfmpegException on failure.
+
+    :param args: ffmpeg arguments (an argument vector, no shell is involved)
+    :param progress: Callable to receive ffmpeg progress data (see ffmpeg -progress option),
+        e.g. {'out_time_us': '1000000', 'speed': '25.1x', 'progress': 'continue', ...}
+
+    """
+    cmd = ['ffmpeg', '-hide_banner', '-nostdin', '-y']
+
+    if progress:
+        cmd.extend(['-progress', 'pipe:1', '-nostats'])
+
+    cmd.extend(args)
+
+    LOG.debug(f"Running: {' '.join(cmd)}")
+
+    try:
+        if progress:
+            result = run_with_progress(cmd, progress=progress)
+
+        else:
+            result = run(cmd, capture_output=True, text=True)
+
+    except FileNotFoundError:
+        raise FfmpegException('ffmpeg is not found. Please install it.')
+
+    if result.returncode:
+        stderr = result.stderr.strip().splitlines()[-5:]
+        raise FfmpegException(f'ffmpeg failed ({result.returncode}):\n' + '\n'.join(stderr))
+
+    return result
+
+
+def get_duration(fpath: Path) -> float:
+    """Returns media file duration (seconds) as reported by ffprobe.
+
+    :param fpath:
+
+    """
+    cmd = [
+        'ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+        '-of', 'default=noprint_wrappers=1:nokey=1', f'{fpath}',
+    ]
+
+    try:
+        result = run(cmd, capture_output=True, text=True)
+
+    except FileNotFoundError:
+        raise FfmpegException('ffprobe is not found. Please install ffmpeg.')
+
+    try:
+        return float(result.stdout.strip())
+
+    except ValueError:
+        raise FfmpegException(f'Unable to get duration of {fpath}: {result.stderr.strip()}')
+
+
+def validate_duration(fpath: Path, *, expected: float, tolerance: float = DURATION_TOLERANCE):
+    """Raises FfmpegException if the file duration differs from the expected one,
+    e.g. if encoding stopped early leaving a truncated file.
+
+    :param fpath:
+    :param expected: Seconds. 0 - unknown, nothing to validate.
+    :param tolerance: Seconds.
+
+    """
+    if not expected:
+        return
+
+    duration = get_duration(fpath)
+
+    if abs(duration - expected) > tolerance:
+        raise FfmpegException(
+            f'Unexpected duration of {fpath.name}: {duration:.1f} sec instead of {expected:.1f} sec')
+
+
+@contextmanager
+def atomic_output(fpath: Path) -> Generator[Path, None, None]:
+    """Yields a temporary path to write output into. The temporary file replaces
+    the given one on success and is removed on failure, so that partial outputs
+    never appear under final names.
+
+    The temporary file is hidden (see utils.list_files) and keeps
+    the extension, so that ffmpeg still detects the output format.
+
+    :param fpath:
+
+    """
+    fpath_tmp = fpath.with_name(f'.{fpath.stem}.part{fpath.suffix}')
+
+    try:
+        yield fpath_tmp
+        fpath_tmp.replace(fpath)
+
+    finally:
+        fpath_tmp.unlink(missing_ok=True)
+
+
+def run_with_progress(cmd: List[str], *, progress: Callable[[dict], None]) -> CompletedProcess:
+    """Runs ffmpeg passing progress data blocks from its stdout to a callable.
+
+    :param cmd:
+    :param progress:
+
+    """
+    process = Popen(cmd, stdout=PIPE, stderr=PIPE, text=True)
+
+    stderr = []
+    # drain stderr concurrently to prevent pipe buffer overflow
+    reader = threading.Thread(target=lambda: stderr.extend(process.stderr), daemon=True)
+    reader.start()
+
+    block = {}
+
+    for line in process.stdout:
+        key, _, value = line.strip().partition('=')
+
+        if not key:
+            continue
+
+        block[key] = value.strip()
+
+        if key == 'progress':
+            progress(block)
+            block = {}
+
+    process.wait()
+    reader.join()
+
+    return CompletedProcess(cmd, process.returncode, stdout='', stderr=''.join(stderr))
+
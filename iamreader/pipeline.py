@@ -0,0 +1,131 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from queue import Queue
+from typing import Callable, List, Dict, Optional, Any
+
+from .exceptions import IamreaderException
+from .utils import LOG
+
+POOL_CPU = 'cpu'
+POOL_IO = 'io'
+POOL_NET = 'net'
+
+
+class Task:
+
+    def __init__(self, *, name: str, func: Callable, deps: List['Task'], pool: str):
+        self.name = name
+        self.func = func
+        self.deps = deps
+        self.pool = pool
+        self.dependents: List['Task'] = []
+        self.pending = len(deps)
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.skipped = False
+
+    def __str__(self):
+        return self.name
+
+
+class Pipeline:
+    """Runs tasks forming a dependency graph.
+
+    A task is started as soon as all its dependencies are done,
+    so that tasks from different pools (e.g. CPU bound encoding and network bound uploading) overlap.
+
+    A failed task causes all its dependents to be skipped, other tasks proceed.
+
+    """
+    def __init__(self, *, pools: Dict[str, int]):
+        """
+        :param pools: Pool name to number of workers mapping.
+
+        """
+        self._pools = pools
+        self.tasks: List[Task] = []
+
+    def add(self, name: str, func: Callable, *, deps: List[Optional[Task]] = None, pool: str = POOL_CPU) -> Task:
+        """Adds a task.
+
+        :param name:
+        :param func: Callable without arguments.
+        :param deps: Tasks to be done before this one. None items are ignored.
+        :param pool:
+
+        """
+        assert pool in self._pools, f'Unknown pool "{pool}"'
+
+        deps = [dep for dep in (deps or []) if dep is not None]
+        task = Task(name=name, func=func, deps=deps, pool=pool)
+
+        for dep in deps:
+            dep.dependents.append(task)
+
+        self.tasks.append(task)
+
+        return task
+
+    def run(self):
+        """Runs all the tasks. Raises IamreaderException if any task is failed."""
+
+        tasks = self.tasks
+        done: Queue = Queue()
+        executors = {
+            name: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'iamreader-{name}')
+            for name, workers in self._pools.items()
+        }
+
+        def submit(task: Task):
+            LOG.debug(f'Task started: {task}')
+            future: Future = executors[task.pool].submit(task.func)
+            future.add_done_callback(lambda fut: done.put((task, fut)))
+
+        def skip(task: Task) -> int:
+            skipped = 0
+            stack = [task]
+
+            while stack:
+                current = stack.pop()
+
+                for dependent in current.dependents:
+                    if not dependent.skipped:
+                        dependent.skipped = True
+                        LOG.warning(f'Task skipped: {dependent} (due to {task})')
+                        skipped += 1
+                        stack.append(dependent)
+
+            return skipped
+
+        remaining = len(tasks)
+
+        try:
+            for task in tasks:
+                if not task.pending:
+                    submit(task)
+
+            while remaining:
+                task, future = done.get()
+                remaining -= 1
+
+                if error := future.exception():
+                    task.error = error
+                    LOG.error(f'Task failed: {task}: {error}')
+                    remaining -= skip(task)
+                    continue
+
+                task.result = future.result()
+                LOG.debug(f'Task done: {task}')
+
+                for dependent in task.dependents:
+                    dependent.pending -= 1
+                    if not dependent.pending and not dependent.skipped:
+                        submit(dependent)
+
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+
+        failed = [task for task in tasks if task.error]
+
+        if failed:
+            raise IamreaderException(f"{len(failed)} task(s) failed: {', '.join(map(str, failed[:10]))}")
@@ -0,0 +1,219 @@
+import threading
+from json import loads, dumps
+from pathlib import Path
+from typing import Optional, Dict, Tuple
+
+from .utils import LOG
+
+BITRATES = {
+    # (mpeg version 1 or 2, layer): kbps by index
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+BITRATES[(2, 3)] = BITRATES[(2, 2)]
+
+SAMPLE_RATES = {
+    # mpeg version bits: Hz by index
+    3: (44100, 48000, 32000),  # 1
+    2: (22050, 24000, 16000),  # 2
+    0: (11025, 12000, 8000),  # 2.5
+}
+
+HEAD_READ_SIZE = 65536
+"""Bytes to read from a file start (after ID3v2 tag) to find the first frame."""
+
+
+class MediaInfo:
+    """Audio file facts."""
+
+    def __init__(
+        self,
+        *,
+        duration: float = 0,
+        bitrate: int = 0,
+        sample_rate: int = 0,
+        channels: int = 0,
+        size: int = 0,
+        vbr: bool = False,
+    ):
+        self.duration = duration
+        """Seconds."""
+
+        self.bitrate = bitrate
+        """Average bits per second."""
+
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+        self.size = size
+        """File size in bytes."""
+
+        self.vbr = vbr
+
+    def __str__(self):
+        duration = int(self.duration)
+        return f'{duration // 3600}:{duration % 3600 // 60:02}:{duration % 60:02}'
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+def parse_frame_header(header: bytes) -> Optional[Tuple[int, int, int, int, int]]:
+    """Parses MPEG audio frame header.
+    Returns a tuple: (mpeg version bits, layer, bitrate bps, sample rate, channels) or None if invalid.
+
+    :param header: 4 bytes
+
+    """
+    if header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+
+    version_bits = (header[1] >> 3) & 3
+    layer = 4 - ((header[1] >> 1) & 3)
+    bitrate_idx = header[2] >> 4
+    rate_idx = (header[2] >> 2) & 3
+
+    if version_bits == 1 or layer == 4 or bitrate_idx in (0, 15) or rate_idx == 3:
+        # reserved or free format
+        return None
+
+    version = 1 if version_bits == 3 else 2
+    bitrate = BITRATES[(version, layer)][bitrate_idx] * 1000
+    channels = 1 if (header[3] >> 6) == 3 else 2
+
+    return version_bits, layer, bitrate, SAMPLE_RATES[version_bits][rate_idx], channels
+
+
+def probe_mp3(fpath: Path) -> MediaInfo:
+    """Reads MP3 facts from ID3 and frame headers, without decoding.
+
+    Duration is taken from Xing/Info or VBRI header if any (VBR),
+    otherwise calculated from the audio data size and the first frame bitrate (CBR).
+
+    :param fpath:
+
+    """
+    size = fpath.stat().st_size
+
+    with open(fpath, 'rb') as f:
+        head = f.read(10)
+        audio_start = 0
+
+        if head[:3] == b'ID3' and len(head) == 10:
+            tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            footer = 10 if head[5] & 0x10 else 0
+            audio_start = 10 + tag_size + footer
+
+        f.seek(audio_start)
+        data = f.read(HEAD_READ_SIZE)
+
+        f.seek(max(size - 128, 0))
+        has_id3v1 = f.read(3) == b'TAG'
+
+    info = MediaInfo(size=size)
+    offset = data.find(b'\xff')
+    parsed = None
+
+    while offset != -1 and offset + 4 <= len(data):
+        if parsed := parse_frame_header(data[offset:offset + 4]):
+            break
+        offset = data.find(b'\xff', offset + 1)
+
+    if not parsed:
+        LOG.warning(f'No MPEG audio frames found in {fpath}')
+        return info
+
+    version_bits, layer, bitrate, sample_rate, channels = parsed
+
+    audio_start += offset
+    audio_size = size - audio_start - (128 if has_id3v1 else 0)
+
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 2 or version_bits == 3:
+        samples_per_frame = 1152
+    else:
+        samples_per_frame = 576
+
+    frames = 0
+
+    # Xing/Info header follows side information
+    if version_bits == 3:
+        xing_offset = offset + 4 + (17 if channels == 1 else 32)
+    else:
+        xing_offset = offset + 4 + (9 if channels == 1 else 17)
+
+    if data[xing_offset:xing_offset + 4] in (b'Xing', b'Info'):
+        flags = int.from_bytes(data[xing_offset + 4:xing_offset + 8], 'big')
+        if flags & 1:
+            frames = int.from_bytes(data[xing_offset + 8:xing_offset + 12], 'big')
+        info.vbr = data[xing_offset:xing_offset + 4] == b'Xing'
+
+    elif data[offset + 36:offset + 40] == b'VBRI':
+        frames = int.from_bytes(data[offset + 50:offset + 54], 'big')
+        info.vbr = True
+
+    if frames:
+        info.duration = frames * samples_per_frame / sample_rate
+        info.bitrate = int(audio_size * 8 / info.duration) if info.duration else bitrate
+
+    else:
+        info.duration = audio_size * 8 / bitrate
+        info.bitrate = bitrate
+
+    info.sample_rate = sample_rate
+    info.channels = channels
+
+    return info
+
+
+class ProbeIndex:
+    """Persistent media facts index. Entries are keyed by file path
+    and are invalidated on file size or modification time change.
+
+    """
+    def __init__(self, fpath: Path):
+        self.fpath = fpath
+        self._data: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._changed = False
+
+        if fpath.exists():
+            self._data = loads(fpath.read_text())
+
+    def get(self, fpath: Path) -> MediaInfo:
+        """Returns media facts for the given file, probing it if required.
+
+        :param fpath:
+
+        """
+        key = f'{fpath.resolve()}'
+        stat = fpath.stat()
+        entry = self._data.get(key)
+
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+            return MediaInfo(**entry['info'])
+
+        info = probe_mp3(fpath)
+
+        with self._lock:
+            self._data[key] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'info': info.to_dict(),
+            }
+            self._changed = True
+
+        return info
+
+    def save(self):
+        with self._lock:
+            if not self._changed:
+                return
+
+            self.fpath.parent.mkdir(parents=True, exist_ok=True)
+            self.fpath.write_text(dumps(self._data))
+            self._changed = False
@@ -0,0 +1,123 @@
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from json import dumps
+from os import getpid
+from pathlib import Path
+from time import perf_counter, thread_time
+from typing import List, Dict
+
+LOG = logging.getLogger('iamreader')
+
+
+class Profiler:
+    """Records wall and CPU time of pipeline stages.
+
+    Disabled by default, so that instrumentation costs almost nothing.
+
+    """
+    def __init__(self):
+        self.enabled = False
+        self._started = perf_counter()
+        self._events: List[dict] = []
+        self._lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+        self._started = perf_counter()
+        self._events.clear()
+
+    @contextmanager
+    def stage(self, name: str, **args):
+        """Context manager to time a stage.
+
+        :param name: Stage name, e.g. 'encode'.
+        :param args: Additional information, e.g. file name.
+            Special `bytes` argument is used to calculate stage throughput.
+
+        """
+        if not self.enabled:
+            yield args
+            return
+
+        wall_started = perf_counter()
+        cpu_started = thread_time()
+
+        try:
+            yield args
+
+        finally:
+            wall = perf_counter() - wall_started
+            cpu = thread_time() - cpu_started
+
+            event = {
+                'name': name,
+                'ts': wall_started - self._started,
+                'wall': wall,
+                'cpu': cpu,
+                'tid': threading.get_ident(),
+                'args': args,
+            }
+
+            with self._lock:
+                self._events.append(event)
+
+    def summarize(self) -> Dict[str, dict]:
+        """Returns stats grouped by stage name."""
+
+        summary = defaultdict(lambda: {'count': 0, 'wall': 0, 'cpu': 0, 'bytes': 0})
+
+        for event in self._events:
+            stats = summary[event['name']]
+            stats['count'] += 1
+            stats['wall'] += event['wall']
+            stats['cpu'] += event['cpu']
+            stats['bytes'] += event['args'].get('bytes', 0)
+
+        return dict(summary)
+
+    def log_summary(self):
+        LOG.info(f"{'stage':<12} {'count':>6} {'wall s':>9} {'cpu s':>9} {'MB/s':>8}")
+
+        for name, stats in sorted(self.summarize().items()):
+            wall = stats['wall']
+            rate = stats['bytes'] / wall / 1024 / 1024 if wall else 0
+
+            LOG.info(
+                f"{name:<12} {stats['count']:>6} {wall:>9.3f} {stats['cpu']:>9.3f} "
+                f"{f'{rate:.2f}' if stats['bytes'] else '':>8}"
+            )
+
+    def dump_trace(self, fpath: Path):
+        """Writes events in Chrome trace event format (chrome://tracing, Perfetto UI).
+
+        :param fpath:
+
+        """
+        pid = getpid()
+
+        events = [
+            {
+                'name': event['name'],
+                'cat': event['name'],
+                'ph': 'X',
+                'ts': int(event['ts'] * 1_000_000),
+                'dur': int(event['wall'] * 1_000_000),
+                'pid': pid,
+                'tid': event['tid'],
+                'args': {
+                    'cpu_ms': round(event['cpu'] * 1000, 3),
+                    **{key: f'{value}' for key, value in event['args'].items()},
+                },
+            }
+            for event in self._events
+        ]
+
+        fpath.write_text(dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}))
+
+        LOG.info(f'Profiling trace is saved into: {fpath}')
+
+
+PROFILER = Profiler()
+"""Global profiler object."""
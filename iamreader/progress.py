@@ -0,0 +1,251 @@
+import sys
+import threading
+from functools import partial
+from json import dumps
+from time import monotonic
+from typing import Optional, Dict, Any, BinaryIO
+
+PROGRESS_LOG = 'log'
+PROGRESS_LINE = 'line'
+PROGRESS_JSON = 'json'
+
+
+class Reporter:
+    """Base progress reporter. Reports nothing: per item log messages are enough."""
+
+    interval: float = 0.5
+    """Min interval (seconds) between non-final reports."""
+
+    def __init__(self):
+        self._reported = 0
+
+    def report(self, progress: 'Progress', *, final: bool = False):
+        now = monotonic()
+
+        if not final and now - self._reported < self.interval:
+            return
+
+        self._reported = now
+        self._report(progress, final=final)
+
+    def _report(self, progress: 'Progress', *, final: bool):
+        pass
+
+
+class LineReporter(Reporter):
+    """Renders a live status line into stderr."""
+
+    def _report(self, progress: 'Progress', *, final: bool):
+        stats = progress.get_stats()
+
+        chunks = [f"{stats['title']}: {stats['done']}/{stats['total']}"]
+
+        if stats['total']:
+            chunks.append(f"({stats['done'] / stats['total']:.0%})")
+
+        if stats['bytes_rate']:
+            chunks.append(f"{stats['bytes_rate'] / 1024 / 1024:.2f} MB/s")
+
+        if (eta := stats['eta']) is not None:
+            chunks.append(f'ETA {int(eta // 3600)}:{int(eta % 3600 // 60):02}:{int(eta % 60):02}')
+
+        if item := stats['item']:
+            info = ' '.join(f'{key}={value}' for key, value in stats['item_info'].items())
+            more = stats['items_active'] - 1
+            chunks.append(f"| {item}{f' (+{more})' if more else ''} {info}".rstrip())
+
+        line = ' '.join(chunks)
+
+        sys.stderr.write(f'\r{line[:150]:<150}' + ('\n' if final else ''))
+        sys.stderr.flush()
+
+
+class JsonReporter(Reporter):
+    """Emits JSON lines events into stdout."""
+
+    def _report(self, progress: 'Progress', *, final: bool):
+        stats = progress.get_stats()
+        stats['event'] = 'done' if final else 'progress'
+        sys.stdout.write(dumps(stats, ensure_ascii=False) + '\n')
+        sys.stdout.flush()
+
+
+REPORTERS = {
+    PROGRESS_LOG: Reporter,
+    PROGRESS_LINE: LineReporter,
+    PROGRESS_JSON: JsonReporter,
+}
+
+_reporter: Reporter = Reporter()
+
+
+def set_reporter(mode: str):
+    """Sets progress reporting mode for all subsequent Progress objects.
+
+    :param mode: log, line, json
+
+    """
+    global _reporter
+    _reporter = REPORTERS[mode]()
+
+
+class Progress:
+    """Tracks completed items and bytes, calculates throughput and ETA.
+
+    Several items may be in progress at once (e.g. published concurrently):
+    item methods take an item name, the latest started item is used if it's not set.
+
+    """
+
+    def __init__(self, title: str, *, total: int, total_bytes: int = 0):
+        self.title = title
+        self.total = total
+        self.total_bytes = total_bytes
+        self.done = 0
+        self.done_bytes = 0
+
+        self.item = ''
+        """The latest started item of those in progress."""
+
+        self.items: Dict[str, Dict[str, Any]] = {}
+        """Items in progress: bytes processed and additional info by names."""
+
+        self._started = monotonic()
+        self._lock = threading.Lock()
+        self._reporter = _reporter
+
+    def start_item(self, name: str):
+        with self._lock:
+            self.item = name
+            self.items[name] = {'bytes': 0, 'info': {}}
+
+        self._reporter.report(self)
+
+    def update_item(self, *, item: str = '', bytes_done: int = None, **info):
+        """Updates item progress.
+
+        :param item: Item name. Default: the latest started one.
+        :param bytes_done: Bytes of the item processed so far.
+        :param info: Additional information to report, e.g. encoding speed.
+
+        """
+        with self._lock:
+            if (entry := self.items.get(item or self.item)) is None:
+                return
+
+            if bytes_done is not None:
+                entry['bytes'] = bytes_done
+            entry['info'].update(info)
+
+        self._reporter.report(self)
+
+    def finish_item(self, *, item: str = '', bytes_done: int = 0):
+        """Marks the item done.
+
+        :param item: Item name. Default: the latest started one.
+        :param bytes_done: Item size in bytes.
+
+        """
+        with self._lock:
+            self.done += 1
+            self.done_bytes += bytes_done
+            self.items.pop(item or self.item, None)
+            self.item = next(reversed(self.items), '')
+
+        self._reporter.report(self, final=self.done >= self.total)
+
+    def skip_item(self, *, bytes_total: int = 0):
+        """Marks an item done without processing it (e.g. it has no annotation).
+        Its bytes are excluded from the total, not counted as processed, so that the rate is not inflated.
+
+        :param bytes_total: Item size in bytes.
+
+        """
+        with self._lock:
+            self.done += 1
+            self.total_bytes = max(self.total_bytes - bytes_total, 0)
+
+        self._reporter.report(self, final=self.done >= self.total)
+
+    def get_stats(self) -> dict:
+
+        with self._lock:
+            elapsed = monotonic() - self._started
+            bytes_processed = self.done_bytes + sum(entry['bytes'] for entry in self.items.values())
+            bytes_rate = bytes_processed / elapsed if elapsed else 0
+
+            eta: Optional[float] = None
+
+            if self.total_bytes and bytes_rate:
+                eta = max(self.total_bytes - bytes_processed, 0) / bytes_rate
+
+            elif self.done and self.total:
+                eta = elapsed / self.done * (self.total - self.done)
+
+            return {
+                'title': self.title,
+                'done': self.done,
+                'total': self.total,
+                'bytes': bytes_processed,
+                'bytes_total': self.total_bytes,
+                'bytes_rate': bytes_rate,
+                'elapsed': elapsed,
+                'eta': eta,
+                'item': self.item,
+                'item_info': dict(self.items[self.item]['info']) if self.item else {},
+                'items_active': len(self.items),
+            }
+
+
+class ProgressFile:
+    """Wraps a binary file object to track reading progress (e.g. when streamed into an HTTP request body).
+
+    :param file:
+    :param size: File size in bytes.
+    :param progress: Progress object to report into.
+    :param limiter: Object to limit reading rate, having consume(bytes_count) method
+        (see publishing.shaping.RateLimiter).
+    :param item: Item name to report progress of. Default: the latest started one.
+
+    """
+    def __init__(
+        self,
+        file: BinaryIO,
+        *,
+        size: int,
+        progress: Optional[Progress] = None,
+        limiter=None,
+        item: str = '',
+    ):
+        self._file = file
+        self._item = item
+        self._size = size
+        self._progress = progress
+        self._limiter = limiter
+        self._started = monotonic()
+        self.bytes_read = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self):
+        return iter(partial(self.read, 65536), b'')
+
+    @property
+    def rate(self) -> float:
+        """Bytes per second."""
+        elapsed = monotonic() - self._started
+        return self.bytes_read / elapsed if elapsed else 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        self.bytes_read += len(data)
+
+        if limiter := self._limiter:
+            limiter.consume(len(data))
+
+        if progress := self._progress:
+            progress.update_item(
+                item=self._item, bytes_done=self.bytes_read, rate=f'{self.rate / 1024 / 1024:.2f}MB/s')
+
+        return data
@@ -0,0 +1,46 @@
+from pathlib import Path
+
+from .exceptions import IamreaderException
+from .utils import FILENAME_INDEX, FILENAME_PROBE, FILENAME_SESSIONS, FILENAME_CONFIG, FILENAME_FEED
+
+
+class Project:
+    """Book project paths.
+
+    A project is a directory containing 'res' subdirectory with a text index,
+    templates, services credentials and configuration. Produced media go into 'res/out'.
+
+    """
+    def __init__(self, path: Path):
+        self.path = path
+
+        self.path_resources = path / 'res'
+        self.path_resources_out = self.path_resources / 'out'
+
+        self.path_out_audio = self.path_resources_out / 'aud'
+        self.path_out_video = self.path_resources_out / 'vid'
+        self.path_out_images = self.path_resources_out / 'img'
+
+        self.path_file_index = self.path_resources / FILENAME_INDEX
+        self.path_file_config = self.path_resources / FILENAME_CONFIG
+        self.path_file_sessions = self.path_resources / FILENAME_SESSIONS
+        self.path_file_probe = self.path_resources_out / FILENAME_PROBE
+        self.path_file_feed = self.path_resources_out / FILENAME_FEED
+
+        self.path_cache_covers = self.path_resources_out / '.covers'
+
+    def __str__(self):
+        return f'{self.path}'
+
+    def __repr__(self):
+        return f"Project('{self.path}')"
+
+    @classmethod
+    def current(cls) -> 'Project':
+        """Returns a project for the current working directory."""
+        return cls(Path.cwd())
+
+    def validate(self):
+        """Raises IamreaderException if the project directory looks invalid."""
+        if not self.path_resources.is_dir():
+            raise IamreaderException(f'Not a project directory (no "res" subdirectory): {self.path}')
@@ -1,21 +1,70 @@
-from pathlib import Path
+from typing import List, Tuple
 
 from .config import ProjectConfig
 from .services import Service
+from .services.base import TypeDiff
 from ..annotations import Annotations
-from ..utils import PATH_FILE_INDEX
+from ..project import Project
 
 
-def media_publish(*, service: str, path_resources: Path):
+def media_publish(*, project: Project, service: str, concurrency: int = None):
+    """Publishes media not yet published.
 
-    cfg = ProjectConfig(path_resources / 'iamreader.json')
+    :param project:
+    :param service:
+    :param concurrency: Max items published concurrently. Default: from project config.
+
+    """
+    cfg = ProjectConfig(project.path_file_config)
 
     try:
         Service.registry[service](
             config=cfg,
-            annotations=Annotations(index_fpath=PATH_FILE_INDEX),
-            path_resources=path_resources,
-        ).publish()
+            annotations=Annotations(index_fpath=project.path_file_index),
+            project=project,
+        ).publish(concurrency=concurrency)
+
+    finally:
+        cfg.save()
+
+
+def media_sync(*, project: Project, service: str, dry_run: bool = False) -> List[Tuple[dict, TypeDiff]]:
+    """Updates remote metadata of published items which has changed. Returns differences found.
+
+    :param project:
+    :param service:
+    :param dry_run: Only find differences.
+
+    """
+    cfg = ProjectConfig(project.path_file_config)
+
+    try:
+        return Service.registry[service](
+            config=cfg,
+            annotations=Annotations(index_fpath=project.path_file_index),
+            project=project,
+        ).sync(dry_run=dry_run)
+
+    finally:
+        dry_run or cfg.save()
+
+
+def media_status(*, project: Project, service: str, wait: bool = False) -> int:
+    """Checks processing statuses of published items. Returns the number of items still pending.
+
+    :param project:
+    :param service:
+    :param wait: Wait till all the items are processed.
+
+    """
+    cfg = ProjectConfig(project.path_file_config)
+
+    try:
+        return Service.registry[service](
+            config=cfg,
+            annotations=Annotations(index_fpath=project.path_file_index),
+            project=project,
+        ).track_statuses(wait=wait)
 
     finally:
         cfg.save()
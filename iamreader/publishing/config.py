@@ -1,6 +1,13 @@
+import threading
 from json import loads, dumps
 from pathlib import Path
-from typing import List, Any
+from typing import List, Any, Dict
+
+PRIORITY_DT_PUB = 'dt_pub'
+"""Items with the earliest publication dates go first."""
+
+PRIORITY_SIZE = 'size'
+"""The smallest files go first. Only applies to 'video publish': sizes are unknown before 'build' encodes files."""
 
 
 class ProjectConfig:
@@ -8,6 +15,12 @@ class ProjectConfig:
     def __init__(self, fpath: Path):
         self.fpath = fpath
         self._raw = {}
+
+        self.lock = threading.RLock()
+        """Guards data changes and saving, since items may be published concurrently.
+        Re-entrant: changes are to be saved while it's held.
+
+        """
         self.load()
 
     def __str__(self):
@@ -19,12 +32,34 @@ class ProjectConfig:
     def get_pub_items(self, service_alias: str) -> List[dict]:
         return self._get_pub(service_alias=service_alias, key='items', default=[])
 
+    def get_pub_ledger(self, service_alias: str) -> Dict[str, Dict[str, str]]:
+        return self._get_pub(service_alias=service_alias, key='ledger', default={})
+
+    def get_pub_limits(self, service_alias: str) -> List[dict]:
+        return self._get_pub(service_alias=service_alias, key='limits', default=[])
+
+    def get_pub_priority(self, service_alias: str) -> str:
+        return self._get_pub(service_alias=service_alias, key='priority', default=PRIORITY_DT_PUB)
+
+    def get_pub_quota(self, service_alias: str) -> dict:
+        return self._get_pub(service_alias=service_alias, key='quota', default={})
+
+    def get_pub_feed(self, service_alias: str) -> dict:
+        return self._get_pub(service_alias=service_alias, key='feed', default={})
+
+    def get_pub_schedule(self, service_alias: str) -> dict:
+        return self._get_pub(service_alias=service_alias, key='schedule', default={})
+
+    def get_pub_concurrency(self, service_alias: str) -> int:
+        return self._get_pub(service_alias=service_alias, key='concurrency', default=1)
+
     def _get_pub(self, *, service_alias: str, key: str, default: Any) -> Any:
-        service_data = self._raw['publish'].setdefault(service_alias, {
-            'template': {},
-            'items': [],
-        })
-        data = service_data.setdefault(key, default)
+        with self.lock:
+            service_data = self._raw['publish'].setdefault(service_alias, {
+                'template': {},
+                'items': [],
+            })
+            data = service_data.setdefault(key, default)
         return data
 
     def normalize(self):
@@ -38,5 +73,11 @@ class ProjectConfig:
         self.normalize()
 
     def save(self):
-        with open(f'{self.fpath}', 'w') as f:
-            f.write(dumps(self._raw, indent=2, ensure_ascii=False))
+        # written into a temporary file first, so that a crash never leaves the config truncated
+        fpath_tmp = self.fpath.with_name(f'.{self.fpath.name}.tmp')
+
+        with self.lock:
+            with open(f'{fpath_tmp}', 'w') as f:
+                f.write(dumps(self._raw, indent=2, ensure_ascii=False))
+
+            fpath_tmp.replace(self.fpath)
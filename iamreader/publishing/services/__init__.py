@@ -1,2 +1,3 @@
-from .base import Service
+from .base import Service, AsyncService
 from .youtube import YoutubeService
+from .podcast import PodcastService
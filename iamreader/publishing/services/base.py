@@ -1,14 +1,294 @@
-from datetime import datetime, timedelta
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, date
+from io import BytesIO
 from pathlib import Path
-from typing import Dict, TypeVar
+from time import sleep
+from typing import Dict, TypeVar, Optional, Tuple, Any, Callable, BinaryIO, Set
 from typing import List
+from uuid import uuid4
 
-from ..config import ProjectConfig
-from ...annotations import Annotations
-from ...utils import PATH_OUT_AUDIO, list_files, LOG
+import requests
+
+from ..config import ProjectConfig, PRIORITY_DT_PUB, PRIORITY_SIZE
+from ..shaping import RateLimiter
+from ...annotations import Annotations, AnnotationNode
+from ...exceptions import ServiceException, QuotaException
+from ...probe import ProbeIndex
+from ...progress import Progress
+from ...project import Project
+from ...utils import list_files, LOG, hash_file, run_concurrently_async
 
 TypeService = TypeVar('TypeService', bound='Service')
 
+FIELDS_SYNCED = ('title', 'description', 'tags')
+"""Published item fields compared to find changed items."""
+
+SYNC_BATCH = 20
+"""Number of remote updates after which project config is saved during sync."""
+
+OP_UPLOAD = 'upload'
+OP_UPDATE = 'update'
+OP_PLAYLIST = 'playlist'
+OP_LIST = 'list'
+
+STATUS_PENDING = 'pending'
+"""Uploaded, but not yet processed by a remote."""
+
+STATUS_PROCESSED = 'processed'
+
+STATUS_FAILED = 'failed'
+"""Processing failed or upload is rejected by a remote. Item is to be published again."""
+
+STATUS_INTERVAL_MIN = 30
+"""Seconds between status checks while items are being processed."""
+
+STATUS_INTERVAL_MAX = 600
+
+HASH_WORKERS = 2
+"""Number of files hashed concurrently with publishing."""
+
+
+def get_item_size(item: dict) -> int:
+    # files may be yet to be generated (see build)
+    fpath = Path(item['fpath'])
+    return fpath.stat().st_size if fpath.exists() else 0
+
+
+PRIORITIES: Dict[str, Callable[[dict], Any]] = {
+    PRIORITY_DT_PUB: lambda item: item['dt_pub'],
+    PRIORITY_SIZE: get_item_size,
+}
+"""Sorting keys for items to be published."""
+
+TypeDiff = Dict[str, Tuple[Any, Any]]
+
+IDENT_DEFAULT = '{{ ident }}'
+"""Item ident template. Idents are to be unique and stable: published items are matched by them."""
+
+_http_sessions: Dict[str, requests.Session] = {}
+_http_sessions_lock = threading.Lock()
+
+
+def get_http_session(name: str) -> requests.Session:
+    """Returns an HTTP session shared within the process, so that connections
+    are reused by service objects of different projects.
+
+    :param name: Session name, e.g. service alias.
+
+    """
+    with _http_sessions_lock:
+        session = _http_sessions.get(name)
+
+        if session is None:
+            session = _http_sessions[name] = requests.Session()
+
+        return session
+
+
+class MultipartBody:
+    """multipart/form-data request body read from a file on the fly.
+
+    Unlike `files` argument of requests, the file is never held in memory,
+    so that its transfer may be tracked and shaped (see ProgressFile).
+
+    """
+    def __init__(
+        self,
+        *,
+        fields: List[Tuple[str, bytes, str]],
+        file: BinaryIO,
+        size: int,
+        filename: str,
+        content_type: str,
+    ):
+        """
+        :param fields: Fields preceding the file: (name, data, content type) tuples.
+        :param file: Binary file object.
+        :param size: File size in bytes.
+        :param filename:
+        :param content_type: File content type.
+
+        """
+        boundary = uuid4().hex
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+
+        head = b''.join(
+            self._get_part_head(boundary, disposition=f'form-data; name="{name}"', content_type=ctype) + data + b'\r\n'
+            for name, data, ctype in fields
+        ) + self._get_part_head(
+            boundary, disposition=f'form-data; name="file"; filename="{filename}"', content_type=content_type)
+
+        tail = f'\r\n--{boundary}--\r\n'.encode()
+
+        self._parts = [BytesIO(head), file, BytesIO(tail)]
+        self._size = len(head) + size + len(tail)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _get_part_head(boundary: str, *, disposition: str, content_type: str) -> bytes:
+        return f'--{boundary}\r\nContent-Disposition: {disposition}\r\nContent-Type: {content_type}\r\n\r\n'.encode()
+
+    def read(self, size: int = -1) -> bytes:
+        chunks = []
+
+        for part in self._parts:
+            chunk = part.read(size)
+            chunks.append(chunk)
+
+            if size >= 0:
+                size -= len(chunk)
+                if not size:
+                    break
+
+        return b''.join(chunks)
+
+
+class Reconciliation:
+    """Difference between source items and published ones."""
+
+    def __init__(self):
+        self.new: List[dict] = []
+        """Items to be published."""
+
+        self.changed: List[Tuple[dict, dict]] = []
+        """Published items with fields differing from the source ones: (published, source) pairs."""
+
+        self.removed: List[dict] = []
+        """Published items having no source."""
+
+
+class Quota:
+    """Daily remote API quota usage. Usage data is kept in project config."""
+
+    def __init__(self, data: dict, *, limit: int):
+        """
+        :param data: Usage data to update in place.
+        :param limit: Units available a day. 0 - unlimited.
+
+        """
+        self.limit = limit
+        self._data = data
+
+        self.exhausted = False
+        """Used up as told by a remote: no units are available, reserved ones are not refunded."""
+
+        today = f'{date.today()}'
+
+        if data.get('date') != today:
+            data.update({'date': today, 'used': 0})
+
+    @property
+    def used(self) -> int:
+        return self._data['used']
+
+    def allows(self, units: int) -> bool:
+        return not self.exhausted and (not self.limit or self.used + units <= self.limit)
+
+    def spend(self, units: int):
+        self._data['used'] += units
+
+    def refund(self, units: int):
+        if not self.exhausted:
+            self._data['used'] = max(self.used - units, 0)
+
+    def exhaust(self):
+        """Marks the quota as used up for today (e.g. as told by a remote)."""
+        self.exhausted = True
+        self._data['used'] = max(self.used, self.limit)
+
+
+class QuotaPool:
+    """Daily quotas of several credentials (e.g. remote API projects) of a service.
+
+    Operations are sharded across the credentials by their remaining quota,
+    so that the total daily throughput scales with the number of credentials.
+    Usage of every credential is kept in project config:
+
+        "quota": {
+            "credentials": {"<ident>": {"date": "2024-01-31", "used": 3200}}
+        }
+
+    A sole unnamed credential ('') uses the top level data ("date", "used").
+    Once credentials are named, today's top level usage is attributed to the first one.
+
+    """
+    def __init__(self, data: dict, *, limit: int, credentials: List[str] = None):
+        """
+        :param data: Usage data to update in place.
+        :param limit: Units available a day for every credential. 0 - unlimited.
+        :param credentials: Credential idents. Default: a sole unnamed credential.
+
+        """
+        self.quotas: Dict[str, Quota] = {}
+        self._lock = threading.Lock()
+
+        credentials = credentials or ['']
+
+        for ident in credentials:
+            data_credential = data.setdefault('credentials', {}).setdefault(ident, {}) if ident else data
+            self.quotas[ident] = Quota(data_credential, limit=limit)
+
+        if credentials[0] and 'used' in data:
+            # recorded before credentials got named
+            used = data.pop('used')
+
+            if data.pop('date', '') == f'{date.today()}':
+                self.quotas[credentials[0]].spend(used)
+
+    @property
+    def used(self) -> int:
+        return sum(quota.used for quota in self.quotas.values())
+
+    def allows(self, units: int) -> bool:
+        return any(quota.allows(units) for quota in self.quotas.values())
+
+    def pick(self, units: int, *, credentials: List[str] = None) -> Optional[str]:
+        """Returns the credential having most of its quota left, if it allows the given units.
+
+        The units are reserved (spent) at once, so that concurrent operations never overrun a quota.
+        They are to be refunded if the operation fails (see refund).
+
+        :param units:
+        :param credentials: Credentials to choose from. Default: all.
+
+        """
+        with self._lock:
+            allowing = [
+                (quota.limit - quota.used if quota.limit else 0, ident)
+                for ident, quota in self.quotas.items()
+                if (credentials is None or ident in credentials) and quota.allows(units)
+            ]
+
+            if not allowing:
+                return None
+
+            credential = max(allowing, key=lambda entry: entry[0])[1]
+            self.quotas[credential].spend(units)
+
+        return credential
+
+    def spend(self, units: int, *, credential: str = ''):
+        with self._lock:
+            self.quotas[credential].spend(units)
+
+    def refund(self, units: int, *, credential: str = ''):
+        """Returns units reserved for an operation which has failed (see pick).
+
+        :param units:
+        :param credential:
+
+        """
+        with self._lock:
+            self.quotas[credential].refund(units)
+
+    def exhaust(self, credential: str):
+        with self._lock:
+            self.quotas[credential].exhaust()
+
 
 class Service:
 
@@ -17,85 +297,146 @@ class Service:
 
     file_ext: str = ''
 
+    quota_limit: int = 0
+    """Remote API units available a day. 0 - unlimited."""
+
+    quota_costs: Dict[str, int] = {}
+    """Remote API units spent by operations (see OP_*)."""
+
+    status_batch: int = 0
+    """Max items which statuses are checked by a single request. 0 - statuses are not tracked."""
+
     def __init_subclass__(cls) -> None:
         super().__init_subclass__()
 
         alias = cls.alias
+
+        if not alias:
+            # abstract bases, e.g. AsyncService
+            return
+
         existing = cls.registry.get(alias)
         assert alias not in cls.registry, f'Service "{alias}" is already registered (exists "{existing}"; new "{cls}").'
 
         cls.registry[alias] = cls
 
-    def __init__(self, *, config: ProjectConfig, annotations: Annotations, path_resources: Path):
+    def __init__(self, *, config: ProjectConfig, annotations: Annotations, project: Project):
         self._cfg = config
         self._ann = annotations
-        self._path_resources = path_resources
+        self._project = project
+        self._path_resources = project.path_resources
+        self._progress: Optional[Progress] = None
+        self._probe = ProbeIndex(project.path_file_probe)
+        self._quota = QuotaPool(
+            config.get_pub_quota(self.alias), limit=self.quota_limit, credentials=self.get_credentials())
+        self._limiter = RateLimiter.from_config(config.get_pub_limits(self.alias))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._turns: Dict[str, threading.Event] = {}
+        """Events set once items prioritized before the given ones are done (see _wait_turn)."""
+        self._uploads: Dict[str, threading.Lock] = {}
+        self._uploads_lock = threading.Lock()
+        self._idents_sources: Optional[Set[str]] = None
+        """Idents of the source items found by the latest reconciliation (see _upload_once)."""
 
     def __str__(self) -> str:
         return self.alias
 
-    def materialize_template(self, path_sources: Path = None) -> List[dict]:
+    def get_credentials(self) -> List[str]:
+        """Returns idents of the credentials operations may be sharded across (see QuotaPool).
+        Empty - a sole unnamed credential.
+
+        """
+        return []
+
+    def materialize_template(self, path_sources: Path = None, *, source_files: List[Path] = None) -> List[dict]:
+        """Returns items to be published (not yet published ones).
+
+        :param path_sources: Directory to search source files in.
+        :param source_files: Source files (including those yet to be generated). Takes precedence over path_sources.
+
+        """
+        return self.reconcile(path_sources, source_files=source_files, changes=False).new
+
+    def reconcile(
+        self,
+        path_sources: Path = None,
+        *,
+        source_files: List[Path] = None,
+        changes: bool = True,
+    ) -> Reconciliation:
+        """Compares source items with the published ones by their idents.
+
+        Only new items (and, if requested, published ones to check for changes) are rendered.
+
+        :param path_sources: Directory to search source files in.
+        :param source_files: Source files (including those yet to be generated). Takes precedence over path_sources.
+            Published items missing from the given files are considered removed.
+        :param changes: Whether to look for changed items. If not set, only new and removed items are found.
+
+        """
+        if source_files is None:
+            path_sources = path_sources or self._project.path_out_audio
+            source_files = list_files(path_sources, ext=self.file_ext)
 
-        path_sources = path_sources or PATH_OUT_AUDIO
-        source_files = list_files(path_sources, ext=self.file_ext)
         alias = self.alias
-        processed = self._cfg.get_pub_items(alias)
+        published = {
+            item['ident']: item for item in self._cfg.get_pub_items(alias)
+            # failed ones are to be published again
+            if item.get('status') != STATUS_FAILED
+        }
         template = self._cfg.get_pub_template(alias)
 
-        items = []
+        sources: List[Tuple[Path, AnnotationNode]] = []
 
         for filename, filepath, annotation in self._ann.iter_for_files(source_files):
             if not annotation:
                 LOG.warning(f'No annotation for "{filename}". Skipped.')
-            items.append((filepath, annotation))
+                continue
+            sources.append((filepath, annotation))
 
-        counter_width = len(f'{len(items)}')
-        counter = len(processed)
-        date_pub_latest = datetime.now().date()
+        # counters are positions in the index, not among the files present,
+        # so that they don't shift when some files are removed (e.g. after publishing)
+        positions = {filename: idx for idx, filename in enumerate(self._ann.by_filename, 1)}
+        counter_width = len(f'{len(positions)}')
+        items: Dict[str, Tuple[str, Path, AnnotationNode]] = {}
 
-        if processed:
-            if dt_pub := processed[-1].get('dt_pub'):
-                date_pub_latest = datetime.fromisoformat(dt_pub).date()
+        for filepath, annotation in sources:
+            counter = f'{positions[annotation.filename]}'.zfill(counter_width)
+            # keyed the same way as published items are
+            ident = self._render_ident(template=template, filepath=filepath, annotation=annotation, counter=counter)
+            items[ident] = (counter, filepath, annotation)
 
-        config = []
+        self._idents_sources = set(items)
+        idents_new = items.keys() - published.keys()
+        idents_kept = items.keys() & published.keys() if changes else set()
 
-        for idx, (filepath, annotation) in enumerate(items, 0):
+        reconciliation = Reconciliation()
+        reconciliation.removed = [item for ident, item in published.items() if ident not in items]
 
-            if idx < counter:
-                continue
+        date_pub_latest = self._get_schedule_start()
 
-            ident = annotation.filename
-            conf = {
-                'ident': '{{ ident }}',
-                'title': '{{ counter }}. {{ title_first }}. {{ title_last }}',
-                'description': '{{ author_first }}\n{{ title_full_n }}',
-                'tags': [],
-                'playlists': [],
-                'dt_pub': '+1d 12:30:00+00:00',
-                'fpath': f'{filepath}',
-            }
+        if dt_pubs := [item['dt_pub'] for item in published.values() if item.get('dt_pub')]:
+            date_pub_latest = datetime.fromisoformat(max(dt_pubs)).date()
 
-            full_title = annotation.get_full_title(root_title=True)
+        for ident, (counter, filepath, annotation) in items.items():
 
-            context = {
-                'counter': f'{counter + 1}'.zfill(counter_width),
-                'ident': f'{ident}',
-                'author_first': annotation.get_author_first(),
-                'title_first': full_title[0],
-                'title_last': full_title[-1],
-                'title_full': '. '.join(full_title),
-                'title_full_n': '\n'.join(full_title),
-            }
+            if ident not in idents_new and ident not in idents_kept:
+                continue
 
-            for key, val in conf.items():
+            conf = self._render_item(
+                template=template,
+                filepath=filepath,
+                annotation=annotation,
+                counter=counter,
+            )
 
-                value = template.get(key, val)
+            if ident in idents_kept:
+                item = published[ident]
 
-                if isinstance(value, str):
-                    for context_key, contex_val in context.items():
-                        value = value.replace('{{ %s }}' % context_key, contex_val)
+                if any(item.get(key) != conf[key] for key in FIELDS_SYNCED):
+                    reconciliation.changed.append((item, conf))
 
-                conf[key] = value
+                continue
 
             dt_pub_val = conf['dt_pub']
 
@@ -110,23 +451,520 @@ class Service:
                 date_pub_latest = dt_pub_current.date()
                 conf['dt_pub'] = f'{dt_pub_current}'
 
-            counter += 1
-            config.append(conf)
+            reconciliation.new.append(conf)
+
+        self._probe.save()
+
+        return reconciliation
+
+    def _get_schedule_start(self) -> date:
+        """Returns the date relative publication dates (e.g. '+1d 12:30:00') are counted from
+        while nothing is published yet.
+
+        """
+        return datetime.now().date()
+
+    def _render_ident(self, *, template: dict, filepath: Path, annotation: AnnotationNode, counter: str) -> str:
+        if template.get('ident', IDENT_DEFAULT) == IDENT_DEFAULT:
+            # no need to render the whole item
+            return annotation.filename
+
+        return self._render_item(template=template, filepath=filepath, annotation=annotation, counter=counter)['ident']
+
+    def _get_audio_path(self, filepath: Path) -> Optional[Path]:
+        """Returns the MP3 file the source one is made of (to get e.g. its duration), if any.
+
+        :param filepath: Source file (see file_ext).
+
+        """
+        return filepath if self.file_ext == 'mp3' else None
+
+    def _render_item(self, *, template: dict, filepath: Path, annotation: AnnotationNode, counter: str) -> dict:
+        conf = {
+            'ident': IDENT_DEFAULT,
+            'title': '{{ counter }}. {{ title_first }}. {{ title_last }}',
+            'description': '{{ author_first }}\n{{ title_full_n }}',
+            'tags': [],
+            'playlists': [],
+            'dt_pub': '+1d 12:30:00+00:00',
+            'fpath': f'{filepath}',
+        }
+
+        full_title = annotation.get_full_title(root_title=True)
+
+        duration = ''
+        if (fpath_audio := self._get_audio_path(filepath)) and fpath_audio.exists():
+            duration = f'{self._probe.get(fpath_audio)}'
+
+        context = {
+            'counter': counter,
+            'ident': f'{annotation.filename}',
+            'author_first': annotation.get_author_first(),
+            'title_first': full_title[0],
+            'title_last': full_title[-1],
+            'title_full': '. '.join(full_title),
+            'title_full_n': '\n'.join(full_title),
+            'duration': duration,
+        }
+
+        for key, val in conf.items():
 
-        return config
+            value = template.get(key, val)
 
-    def _contribute_item(self, *, ident_remote: str, item: dict):
+            if isinstance(value, str):
+                for context_key, contex_val in context.items():
+                    value = value.replace('{{ %s }}' % context_key, contex_val)
+
+            conf[key] = value
+
+        return conf
+
+    def _contribute_item(self, *, ident_remote: str, item: dict, credential: str = None):
+        """Records the published item.
+
+        :param ident_remote:
+        :param item:
+        :param credential: Credential the item is uploaded with (see get_credentials), if known.
+            Further calls regarding the item are made with it, since other ones may have no access to it.
+
+        """
         item.update({
             'ident_remote': ident_remote,
             'dt_prc': f'{datetime.now()}',
         })
-        self._cfg.get_pub_items(self.alias).append(item)
 
-    def publish(self):  # pragma: nocover
-        items = self.materialize_template()
-        for item in items:
-            LOG.info(f"{self}: publishing {item['ident']} ...")
-            self._publish_item(item)
+        if credential is not None:
+            item['credential'] = credential
+
+        if self.status_batch:
+            item['status'] = STATUS_PENDING
+
+        with self._cfg.lock:
+            items = self._cfg.get_pub_items(self.alias)
+
+            for idx, existing in enumerate(items):
+                if existing['ident'] == item['ident'] and existing.get('status') == STATUS_FAILED:
+                    # republished: keep the failed remote ident for reference
+                    item['failed'] = existing.get('failed', []) + [existing['ident_remote']]
+                    del items[idx]
+                    break
+
+            items.append(item)
+
+    def prioritize(self, items: List[dict], *, priority: str = '') -> List[dict]:
+        """Returns items sorted by the priority configured for the service.
+
+        :param items:
+        :param priority: Priority to use instead of the configured one (see PRIORITY_*).
+
+        """
+        priority = priority or self._cfg.get_pub_priority(self.alias)
+        key = PRIORITIES.get(priority)
+
+        if key is None:
+            raise ServiceException(f"{self}: unknown priority '{priority}' (known: {', '.join(PRIORITIES)})")
+
+        return sorted(items, key=key)
+
+    def log_throughput(self):
+        stats = self._limiter.get_stats()
+
+        if stats['bytes']:
+            LOG.info(
+                f"{self}: sent {stats['bytes'] / 1024 / 1024:.1f} MB in {stats['elapsed']:.1f} sec "
+                f"({stats['rate'] / 1024 / 1024:.2f} MB/s), throttled for {stats['waited']:.1f} sec"
+            )
+
+    async def __aenter__(self) -> 'Service':
+        # async services open their sessions and get tokens here
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    def publish(self, *, concurrency: int = None):
+        """Publishes items not yet published.
+
+        :param concurrency: Max items published concurrently. Default: from project config (1).
+
+        """
+        asyncio.run(self.publish_async(concurrency=concurrency))
+
+    async def publish_async(self, *, concurrency: int = None):
+        """Publishes items not yet published, concurrently.
+
+        :param concurrency: Max items published concurrently. Default: from project config (1).
+
+        """
+        items = self.prioritize(self.materialize_template())
+        limit = concurrency or self._cfg.get_pub_concurrency(self.alias)
+
+        sizes = {item['ident']: Path(item['fpath']).stat().st_size for item in items}
+        progress = Progress(f'{self}', total=len(items), total_bytes=sum(sizes.values()))
+        self._progress = progress
+
+        loop = asyncio.get_running_loop()
+
+        # files are hashed ahead, while previous ones are being transferred
+        hashing = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='iamreader-hash')
+        hashes = {item['ident']: loop.run_in_executor(hashing, self.hash_item, item) for item in items}
+
+        self._executor = ThreadPoolExecutor(max_workers=limit, thread_name_prefix='iamreader-publish')
+
+        done = {item['ident']: threading.Event() for item in items}
+        self._turns = {item['ident']: done[item_prev['ident']] for item_prev, item in zip(items, items[1:])}
+
+        async def publish_item(item: dict):
+            ident = item['ident']
+
+            try:
+                await hashes[ident]
+                LOG.info(f'{self}: publishing {ident} ...')
+                progress.start_item(ident)
+                await self._publish_item_async(item)
+                progress.finish_item(item=ident, bytes_done=sizes[ident])
+
+            finally:
+                # failed ones as well, not to hold the rest
+                done[ident].set()
+
+        try:
+            async with self:
+                await run_concurrently_async(publish_item, items, limit=limit)
+
+        finally:
+            for event in done.values():
+                event.set()
+            for hashed in hashes.values():
+                hashed.cancel()
+            hashing.shutdown()
+            self._executor.shutdown()
+            self._executor = None
+            self._turns = {}
+            self.log_throughput()
+
+    def publish_item(self, item: dict) -> bool:
+        """Publishes a single item outside of an event loop (e.g. from a build pipeline thread).
+
+        :param item:
+
+        """
+        return self._publish_item(item)
+
+    async def _publish_item_async(self, item: dict) -> bool:
+        # synchronous services are run in a thread pool not to block the event loop
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._publish_item, item)
+
+    def _wait_turn(self, item: dict):
+        """Blocks until the items prioritized before the given one are done.
+
+        Called by _publish_item before recording the item (and e.g. adding it into playlists),
+        so that items are recorded in priority order, while their files are still transferred concurrently.
+
+        :param item:
+
+        """
+        if event := self._turns.get(item['ident']):
+            event.wait()
+
+    async def _wait_turn_async(self, item: dict):
+        """Awaits the items prioritized before the given one are done (see _wait_turn).
+
+        :param item:
+
+        """
+        if (event := self._turns.get(item['ident'])) and not event.is_set():
+            await asyncio.get_running_loop().run_in_executor(None, event.wait)
+
+    def hash_item(self, item: dict) -> str:
+        """Calculates item file contents hash (if not yet) and returns it.
+
+        :param item:
+
+        """
+        if not (digest := item.get('hash')):
+            digest = item['hash'] = hash_file(Path(item['fpath']))
+
+        return digest
+
+    def _upload_once(self, item: dict, *, upload: Callable[[dict], str]) -> str:
+        """Uploads item file unless the same contents have been uploaded already. Returns remote ident.
+
+        Uploaded contents hashes are recorded into a ledger (and saved) at once along with item idents,
+        so that an item file is never transferred twice, even if publishing crashes
+        before the item is recorded. An upload of an item no longer among the sources
+        (e.g. its file is renamed) is taken over. Other items having the same contents are uploaded anyway,
+        since every item is a separate remote entity (e.g. in playlists).
+
+        :param item:
+        :param upload: Uploading callable returning remote ident.
+
+        """
+        digest = self.hash_item(item)
+        ident = item['ident']
+
+        # items with the same contents may be published concurrently
+        with self._uploads_lock:
+            lock = self._uploads.setdefault(digest, threading.Lock())
+
+        with lock:
+            with self._cfg.lock:
+                entry = self._get_ledger_entry(digest)
+
+                if ident_remote := entry.get(ident):
+                    LOG.info(f'{self}: {ident} contents are already uploaded as {ident_remote}')
+                    return ident_remote
+
+                sources = self._idents_sources
+
+                if sources is not None and (gone := [owner for owner in entry if owner not in sources]):
+                    ident_remote = entry[ident] = entry.pop(gone[0])
+                    self._cfg.save()
+                    LOG.info(f'{self}: {ident} contents are already uploaded as {ident_remote} (for {gone[0]})')
+                    return ident_remote
+
+                if entry:
+                    LOG.warning(f"{self}: {ident} contents are the same as of {', '.join(entry)}. Uploading anyway.")
+
+            ident_remote = upload(item)
+
+            with self._cfg.lock:
+                self._get_ledger_entry(digest)[ident] = ident_remote
+                self._cfg.save()
+
+        return ident_remote
+
+    def _get_ledger_entry(self, digest: str) -> Dict[str, str]:
+        """Returns remote idents of the given contents uploads by item idents.
+
+        :param digest: Contents hash.
+
+        """
+        return self._cfg.get_pub_ledger(self.alias).setdefault(digest, {})
 
     def _publish_item(self, item: dict) -> bool:  # pragma: nocover
+        """Publishes the item. Called from a thread pool when items are published concurrently,
+        so shared state is to be guarded, and _wait_turn is to be called before the item is recorded.
+
+        :param item:
+
+        """
+        raise NotImplementedError
+
+    def _reserve(self, operation: str, *, owner: str = None) -> Optional[str]:
+        """Reserves quota units of the operation. Returns the credential to use, None if the quota is exhausted.
+
+        :param operation: See OP_*
+        :param owner: Credential the item operated on is uploaded with (see _contribute_item). Default: any.
+
+        """
+        credentials = [owner] if owner in self._quota.quotas else None
+        return self._quota.pick(self.quota_costs.get(operation, 0), credentials=credentials)
+
+    def _refund(self, operation: str, *, credential: str):
+        self._quota.refund(self.quota_costs.get(operation, 0), credential=credential)
+
+    def get_diffs(self) -> List[Tuple[dict, TypeDiff]]:
+        """Returns published items with their fields differing from the source ones:
+        (published item, {field: (published value, source value)}) pairs.
+
+        """
+        diffs = []
+
+        for published, source in self.reconcile().changed:
+            diff = {
+                key: (published.get(key), source[key])
+                for key in FIELDS_SYNCED
+                if published.get(key) != source[key]
+            }
+            diffs.append((published, diff))
+
+        return diffs
+
+    def sync(self, *, dry_run: bool = False) -> List[Tuple[dict, TypeDiff]]:
+        """Updates remote metadata of published items which source metadata has changed
+        (e.g. after the index or the template is edited). Returns differences found.
+
+        Stops when the daily quota is exhausted; config is saved every SYNC_BATCH updates,
+        so that the next run proceeds with the items left.
+
+        :param dry_run: Only find differences, do not update anything.
+
+        """
+        diffs = self.get_diffs()
+
+        if dry_run:
+            return diffs
+
+        cost = self.quota_costs.get(OP_UPDATE, 0)
+
+        for idx, (item, diff) in enumerate(diffs):
+
+            credential = self._reserve(OP_UPDATE, owner=item.get('credential'))
+
+            if credential is None:
+                if not self._quota.allows(cost):
+                    LOG.warning(f'{self}: quota exhausted, {len(diffs) - idx} item(s) are left to sync')
+                    break
+
+                LOG.warning(f"{self}: quota of {item['credential']} exhausted, {item['ident']} is left to sync")
+                continue
+
+            LOG.info(f"{self}: updating {item['ident']} ({', '.join(diff)}) ...")
+
+            try:
+                self._update_item(item, fields={key: new for key, (_, new) in diff.items()}, credential=credential)
+
+            except QuotaException as e:
+                # other credentials may still be used
+                LOG.warning(f"{e}. {item['ident']} is left to sync")
+                continue
+
+            except Exception:
+                self._refund(OP_UPDATE, credential=credential)
+                raise
+
+            for key, (_, new) in diff.items():
+                item[key] = new
+
+            item['dt_sync'] = f'{datetime.now()}'
+
+            if (idx + 1) % SYNC_BATCH == 0:
+                self._cfg.save()
+
+        return diffs
+
+    def check_statuses(self) -> int:
+        """Checks processing statuses of pending items in batches.
+        Returns the number of items still pending.
+
+        """
+        pending = [item for item in self._cfg.get_pub_items(self.alias) if item.get('status') == STATUS_PENDING]
+        batch = self.status_batch
+
+        by_owner: Dict[Optional[str], List[dict]] = {}
+
+        for item in pending:
+            # statuses are requested with the credentials items are uploaded with
+            by_owner.setdefault(item.get('credential'), []).append(item)
+
+        for owner, items_owned in by_owner.items():
+            for start in range(0, len(items_owned), batch):
+
+                credential = self._reserve(OP_LIST, owner=owner)
+
+                if credential is None:
+                    LOG.warning(f"{self}: quota{f' of {owner}' if owner else ''} exhausted, statuses are not checked")
+                    break
+
+                items = items_owned[start:start + batch]
+
+                try:
+                    statuses = self._get_statuses([item['ident_remote'] for item in items], credential=credential)
+
+                except QuotaException as e:
+                    LOG.warning(f'{e}. Statuses are not checked')
+                    break
+
+                except Exception:
+                    self._refund(OP_LIST, credential=credential)
+                    raise
+
+                self._set_statuses(items, statuses=statuses)
+
+        return sum(1 for item in pending if item['status'] == STATUS_PENDING)
+
+    def _set_statuses(self, items: List[dict], *, statuses: Dict[str, str]):
+        """Updates items statuses with the ones got from the remote. Items unknown to the remote are failed.
+
+        :param items:
+        :param statuses: Statuses by remote idents.
+
+        """
+        for item in items:
+            status = statuses.get(item['ident_remote'], STATUS_FAILED)
+
+            if status == STATUS_FAILED:
+                LOG.warning(f"{self}: {item['ident']} processing failed. It'll be published again.")
+
+            with self._cfg.lock:
+                if status == STATUS_FAILED and (digest := item.get('hash')):
+                    self._get_ledger_entry(digest).pop(item['ident'], None)
+
+                item['status'] = status
+
+    def track_statuses(
+        self,
+        *,
+        wait: bool = False,
+        interval: float = STATUS_INTERVAL_MIN,
+        interval_max: float = STATUS_INTERVAL_MAX,
+    ) -> int:
+        """Checks processing statuses of pending items. Returns the number of items still pending.
+
+        :param wait: Wait till all the items are processed (or failed).
+            Checks are repeated with an interval doubled (up to interval_max)
+            every time no item has changed its status.
+        :param interval: Initial interval between checks (seconds).
+        :param interval_max: Max interval between checks (seconds).
+
+        """
+        if not self.status_batch:
+            return 0
+
+        pending = self.check_statuses()
+        interval_current = interval
+
+        while wait and pending and self._quota.allows(self.quota_costs.get(OP_LIST, 0)):
+            LOG.info(f'{self}: {pending} item(s) are being processed. Next check in {interval_current:.0f} sec ...')
+            sleep(interval_current)
+
+            pending_prev = pending
+            pending = self.check_statuses()
+            self._cfg.save()
+
+            interval_current = interval if pending < pending_prev else min(interval_current * 2, interval_max)
+
+        return pending
+
+    def _get_statuses(self, idents_remote: List[str], *, credential: str = '') -> Dict[str, str]:  # pragma: nocover
+        """Returns statuses (see STATUS_*) by remote idents. Unknown items may be omitted.
+
+        :param idents_remote:
+        :param credential: Credential to use (see get_credentials).
+
+        """
+        raise NotImplementedError
+
+    def _update_item(self, item: dict, *, fields: dict, credential: str = ''):  # pragma: nocover
+        """Updates remote item metadata.
+
+        :param item: Published item.
+        :param fields: Changed fields with new values.
+        :param credential: Credential to use (see get_credentials).
+
+        """
+        raise NotImplementedError
+
+
+class AsyncService(Service):
+    """Base for services talking to remotes with asyncio.
+
+    _publish_item is a coroutine run in the event loop (awaiting _wait_turn_async
+    before the item is recorded); sessions and tokens may be set up in __aenter__
+    and released in __aexit__.
+
+    """
+    def publish_item(self, item: dict) -> bool:
+
+        async def publish():
+            async with self:
+                return await self._publish_item(item)
+
+        return asyncio.run(publish())
+
+    async def _publish_item_async(self, item: dict) -> bool:
+        return await self._publish_item(item)
+
+    async def _publish_item(self, item: dict) -> bool:  # pragma: nocover
         raise NotImplementedError
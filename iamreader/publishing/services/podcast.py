@@ -0,0 +1,181 @@
+import os
+import threading
+from datetime import datetime, date
+from email.utils import format_datetime
+from pathlib import Path
+from typing import List, Tuple, BinaryIO, Iterable
+from urllib.parse import quote
+from xml.sax.saxutils import escape, quoteattr
+
+from .base import Service, TypeDiff, get_item_size
+from .. import ProjectConfig
+from ...annotations import Annotations
+from ...ffmpeg import atomic_output
+from ...project import Project
+from ...utils import LOG
+
+FEED_TAIL = b'</channel>\n</rss>\n'
+"""Feed closing tags. New items are written in place of them, followed by the tail anew."""
+
+
+def get_dt_pub(item: dict) -> datetime:
+    # naive dates are local ones
+    return datetime.fromisoformat(item['dt_pub']).astimezone()
+
+
+class PodcastService(Service):
+    """Publishes audio into a podcast RSS feed (see Project.path_file_feed)
+    to be served by a static host along with the audio files.
+
+    Configured in the project config:
+
+        "feed": {
+            "title": "Book", "description": "", "link": "https://example.com/",
+            "url_media": "https://example.com/aud/",
+            "language": "ru", "author": "", "image": "https://example.com/cover.jpg"
+        }
+
+    Items are published when their publication dates come (see dt_pub in the template),
+    so the feed is to be updated periodically, e.g. by cron. Relative publication dates
+    are counted from the first run date (kept in "schedule" config as "start").
+
+    """
+    alias = 'podcast'
+
+    file_ext = 'mp3'
+
+    def __init__(self, *, config: ProjectConfig, annotations: Annotations, project: Project):
+        super().__init__(config=config, annotations=annotations, project=project)
+        self._feed_lock = threading.Lock()
+
+    def _get_schedule_start(self) -> date:
+        # otherwise dates are counted from today on every run, and a '+1d' item never comes
+        schedule = self._cfg.get_pub_schedule(self.alias)
+        return date.fromisoformat(schedule.setdefault('start', f'{datetime.now().date()}'))
+
+    def materialize_template(self, path_sources: Path = None, *, source_files: List[Path] = None) -> List[dict]:
+        items = super().materialize_template(path_sources=path_sources, source_files=source_files)
+        now = datetime.now().astimezone()
+        return [item for item in items if get_dt_pub(item) <= now]
+
+    def _render_head(self) -> bytes:
+        feed = self._cfg.get_pub_feed(self.alias)
+
+        chunks = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd">',
+            '<channel>',
+            f"<title>{escape(feed.get('title') or self._project.path.name)}</title>",
+            f"<link>{escape(feed.get('link', ''))}</link>",
+            f"<description>{escape(feed.get('description', ''))}</description>",
+        ]
+
+        if language := feed.get('language'):
+            chunks.append(f'<language>{escape(language)}</language>')
+
+        if author := feed.get('author'):
+            chunks.append(f'<itunes:author>{escape(author)}</itunes:author>')
+
+        if image := feed.get('image'):
+            chunks.append(f'<itunes:image href={quoteattr(image)}/>')
+
+        return ('\n'.join(chunks) + '\n').encode()
+
+    def _render_entry(self, item: dict) -> bytes:
+        fpath = Path(item['fpath'])
+        url_media = self._cfg.get_pub_feed(self.alias).get('url_media', '')
+        url = f"{url_media.rstrip('/')}/{quote(fpath.name)}"
+
+        chunks = [
+            '<item>',
+            f'<guid isPermaLink="false">{escape(item["ident_remote"])}</guid>',
+            f"<title>{escape(item['title'])}</title>",
+            f"<description>{escape(item['description'])}</description>",
+            f'<pubDate>{format_datetime(get_dt_pub(item))}</pubDate>',
+            f'<enclosure url={quoteattr(url)} length="{get_item_size(item)}" type="audio/mpeg"/>',
+        ]
+
+        if fpath.exists():
+            chunks.append(f'<itunes:duration>{self._probe.get(fpath)}</itunes:duration>')
+
+        chunks.append('</item>')
+
+        return ('\n'.join(chunks) + '\n').encode()
+
+    def _write_entries(self, f: BinaryIO, items: Iterable[dict]):
+        # written one by one, so that the whole feed is never held in memory
+        for item in items:
+            f.write(self._render_entry(item))
+
+        f.write(FEED_TAIL)
+
+    def write_feed(self, items: List[dict] = None):
+        """Writes the whole feed anew.
+
+        :param items: Items to put into the feed. Default: published ones.
+
+        """
+        items = self._cfg.get_pub_items(self.alias) if items is None else items
+        fpath = self._project.path_file_feed
+        fpath.parent.mkdir(parents=True, exist_ok=True)
+
+        LOG.info(f'{self}: writing {len(items)} item(s) into {fpath} ...')
+
+        with atomic_output(fpath) as fpath_tmp, open(fpath_tmp, 'wb') as f:
+            f.write(self._render_head())
+            self._write_entries(f, items)
+
+    def append_items(self, items: List[dict]):
+        """Appends items into the feed in place of its closing tags, not touching the rest of it.
+
+        The feed is written anew if it's missing or its tail is broken (e.g. an append was interrupted).
+
+        :param items:
+
+        """
+        fpath = self._project.path_file_feed
+
+        with self._feed_lock:
+            try:
+                with open(fpath, 'r+b') as f:
+                    end = f.seek(0, os.SEEK_END) - len(FEED_TAIL)
+
+                    if end > 0:
+                        f.seek(end)
+
+                        if f.read() == FEED_TAIL:
+                            f.seek(end)
+                            self._write_entries(f, items)
+                            f.truncate()
+                            return
+
+                LOG.warning(f'{self}: feed {fpath} is broken')
+
+            except FileNotFoundError:
+                pass
+
+            self.write_feed(self._cfg.get_pub_items(self.alias) + items)
+
+    def _publish_item(self, item: dict) -> bool:
+        # contents hash keeps the episode identity even if the file is renamed
+        item['ident_remote'] = self.hash_item(item)
+
+        self._wait_turn(item)
+        self.append_items([item])
+        self._contribute_item(ident_remote=item['ident_remote'], item=item)
+
+        return True
+
+    def sync(self, *, dry_run: bool = False) -> List[Tuple[dict, TypeDiff]]:
+        diffs = super().sync(dry_run=dry_run)
+
+        if diffs and not dry_run:
+            # items are updated by now
+            with self._feed_lock:
+                self.write_feed()
+
+        return diffs
+
+    def _update_item(self, item: dict, *, fields: dict, credential: str = ''):
+        # the feed is written anew after sync as a whole
+        pass
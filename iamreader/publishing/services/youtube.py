@@ -7,16 +7,25 @@ from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from json import loads, dumps
 from pathlib import Path
-from typing import Callable, Tuple, List, Optional
+from typing import Callable, Tuple, List, Optional, Dict
 from urllib.parse import urlparse, parse_qs
 
 import requests
 
-from .base import Service
+from .base import (
+    Service, MultipartBody, get_http_session, OP_UPLOAD, OP_UPDATE, OP_PLAYLIST, OP_LIST,
+    STATUS_PENDING, STATUS_PROCESSED, STATUS_FAILED,
+)
 from .. import ProjectConfig
 from ...annotations import Annotations
-from ...exceptions import ServiceException
-from ...utils import LOG, PATH_OUT_VIDEO
+from ...exceptions import ServiceException, QuotaException
+from ...profiling import PROFILER
+from ...progress import ProgressFile
+from ...project import Project
+from ...utils import LOG
+
+QUOTA_REASONS = {'quotaExceeded', 'dailyLimitExceeded'}
+"""Reasons of 403 errors telling a client quota is used up. Other 403 errors are not to be retried."""
 
 
 class TokenCallbackServer(HTTPServer):
@@ -60,6 +69,24 @@ def read_config(path_base: Path, *, fname_tpl: str) -> Tuple[Optional[Path], Opt
     return path_source, config
 
 
+def read_secrets(path_base: Path) -> Dict[str, dict]:
+    """Returns OAuth 2 client configs (from client_secret_*.json files) by client ids.
+
+    :param path_base:
+
+    """
+    secrets = {}
+
+    for fname in sorted(glob.glob('client_secret_*.json', root_dir=path_base)):
+        with open(path_base / fname) as f:
+            config = loads(f.read())['web']
+
+        # file names are not to be relied upon, tokens are saved by client ids
+        secrets[config['client_id']] = config
+
+    return secrets
+
+
 class TokenFetcher:
     """This will fetch an OAuth 2 token.
 
@@ -76,16 +103,20 @@ class TokenFetcher:
 
     """
 
-    def __init__(self, work_path: Path):
+    def __init__(self, work_path: Path, *, client_id: str = ''):
+        """
+        :param work_path: Directory with OAuth 2 json configs.
+        :param client_id: Client which config is to be used. Default: any.
+
+        """
         self._path = work_path
 
-        fname_tpl = 'client_secret_*.json'
-        _, config = read_config(work_path, fname_tpl=fname_tpl)
+        secrets = read_secrets(work_path)
+        config = secrets.get(client_id) if client_id else next(reversed(secrets.values()), None)
 
-        if config is None:
-            assert config, f'No OAuth 2 json config found (searched for "{fname_tpl}" files)'
+        assert config, f'No OAuth 2 json config found for client "{client_id}" (searched "client_secret_*.json" files)'
 
-        self.config = config['web']
+        self.config = config
 
     def run(self):
         config = self.config
@@ -177,21 +208,121 @@ class TokenFetcher:
         httpd.serve_forever()
 
 
+def sanitize(val: str) -> str:
+    return val.replace('<', '').replace('>', '')
+
+
+def get_error_reason(response: requests.Response) -> str:
+    """Returns the reason of the first error from a remote API error response, if any.
+
+    :param response:
+
+    """
+    try:
+        return response.json()['error']['errors'][0]['reason']
+
+    except (ValueError, KeyError, IndexError, TypeError):
+        return ''
+
+
 class YoutubeService(Service):
 
     alias = 'youtube'
 
     file_ext = 'avi'
 
-    def __init__(self, *, config: ProjectConfig, annotations: Annotations, path_resources: Path):
-        super().__init__(config=config, annotations=annotations, path_resources=path_resources)
-        self._token = self._get_token()
-        self._session = requests.Session()
+    quota_limit = 10000
+
+    quota_costs = {
+        OP_UPLOAD: 1600,
+        OP_UPDATE: 50,
+        OP_PLAYLIST: 50,
+        OP_LIST: 1,
+    }
+
+    status_batch = 50
+
+    statuses = {
+        'uploaded': STATUS_PENDING,
+        'processed': STATUS_PROCESSED,
+        'failed': STATUS_FAILED,
+        'rejected': STATUS_FAILED,
+        'deleted': STATUS_FAILED,
+    }
+    """Remote upload statuses mapped into ours."""
+
+    def __init__(self, *, config: ProjectConfig, annotations: Annotations, project: Project):
+        super().__init__(config=config, annotations=annotations, project=project)
+        self._tokens: Dict[str, str] = {}
+        self._tokens_lock = threading.Lock()
+        self._session = get_http_session(self.alias)
+        self._uploaded_with: Dict[str, str] = {}
+        """Credentials videos are uploaded with by video IDs."""
+
+    def get_credentials(self) -> List[str]:
+        # every OAuth client (of a separate Google Cloud project) has its own daily quota
+        if idents := list(read_secrets(self._path_resources)):
+            return idents
+
+        # tokens are usable till they expire even with no client configs
+        prefix = 'client_token_'
+
+        return sorted(
+            fname[len(prefix):-len('.json')] for fname in glob.glob(f'{prefix}*.json', root_dir=self._path_resources))
+
+    def _get_auth(self, credential: str) -> str:
+        # tokens are fetched lazily, so that no authorization is required if nothing is to be sent
+        if token := self._tokens.get(credential):
+            return f'Bearer {token}'
 
-    def materialize_template(self, path_sources: Path = None) -> List[dict]:
-        return super().materialize_template(path_sources=path_sources or PATH_OUT_VIDEO)
+        # items are published concurrently, but a token is fetched (or a consent page is shown) once
+        with self._tokens_lock:
+            if not (token := self._tokens.get(credential)):
+                token = self._tokens[credential] = self._get_token(credential=credential)
 
-    def _check_response(self, response: requests.Response) -> bool:
+        return f'Bearer {token}'
+
+    def _refresh_token(self, credential: str, *, auth: str):
+        """Fetches a new token for the credential unless it's already refreshed by another thread.
+
+        :param credential:
+        :param auth: Stale authorization header value.
+
+        """
+        with self._tokens_lock:
+            if f'Bearer {self._tokens.get(credential)}' == auth:
+                self._tokens[credential] = self._get_token(credential=credential, drop=True)
+
+    def _pick(self, operation: str, *, owner: str = None) -> str:
+        """Returns the credential having most of its quota left for the given operation, reserving its units.
+
+        :param operation: See OP_*
+        :param owner: Credential the video operated on is uploaded with. Default: any.
+
+        """
+        credential = self._reserve(operation, owner=owner)
+
+        if credential is None:
+            raise ServiceException(f'{self}: Quota exceeded. Please retry the other day.')
+
+        return credential
+
+    def materialize_template(self, path_sources: Path = None, *, source_files: List[Path] = None) -> List[dict]:
+        return super().materialize_template(
+            path_sources=path_sources or self._project.path_out_video, source_files=source_files)
+
+    def _get_audio_path(self, filepath: Path) -> Optional[Path]:
+        # videos are encoded from chapter audio files of the same names
+        return self._project.path_out_audio / f'{filepath.stem}.mp3'
+
+    def _check_response(self, response: requests.Response, *, credential: str) -> bool:
+        """Returns False if the request is to be repeated (the token is refreshed).
+        Raises QuotaException if the credential quota is used up, ServiceException on other errors.
+
+        :param response:
+        :param credential:
+
+        """
 
         ok = response.ok
 
@@ -203,51 +334,139 @@ class YoutubeService(Service):
         if status == 401:
             # token mismatch
             LOG.info(f'{self}: token seems stale')
-            self._token = self._get_token(drop=True)
+            self._refresh_token(credential, auth=response.request.headers.get('Authorization', ''))
             return False
 
-        elif status == 403:
-            LOG.warning(f'{self}: quota exceeded')
-            raise ServiceException(f'{self}: Quota exceeded. Please retry the other day.')
+        elif status == 403 and get_error_reason(response) in QUOTA_REASONS:
+            # the request may be retried with another credential if any quota is left
+            self._quota.exhaust(credential)
+            raise QuotaException(f'{self}: quota exceeded for client {credential}')
 
         if not ok:
             raise ServiceException(f'{self}: {status} {response.text}')
 
         return True
 
-    def add_to_playlist(self, *, video: str, playlist: str):
+    def _send(self, send: Callable[[str], requests.Response], *, credential: str) -> requests.Response:
+        """Sends a request, repeating it if the token is refreshed. Returns the response.
+
+        :param send: Sends the request with the given Authorization header value.
+        :param credential:
+
+        """
+        while not self._check_response(response := send(self._get_auth(credential)), credential=credential):
+            pass
 
+        return response
+
+    def add_to_playlist(self, *, video: str, playlist: str, owner: str = None):
+        """Adds the video to the playlist.
+
+        :param video: Video ID.
+        :param playlist: Playlist ID.
+        :param owner: Credential the video is uploaded with. Default: any (e.g. it's unknown).
+
+        """
         LOG.debug(f'{self}: add video {video} to playlist {playlist} ...')
 
-        response = self._session.post(
-            'https://www.googleapis.com/youtube/v3/playlistItems',
-            params={'part': 'snippet'},
-            json={
-                'snippet': {
-                    'playlistId': playlist, 'resourceId': {'kind': 'youtube#video', 'videoId': video}
-                }
-            },
-            headers={'Authorization': f'Bearer {self._token}'}
+        credential = self._pick(OP_PLAYLIST, owner=owner)
+
+        try:
+            self._send(
+                lambda auth: self._session.post(
+                    'https://www.googleapis.com/youtube/v3/playlistItems',
+                    params={'part': 'snippet'},
+                    json={
+                        'snippet': {
+                            'playlistId': playlist, 'resourceId': {'kind': 'youtube#video', 'videoId': video}
+                        }
+                    },
+                    headers={'Authorization': auth}
+                ),
+                credential=credential,
+            )
+
+        except QuotaException as e:
+            if owner is None:
+                LOG.warning(f'{e}')
+                return self.add_to_playlist(video=video, playlist=playlist)
+            raise
+
+        except Exception:
+            self._refund(OP_PLAYLIST, credential=credential)
+            raise
+
+    def _get_snippet(self, item: dict) -> dict:
+        return {
+            'title': sanitize(item['title']),  # 100 ch no <>
+            'description': sanitize(item['description']),  # 5000 bytes no <>
+            'tags': item['tags'],  # 500 ch
+            'categoryId': '22',  # 22 People & Blogs  27 Education
+            'defaultLanguage': 'ru',
+        }
+
+    def _get_statuses(self, idents_remote: List[str], *, credential: str = '') -> Dict[str, str]:
+
+        LOG.debug(f'{self}: getting statuses of {len(idents_remote)} videos ...')
+
+        response = self._send(
+            lambda auth: self._session.get(
+                'https://www.googleapis.com/youtube/v3/videos',
+                params={'part': 'status', 'id': ','.join(idents_remote)},
+                headers={'Authorization': auth}
+            ),
+            credential=credential,
         )
 
-        if not self._check_response(response):
-            self.add_to_playlist(video=video, playlist=playlist)
+        return {
+            video['id']: self.statuses.get(video['status']['uploadStatus'], STATUS_PENDING)
+            for video in response.json().get('items', [])
+        }
+
+    def _update_item(self, item: dict, *, fields: dict, credential: str = ''):
+        # snippet is replaced as a whole: unchanged fields are sent as well
+        LOG.debug(f'{self}: updating video {item["ident_remote"]} ...')
+
+        self._send(
+            lambda auth: self._session.put(
+                'https://www.googleapis.com/youtube/v3/videos',
+                params={'part': 'snippet'},
+                json={
+                    'id': item['ident_remote'],
+                    'snippet': self._get_snippet({**item, **fields}),
+                },
+                headers={'Authorization': auth}
+            ),
+            credential=credential,
+        )
 
     def upload(self, item: dict) -> str:
 
-        LOG.debug(f'{self}: uploading video ...')
+        credential = self._pick(OP_UPLOAD)
+
+        try:
+            # the file is streamed: it's sent anew if the token is refreshed
+            response = self._send(partial(self._upload, item, credential=credential), credential=credential)
+
+        except QuotaException as e:
+            LOG.warning(f'{e}')
+            return self.upload(item)
 
-        def sanitize(val: str) -> str:
-            return val.replace('<', '').replace('>', '')
+        except Exception:
+            self._refund(OP_UPLOAD, credential=credential)
+            raise
+
+        video_id = response.json()['id']
+        self._uploaded_with[video_id] = credential
+
+        return video_id
+
+    def _upload(self, item: dict, auth: str, *, credential: str) -> requests.Response:
+
+        LOG.debug(f'{self}: uploading video using client {credential} ...')
 
         data = dumps({
-                'snippet': {
-                    'title': sanitize(item['title']),  # 100 ch no <>
-                    'description': sanitize(item['description']),  # 5000 bytes no <>
-                    'tags': item['tags'],  # 500 ch
-                    'categoryId': '22',  # 22 People & Blogs  27 Education
-                    'defaultLanguage': 'ru',
-                },
+                'snippet': self._get_snippet(item),
                 'status': {
                     'selfDeclaredMadeForKids': False,
                     'privacyStatus': 'private',  # private public unlisted
@@ -258,32 +477,41 @@ class YoutubeService(Service):
             ensure_ascii=False
         ).encode()
 
-        with open(item['fpath'], 'rb') as f:
+        fpath = Path(item['fpath'])
+        size = fpath.stat().st_size
+
+        with PROFILER.stage('upload', file=fpath.name, bytes=size), open(fpath, 'rb') as f:
+
+            file = ProgressFile(f, size=size, progress=self._progress, limiter=self._limiter, item=item['ident'])
+
+            # streamed, so that the file is never held in memory and its transfer is tracked and shaped
+            body = MultipartBody(
+                fields=[('metadata', data, 'application/json')],
+                file=file,
+                size=size,
+                filename=fpath.name,
+                content_type='video/avi',
+            )
 
             response = self._session.post(
                 'https://www.googleapis.com/upload/youtube/v3/videos',
                 params={'part': 'snippet,status', 'uploadType': 'multipart'},
-                files={
-                    'metadata': (None, data, 'application/json'),
-                    'file': (f.name, f, 'video/avi'),
+                data=body,
+                headers={
+                    'Authorization': auth,
+                    'Content-Type': body.content_type,
                 },
-                headers={'Authorization': f'Bearer {self._token}'},
             )
 
-        if not self._check_response(response):
-            self.upload(item)
+        LOG.debug(f'{self}: uploaded {size} bytes at {file.rate / 1024 / 1024:.2f} MB/s')
 
-        json = response.json()
+        return response
 
-        video_id = json['id']
+    def _get_token(self, *, credential: str = '', drop: bool = False) -> str:
 
-        return video_id
-
-    def _get_token(self, *, drop: bool = False) -> str:
+        LOG.debug(f'{self}: getting token for client {credential} ...')
 
-        LOG.debug(f'{self}: getting token ...')
-
-        read = partial(read_config, self._path_resources, fname_tpl='client_token_*.json')
+        read = partial(read_config, self._path_resources, fname_tpl=f'client_token_{credential or "*"}.json')
 
         cfg_path, config = read()
 
@@ -304,22 +532,27 @@ class YoutubeService(Service):
 
         if config is None:
             LOG.debug(f'{self}: running token fetcher ...')
-            fetcher = TokenFetcher(self._path_resources)
+            fetcher = TokenFetcher(self._path_resources, client_id=credential)
             fetcher.run()
 
-            return self._get_token()
+            return self._get_token(credential=credential)
 
         return config['access_token']
 
     def _publish_item(self, item: dict) -> bool:
 
-        # quota 10000 a day -- upload 1600 -- to playlist 50 -- read 1
+        # quota 10000 a day per client -- upload 1600 -- to playlist 50 -- read 1
+
+        video_id = self._upload_once(item, upload=self.upload)
+        # unknown if uploaded by an earlier run
+        credential = self._uploaded_with.get(video_id)
 
-        video_id = self.upload(item)
+        # playlists are filled in priority order
+        self._wait_turn(item)
 
-        self._contribute_item(ident_remote=video_id, item=item)
+        self._contribute_item(ident_remote=video_id, item=item, credential=credential)
 
         for playlist in item['playlists']:
-            self.add_to_playlist(video=video_id, playlist=playlist)
+            self.add_to_playlist(video=video_id, playlist=playlist, owner=credential)
 
         return True
@@ -0,0 +1,168 @@
+import threading
+from datetime import datetime, time
+from time import monotonic, sleep
+from typing import List, Union
+
+from ..exceptions import IamreaderException
+
+UNITS = {
+    'K': 1024,
+    'M': 1024 * 1024,
+}
+
+
+def parse_rate(value: Union[int, float, str]) -> float:
+    """Parses transfer rate: bytes per second, optionally with K or M suffix, e.g. '512K'.
+
+    :param value:
+
+    """
+    if isinstance(value, str):
+        value = value.strip().upper()
+        multiplier = UNITS.get(value[-1:], 0)
+
+        try:
+            return float(value[:-1]) * multiplier if multiplier else float(value)
+
+        except ValueError:
+            raise IamreaderException(f'Invalid rate: {value}')
+
+    return float(value)
+
+
+class RateWindow:
+    """Transfer rate applied within a time of day window."""
+
+    def __init__(self, *, rate: float, start: time = None, end: time = None):
+        """
+        :param rate: Bytes per second. 0 - unlimited.
+        :param start: Window start time. None - the whole day.
+        :param end: Window end time. May be less than start for windows spanning midnight.
+
+        """
+        self.rate = rate
+        self.start = start
+        self.end = end
+
+    def contains(self, moment: time) -> bool:
+        start, end = self.start, self.end
+
+        if start is None or end is None:
+            return True
+
+        if start <= end:
+            return start <= moment < end
+
+        return moment >= start or moment < end
+
+
+class RateLimiter:
+    """Token bucket limiting transfer rate. Thread-safe.
+
+    Bucket capacity is rate times `burst` seconds, so that short bursts
+    are allowed while the average rate is kept.
+
+    Configured in the project config for a service as a list of windows
+    (the first one matching the current time is used):
+
+        "limits": [
+            {"from": "09:00", "till": "21:00", "rate": "512K"},
+            {"rate": "4M"}
+        ]
+
+    """
+    def __init__(self, windows: List[RateWindow] = None, *, burst: float = 1):
+        """
+        :param windows: Rate windows. Unlimited if not set.
+        :param burst: Seconds of traffic the bucket holds.
+
+        """
+        self.windows = windows or []
+        self.burst = burst
+
+        self.bytes = 0
+        """Bytes passed."""
+
+        self.waited = 0.0
+        """Seconds spent waiting for tokens."""
+
+        self._started = 0.0
+        self._finished = 0.0
+
+        self._tokens = 0.0
+        self._updated = monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, data: List[dict]) -> 'RateLimiter':
+        """Creates a limiter from config data (see class docstring).
+
+        :param data:
+
+        """
+        windows = []
+
+        for window in data:
+            start, end = window.get('from'), window.get('till')
+
+            windows.append(RateWindow(
+                rate=parse_rate(window.get('rate', 0)),
+                start=time.fromisoformat(start) if start else None,
+                end=time.fromisoformat(end) if end else None,
+            ))
+
+        return cls(windows)
+
+    def get_rate(self, moment: time = None) -> float:
+        """Returns rate (bytes per second) for the given time of day. 0 - unlimited.
+
+        :param moment: Default: now.
+
+        """
+        moment = moment or datetime.now().time()
+
+        for window in self.windows:
+            if window.contains(moment):
+                return window.rate
+
+        return 0
+
+    def consume(self, amount: int):
+        """Blocks until the given amount of bytes is allowed to pass.
+
+        :param amount:
+
+        """
+        rate = self.get_rate() if self.windows else 0
+
+        with self._lock:
+            now = monotonic()
+            self.bytes += amount
+            self._started = self._started or now
+
+            if rate:
+                capacity = rate * self.burst
+
+                self._tokens = min(self._tokens + (now - self._updated) * rate, capacity) - amount
+                self._updated = now
+
+                # a debt is paid by waiting; the lock is held so that concurrent transfers share the rate
+                if self._tokens < 0:
+                    delay = -self._tokens / rate
+                    self.waited += delay
+                    sleep(delay)
+
+            self._finished = monotonic()
+
+    def get_stats(self) -> dict:
+        """Returns achieved throughput stats."""
+
+        with self._lock:
+            elapsed = (self._finished or monotonic()) - self._started if self._started else 0
+
+            return {
+                'bytes': self.bytes,
+                'elapsed': elapsed,
+                'rate': self.bytes / elapsed if elapsed else 0,
+                'waited': self.waited,
+            }
@@ -1,3 +1,4 @@
 from .audacity import RemoteControl
+from .session import SessionLog, SessionStats
 from .state import RemoteState
 from .ui import RemoteControlUi
@@ -1,9 +1,33 @@
-from typing import TypeVar
+from typing import TypeVar, Dict, Type, Optional
 
 
 class ActionBase:
 
     ident: str = ''
+    registry: Dict[str, Type['ActionBase']] = {}
+
+    def __init_subclass__(cls) -> None:
+        super().__init_subclass__()
+        cls.registry[cls.ident] = cls
+
+    @classmethod
+    def spawn(cls, params: dict) -> 'ActionBase':
+        return cls()
+
+    @classmethod
+    def deserialize(cls, data: dict) -> Optional['ActionBase']:
+        """Restores an action object from data produced by .serialize().
+        Returns None for unknown actions.
+
+        :param data:
+
+        """
+        action_cls = cls.registry.get(data.get('a', ''))
+
+        if action_cls is None:
+            return None
+
+        return action_cls.spawn(data.get('p') or {})
 
     def serialize(self, params: dict = None) -> dict:
         data = {
@@ -23,6 +47,10 @@ class FootnoteAction(ActionBase):
     def __init__(self, *, begin: bool):
         self.begin = begin
 
+    @classmethod
+    def spawn(cls, params: dict) -> 'FootnoteAction':
+        return cls(begin=params.get('a') == 'b')
+
     def serialize(self, params: dict = None) -> dict:
         return super().serialize({
             'a': 'b' if self.begin else 'e',
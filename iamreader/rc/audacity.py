@@ -25,6 +25,10 @@ class RemoteControl:
         self._speed_delta: int = 25
         self.rs = remote_state
 
+    @property
+    def speed(self) -> int:
+        return self._speed
+
     def bootstrap(self):
         self._check_process(allow_spawn=True)
         self.reset_pipes()
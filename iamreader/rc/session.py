@@ -0,0 +1,184 @@
+from collections import defaultdict
+from datetime import datetime
+from os import makedirs
+from pathlib import Path
+from time import monotonic
+from typing import IO, Optional, List, Dict, Generator, Tuple
+
+EVENT_SESSION = 'session'
+EVENT_RECORD = 'rec'
+EVENT_RERECORD = 'rerec'
+EVENT_STOP = 'stop'
+EVENT_PLAY = 'play'
+EVENT_NAVIGATE = 'nav'
+EVENT_SAVE = 'save'
+EVENT_SPEED = 'speed'
+EVENT_LABEL = 'lbl'
+
+EVENTS_LABEL = {EVENT_LABEL}
+"""Events not interrupting a recording."""
+
+
+class SessionLog:
+    """Appends RC events into a compact on-disk log.
+
+    Every line is: <milliseconds since session start>\t<event>[\t<argument>]
+    Each session starts with a line holding session start datetime.
+
+    """
+
+    def __init__(self, fpath: Path):
+        self.fpath = fpath
+        self._started = monotonic()
+        self._file: Optional[IO] = None
+
+    def open(self):
+        makedirs(self.fpath.parent, exist_ok=True)
+        self._file = open(f'{self.fpath}', 'a', buffering=1)
+        self._started = monotonic()
+        self.log(EVENT_SESSION, datetime.now().isoformat(timespec='seconds'))
+
+    def close(self):
+        file = self._file
+        if file:
+            file.close()
+            self._file = None
+
+    def log(self, event: str, arg: str = ''):
+        file = self._file
+
+        if file is None:
+            return
+
+        offset = int((monotonic() - self._started) * 1000)
+        postfix = f'\t{arg}' if arg else ''
+        file.write(f'{offset}\t{event}{postfix}\n')
+
+
+class SessionSummary:
+
+    def __init__(self, *, started: datetime):
+        self.started = started
+        self.duration: float = 0
+        """Session duration (seconds)."""
+
+        self.recorded: float = 0
+        """Recording time, including discarded (seconds)."""
+
+        self.utterances: List[float] = []
+        """Durations of utterances left in a recording (seconds)."""
+
+        self.discarded: List[float] = []
+        """Durations of utterances dropped by rerecording (seconds)."""
+
+    @property
+    def finished(self) -> float:
+        return sum(self.utterances)
+
+
+class SessionStats:
+    """Aggregates session log into throughput metrics."""
+
+    def __init__(self, fpath: Path):
+        self.fpath = fpath
+
+    def iter_events(self) -> Generator[Tuple[float, str, str], None, None]:
+
+        with open(f'{self.fpath}') as f:
+            for line in f:
+                chunks = line.rstrip('\n').split('\t', 2)
+
+                if len(chunks) < 2:
+                    continue
+
+                offset, event, *arg = chunks
+                yield int(offset) / 1000, event, (arg[0] if arg else '')
+
+    def iter_sessions(self) -> Generator[SessionSummary, None, None]:
+
+        session: Optional[SessionSummary] = None
+        rec_started: Optional[float] = None
+        utter_started: Optional[float] = None
+        pending: List[float] = []
+        """Utterances not yet closed by a label, may be dropped by rerecording."""
+
+        def flush():
+            session.utterances.extend(pending)
+            pending.clear()
+
+        for offset, event, arg in self.iter_events():
+
+            if event == EVENT_SESSION:
+                if session:
+                    flush()
+                    yield session
+
+                session = SessionSummary(started=datetime.fromisoformat(arg))
+                rec_started = utter_started = None
+                continue
+
+            if session is None:
+                continue
+
+            session.duration = offset
+
+            if rec_started is not None:
+
+                if event in EVENTS_LABEL:
+                    pending.append(offset - utter_started)
+                    flush()
+                    utter_started = offset
+                    continue
+
+                # any other action stops recording
+                session.recorded += offset - rec_started
+                pending.append(offset - utter_started)
+                rec_started = utter_started = None
+
+            if event in EVENTS_LABEL:
+                flush()
+
+            elif event == EVENT_RERECORD:
+                # everything after the previous label is rewritten
+                session.discarded.extend(pending)
+                pending.clear()
+
+            if event in {EVENT_RECORD, EVENT_RERECORD}:
+                rec_started = utter_started = offset
+
+        if session:
+            if rec_started is not None:
+                session.recorded += session.duration - rec_started
+                pending.append(session.duration - utter_started)
+            flush()
+            yield session
+
+    def aggregate(self) -> Dict[str, dict]:
+        """Returns metrics grouped by ISO week (e.g. 2023-W05)."""
+
+        grouped = defaultdict(list)
+
+        for session in self.iter_sessions():
+            year, week, _ = session.started.isocalendar()
+            grouped[f'{year}-W{week:02}'].append(session)
+
+        result = {}
+
+        for week, sessions in sorted(grouped.items()):
+            duration = sum(session.duration for session in sessions)
+            finished = sum(session.finished for session in sessions)
+            utterances = sum(len(session.utterances) for session in sessions)
+            discarded = sum(len(session.discarded) for session in sessions)
+            takes = utterances + discarded
+
+            result[week] = {
+                'sessions': len(sessions),
+                'duration': duration,
+                'recorded': sum(session.recorded for session in sessions),
+                'finished': finished,
+                'finished_per_hour': (finished / 60) / (duration / 3600) if duration else 0,
+                'rerecord_ratio': discarded / takes if takes else 0,
+                'utterance_avg': finished / utterances if utterances else 0,
+            }
+
+        return result
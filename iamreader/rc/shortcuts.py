@@ -3,6 +3,7 @@ from tkinter import Event
 from typing import List, Callable
 
 from .actions import TypeAction, CheckpointAction, ChapterAction, FootnoteAction
+from .session import EVENT_RECORD, EVENT_RERECORD, EVENT_STOP, EVENT_PLAY, EVENT_SAVE, EVENT_SPEED, EVENT_NAVIGATE
 
 if False:  # pragma: nocover
     from .ui import RemoteControlUi  # noqa
@@ -45,41 +46,50 @@ def mark_footnote(event: Event, *, ui: 'RemoteControlUi'):
 
 def record(event: Event, *, ui: 'RemoteControlUi'):
     ui.rc.cmd_record()
+    ui.session.log(EVENT_RECORD)
 
 
 def rerecord(event: Event, *, ui: 'RemoteControlUi'):
     stop(event, ui=ui)
     ui.rc.cmd_to_label_prev()
     ui.rc.cmd_record()
+    ui.session.log(EVENT_RERECORD)
 
 
 def stop(event: Event, *, ui: 'RemoteControlUi'):
     ui.rc.cmd_stop()
+    ui.session.log(EVENT_STOP)
 
 
 def play(event: Event, *, ui: 'RemoteControlUi'):
     ui.rc.cmd_play()
+    ui.session.log(EVENT_PLAY)
 
 
 def save(event: Event, *, ui: 'RemoteControlUi'):
     ui.rc.cmd_save()
+    ui.session.log(EVENT_SAVE)
 
 
 def speed_inc(event: Event, *, ui: 'RemoteControlUi'):
     ui.rc.cmd_speed_inc()
+    ui.session.log(EVENT_SPEED, f'{ui.rc.speed}')
 
 
 def speed_dec(event: Event, *, ui: 'RemoteControlUi'):
     ui.rc.cmd_speed_dec()
+    ui.session.log(EVENT_SPEED, f'{ui.rc.speed}')
 
 
 def label_prev(event: Event, *, ui: 'RemoteControlUi'):
     ui.rc.cmd_to_label_prev()
+    ui.session.log(EVENT_NAVIGATE, 'prev')
     play(event, ui=ui)
 
 
 def label_next(event: Event, *, ui: 'RemoteControlUi'):
     ui.rc.cmd_to_label_next()
+    ui.session.log(EVENT_NAVIGATE, 'next')
     play(event, ui=ui)
 
 
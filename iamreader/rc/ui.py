@@ -8,6 +8,7 @@ from .audacity import RemoteControl, TypeAction
 from .shortcuts import (
     Shortcut, SC_MARK, SC_RERECORD, SC_INCR, SC_DECR, SC_SAVE, SC_RECORD, SC_FOOT, SC_CHAPT, SC_PREV, SC_STOP, SC_NEXT
 )
+from .session import SessionLog, EVENT_LABEL
 from .state import RemoteState
 from ..utils import LOG
 
@@ -50,7 +51,13 @@ class Timer:
 
 class RemoteControlUi:
 
-    def __init__(self, *, remote_control: 'RemoteControl', remote_state: 'RemoteState'):
+    def __init__(
+        self,
+        *,
+        remote_control: 'RemoteControl',
+        remote_state: 'RemoteState',
+        session_log: 'SessionLog',
+    ):
 
         LOG.debug('Creating RC UI ...')
 
@@ -80,6 +87,7 @@ class RemoteControlUi:
         self.app = app
         self.rc = remote_control
         self.rs = remote_state
+        self.session = session_log
 
         frame = Frame(app, name='iamreader-rc')
 
@@ -198,6 +206,7 @@ class RemoteControlUi:
                 )
 
     def label_action(self, action: TypeAction):
+        self.session.log(EVENT_LABEL, self.rc.pack_action_data(action))
         self.rc.cmd_add_action_label(
             action=action,
             callback=self.copy_to_clipboard,
@@ -211,4 +220,11 @@ class RemoteControlUi:
     def loop(self):
         LOG.debug('Starting the UI loop ...')
 
-        self.app.mainloop()
+        session = self.session
+        session.open()
+
+        try:
+            self.app.mainloop()
+
+        finally:
+            session.close()
@@ -1,21 +1,24 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from hashlib import sha256
 from os import walk
 from pathlib import Path
-from typing import List
+from typing import List, Callable, Iterable, TypeVar, Awaitable, Generator, Tuple, Any
+
+from .profiling import PROFILER
+
+TypeResult = TypeVar('TypeResult')
 
 LOG = logging.getLogger('iamreader')
 
 PATH_ASSETS = Path(__file__).parent / 'assets'
 
-PATH_CURRENT = Path.cwd()
-PATH_RESOURCES = PATH_CURRENT / 'res'
-PATH_RESOURCES_OUT = PATH_RESOURCES / 'out'
-PATH_OUT_AUDIO = PATH_RESOURCES_OUT / 'aud'
-PATH_OUT_VIDEO = PATH_RESOURCES_OUT / 'vid'
-PATH_OUT_IMAGES = PATH_RESOURCES_OUT / 'img'
-
 FILENAME_INDEX = 'titles.txt'
-PATH_FILE_INDEX = PATH_RESOURCES / FILENAME_INDEX
+FILENAME_CONFIG = 'iamreader.json'
+FILENAME_PROBE = '.probe.json'
+FILENAME_SESSIONS = 'rc_sessions.log'
+FILENAME_FEED = 'podcast.xml'
 
 
 def configure_logging(log_level=None):
@@ -29,12 +32,144 @@ def configure_logging(log_level=None):
 
 
 def list_files(src_path: Path, *, ext: str) -> List[Path]:
+    """Returns files with the given extension. Hidden files (e.g. unfinished outputs) are skipped.
+
+    :param src_path:
+    :param ext:
+
+    """
     candidates = []
 
-    for path, subs, files in walk(src_path):
-        for file in files:
-            fullpath = Path(path) / file
-            if fullpath.suffix == f'.{ext}':
-                candidates.append(fullpath)
+    with PROFILER.stage('discovery', path=src_path):
+        for path, subs, files in walk(src_path):
+            for file in files:
+                fullpath = Path(path) / file
+                if fullpath.suffix == f'.{ext}' and not file.startswith('.'):
+                    candidates.append(fullpath)
 
     return candidates
+
+
+def hash_file(fpath: Path, *, chunk: int = 1024 * 1024) -> str:
+    """Returns SHA-256 hex digest of the file contents. The file is read in chunks.
+
+    Hashing releases GIL, so files may be hashed in threads concurrently with other work.
+
+    :param fpath:
+    :param chunk: Chunk size in bytes.
+
+    """
+    digest = sha256()
+
+    with PROFILER.stage('hash', file=fpath.name, bytes=fpath.stat().st_size), open(fpath, 'rb') as f:
+        while data := f.read(chunk):
+            digest.update(data)
+
+    return digest.hexdigest()
+
+
+def run_concurrently(
+    func: Callable[..., TypeResult],
+    items: Iterable,
+    *,
+    workers: int = None,
+    processes: bool = False,
+) -> List[TypeResult]:
+    """Runs the function for every item concurrently. Returns results in order of items.
+
+    Threads are suitable for functions mostly waiting for subprocesses (e.g. ffmpeg) or I/O.
+
+    :param func: Should be picklable if processes are used (e.g. module level function or a partial of it).
+    :param items:
+    :param workers: Max number of workers. Default: CPU count based.
+    :param processes: Use processes instead of threads. Suitable for CPU bound functions.
+
+    """
+    executor_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+
+    with executor_cls(max_workers=workers) as executor:
+        return list(executor.map(func, items))
+
+
+def iter_concurrently(
+    func: Callable[..., TypeResult],
+    items: Iterable,
+    *,
+    workers: int = None,
+    processes: bool = False,
+) -> Generator[Tuple[Any, TypeResult], None, None]:
+    """Runs the function for every item concurrently. Yields (item, result) pairs as soon as results are ready,
+    so that they may be recorded before the other items are done.
+
+    On failure items not yet started are cancelled, results of those already running are still yielded,
+    and then the first exception is raised.
+
+    :param func: Should be picklable if processes are used (e.g. module level function or a partial of it).
+    :param items:
+    :param workers: Max number of workers. Default: CPU count based.
+    :param processes: Use processes instead of threads. Suitable for CPU bound functions.
+
+    """
+    executor_cls = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    error = None
+
+    with executor_cls(max_workers=workers) as executor:
+        futures = {executor.submit(func, item): item for item in items}
+
+        for future in as_completed(futures):
+
+            if future.cancelled():
+                continue
+
+            if (exc := future.exception()) is not None:
+                if error is None:
+                    error = exc
+                    for pending in futures:
+                        pending.cancel()
+                continue
+
+            yield futures[future], future.result()
+
+    if error is not None:
+        raise error
+
+
+async def run_concurrently_async(
+    func: Callable[..., Awaitable[TypeResult]],
+    items: Iterable,
+    *,
+    limit: int = 1,
+) -> List[TypeResult]:
+    """Awaits the coroutine function for every item, at most `limit` at once. Returns results in order of items.
+
+    The first exception is raised, other items not yet finished are cancelled.
+
+    :param func: Coroutine function.
+    :param items:
+    :param limit: Max number of items processed concurrently.
+
+    """
+    semaphore = asyncio.Semaphore(max(limit, 1))
+    failed = asyncio.Event()
+
+    async def run(item):
+        async with semaphore:
+            if failed.is_set():
+                # items waiting for their turn are not to be started after a failure
+                return None
+
+            try:
+                return await func(item)
+
+            except BaseException:
+                failed.set()
+                raise
+
+    tasks = [asyncio.ensure_future(run(item)) for item in items]
+
+    try:
+        return list(await asyncio.gather(*tasks))
+
+    finally:
+        for task in tasks:
+            task.cancel()
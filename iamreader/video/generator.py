@@ -1,34 +1,233 @@
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import ExitStack
 from os import makedirs
 from pathlib import Path
-from subprocess import run
-from typing import List
+from typing import List, Optional, Dict, Tuple
 
 from PIL import Image
 from PIL import ImageDraw
-from PIL import ImageFont
 
-from ..annotations import Annotations
-from ..utils import LOG, PATH_ASSETS, list_files, PATH_FILE_INDEX
+from .layout import TextLayout, TypeBox
+from ..annotations import Annotations, AnnotationNode
+from ..ffmpeg import ffmpeg, atomic_output, validate_duration
+from ..probe import ProbeIndex, probe_mp3
+from ..profiling import PROFILER
+from ..progress import Progress
+from ..project import Project
+from ..utils import LOG, PATH_ASSETS, list_files
 
 
-def generate_cover(*, fpath: Path, text: str, template: Path):
+# /usr/local/share/fonts
+# ~/.local/share/fonts
+FONT_DEFAULT = PATH_ASSETS / 'fonts' / 'Ubuntu-R.ttf'
 
+TEXT_POSITION = (450, 250)
+"""Default text box top left corner on a cover."""
+
+TEXT_MARGIN = 40
+"""Default text box margin from a cover right and bottom edges."""
+
+_templates: Dict[Path, Tuple[Tuple[int, int], Image.Image]] = {}
+_layouts: Dict[Tuple[Path, TypeBox], TextLayout] = {}
+
+
+def get_template(fpath: Path) -> Image.Image:
+    """Returns a cover template image. Templates are loaded once
+    and reloaded on file size or modification time change (e.g. edited while watching).
+
+    :param fpath:
+
+    """
+    stat = fpath.stat()
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cached = _templates.get(fpath)
+
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with Image.open(f'{fpath}') as img:
+        img = img.convert('RGB')
+
+    _templates[fpath] = (stamp, img)
+
+    return img
+
+
+def get_layout(*, box: TypeBox, font: Path = FONT_DEFAULT) -> TextLayout:
+    """Returns a text layout object. Objects (and their font caches) are reused.
+
+    :param box: (x, y, width, height)
+    :param font:
+
+    """
+    key = (font, box)
+    layout = _layouts.get(key)
+
+    if layout is None:
+        layout = _layouts.setdefault(key, TextLayout(font=font, box=box))
+
+    return layout
+
+
+def generate_cover(*, fpath: Path, text: str, template: Path, box: TypeBox = None):
+    """Draws text over a template image.
+
+    :param fpath: Image file to produce.
+    :param text:
+    :param template:
+    :param box: Text box (x, y, width, height). Text is wrapped and shrunk to fit.
+        Default: from TEXT_POSITION till template edges minus TEXT_MARGIN.
+
+    """
     LOG.debug(f'Generating "{fpath}" ...')
 
-    img = Image.open(f'{template}')
-    img = img.convert('RGB')
+    with PROFILER.stage('cover', file=fpath.name):
+        img = get_template(template).copy()
 
-    # /usr/local/share/fonts
-    # ~/.local/share/fonts
-    font = ImageFont.truetype(
-        f"{ PATH_ASSETS / 'fonts' / 'Ubuntu-R.ttf' }",
-        size=20
-    )
+        if box is None:
+            x, y = TEXT_POSITION
+            width, height = img.size
+            box = (x, y, width - x - TEXT_MARGIN, height - y - TEXT_MARGIN)
+
+        get_layout(box=box).draw(ImageDraw.Draw(img), text)
+
+        # fast compression: covers are intermediate files
+        img.save(f'{fpath}', compress_level=1)
+
+
+def get_cover_text(annotation: Optional[AnnotationNode]) -> str:
+    """Returns a text to be drawn on a cover for the given annotation.
+    Empty string if there is nothing to draw.
+
+    :param annotation:
+
+    """
+    if not annotation:
+        return ''
+
+    return '\n\n'.join(annotation.get_full_title()).strip()
+
+
+def generate_video(
+    *,
+    fpath: Path,
+    image: Path,
+    audio: Path,
+    duration: float = 0,
+    progress: Progress = None,
+):
+    """Encodes a video from a still image and audio.
+
+    The video is written atomically and its duration is validated against the audio,
+    so that a failed encoding never leaves a truncated video behind.
+
+    :param fpath: Video file to produce.
+    :param image:
+    :param audio:
+    :param duration: Audio duration (seconds), if known. Used to limit the video
+        more reliably than -shortest does, and to estimate progress.
+        Probed from the audio if not set.
+    :param progress:
+
+    """
+    LOG.debug(f'Generating "{fpath}" ...')
+
+    size = audio.stat().st_size
+    duration = duration or probe_mp3(audio).duration
+
+    def on_progress(data: dict):
+        bytes_done = None
+
+        if duration and (time_done := data.get('out_time_us', '')).isdigit():
+            bytes_done = min(int(size * int(time_done) / 1_000_000 / duration), size)
+
+        progress.update_item(
+            bytes_done=bytes_done,
+            speed=data.get('speed', '').strip(),
+            time=data.get('out_time', '').partition('.')[0],
+        )
+
+    args_limit = ['-t', f'{duration:.3f}'] if duration else []
+
+    with PROFILER.stage('encode', file=fpath.name, bytes=size), atomic_output(fpath) as fpath_tmp:
+        ffmpeg(
+            # '-loop', '1', '-i', image, '-i', audio, '-c:v', 'libx264', '-tune', 'stillimage', '-c:a', 'copy', '-shortest'
+            '-r', '1', '-loop', '1', '-i', f'{image}', '-i', f'{audio}',
+            '-c:a', 'copy', '-r', '1', '-vcodec', 'libx264', '-shortest', *args_limit, f'{fpath_tmp}',
+            progress=on_progress if progress else None,
+        )
+        validate_duration(fpath_tmp, expected=duration)
+
+
+class EncodeJob:
+    """Video encoding job: a still image and audio into a video file."""
+
+    def __init__(self, *, fpath: Path, image: Path, audio: Path, duration: float = 0):
+        self.fpath = fpath
+        self.image = image
+        self.audio = audio
+
+        self.duration = duration or probe_mp3(audio).duration
+        """Audio duration (seconds), 0 if unknown."""
+
+        self.size = audio.stat().st_size
+        """Audio size in bytes."""
 
-    draw = ImageDraw.Draw(img)
-    draw.text(xy=(450, 250), text=text, fill=(255, 255, 255), font=font)
 
-    img.save(f'{fpath}')
+def generate_video_batch(*, jobs: List[EncodeJob], progress: Progress = None):
+    """Encodes several videos by a single ffmpeg process, to save process startup
+    and input probing costs, which dominate when chapters are short.
+
+    Every job gets its own pair of inputs mapped into its own output.
+    Videos are written atomically and validated as in generate_video;
+    if any of them fails, none is produced.
+
+    :param jobs:
+    :param progress:
+
+    """
+    LOG.debug(f'Generating {len(jobs)} videos in a batch ...')
+
+    args_in = []
+    args_out = []
+    outputs = ExitStack()
+    outputs_tmp = []
+
+    for idx, job in enumerate(jobs):
+        args_limit = ['-t', f'{job.duration:.3f}'] if job.duration else []
+        fpath_tmp = outputs.enter_context(atomic_output(job.fpath))
+        outputs_tmp.append(fpath_tmp)
+
+        # limiting the looped image input makes its stream finite
+        args_in.extend(['-r', '1', '-loop', '1', *args_limit, '-i', f'{job.image}', '-i', f'{job.audio}'])
+        args_out.extend([
+            '-map', f'{idx * 2}:v', '-map', f'{idx * 2 + 1}:a',
+            '-c:a', 'copy', '-r', '1', '-vcodec', 'libx264', '-shortest', *args_limit, f'{fpath_tmp}',
+        ])
+
+    def on_progress(data: dict):
+        bytes_done = None
+
+        if (time_done := data.get('out_time_us', '')).isdigit():
+            # outputs are encoded interleaved, so they advance in time together
+            seconds = int(time_done) / 1_000_000
+            bytes_done = sum(
+                min(int(job.size * seconds / job.duration), job.size)
+                for job in jobs if job.duration
+            )
+
+        progress.update_item(
+            bytes_done=bytes_done,
+            speed=data.get('speed', '').strip(),
+            time=data.get('out_time', '').partition('.')[0],
+        )
+
+    with PROFILER.stage('encode', file=jobs[0].fpath.name, count=len(jobs), bytes=sum(job.size for job in jobs)):
+        with outputs:
+            ffmpeg(*args_in, *args_out, progress=on_progress if progress else None)
+
+            for job, fpath_tmp in zip(jobs, outputs_tmp):
+                validate_duration(fpath_tmp, expected=job.duration)
 
 
 def generate_media(
@@ -38,59 +237,174 @@ def generate_media(
     cover_template: Path,
     dest_vid: Path,
     dest_img: Path,
+    probe: ProbeIndex = None,
+    text_box: TypeBox = None,
+    batch: int = 1,
 ):
+    """Generates covers and videos for audio files.
+
+    :param audio_files:
+    :param annotations:
+    :param cover_template:
+    :param dest_vid:
+    :param dest_img:
+    :param probe:
+    :param text_box: Cover text box (x, y, width, height).
+    :param batch: Max videos to be encoded by a single ffmpeg process.
+        1 - a process per video.
 
+    """
     makedirs(dest_vid, exist_ok=True)
     makedirs(dest_img, exist_ok=True)
 
-    for filename, filepath, candidate_annotation in annotations.iter_for_files(audio_files):
+    items = list(annotations.iter_for_files(audio_files))
+    progress = Progress('video', total=len(items), total_bytes=sum(item[1].stat().st_size for item in items))
 
-        text = ''
-        if candidate_annotation := annotations.by_filename.get(filename):
-            text = '\n\n'.join(candidate_annotation.get_full_title())
+    # covers are rendered ahead in parallel with encoding
+    covers = ThreadPoolExecutor(thread_name_prefix='iamreader-cover')
+    cover_futures: Dict[str, Future] = {}
 
-        if not text.strip():
-            LOG.warning(f'No annotation for "{filename}". Skipped.')
-            continue
+    for filename, filepath, candidate_annotation in items:
+        if text := get_cover_text(candidate_annotation):
+            cover_futures[filename] = covers.submit(
+                generate_cover,
+                fpath=dest_img / f'{filename}.png',
+                text=text,
+                template=cover_template,
+                box=text_box,
+            )
 
-        out_video = dest_vid / filepath.with_suffix('.avi').name
-        filename = out_video.stem
+    try:
+        if batch > 1:
+            generate_media_batched(
+                items=[(filepath, cover_futures.get(filename)) for filename, filepath, _ in items],
+                batch=batch,
+                dest_vid=dest_vid,
+                dest_img=dest_img,
+                probe=probe,
+                progress=progress,
+            )
 
-        LOG.info(f'Generating media for "{filename}" ...')
+        else:
+            for filename, filepath, candidate_annotation in items:
+                generate_media_single(
+                    filepath=filepath,
+                    cover=cover_futures.get(filename),
+                    dest_vid=dest_vid,
+                    dest_img=dest_img,
+                    probe=probe,
+                    progress=progress,
+                )
 
-        image = dest_img / f'{filename}.png'
+    finally:
+        for future in cover_futures.values():
+            future.cancel()
+        covers.shutdown()
 
-        generate_cover(
-            fpath=image,
-            text=text,
-            template=cover_template,
-        )
 
-        LOG.debug(f'Generating "{out_video}" ...')
+def generate_media_single(
+    *,
+    filepath: Path,
+    cover: Optional[Future],
+    dest_vid: Path,
+    dest_img: Path,
+    probe: Optional[ProbeIndex],
+    progress: Progress,
+):
+    filename = filepath.stem
+    size = filepath.stat().st_size
+
+    if not cover:
+        LOG.warning(f'No annotation for "{filename}". Skipped.')
+        progress.skip_item(bytes_total=size)
+        return
 
-        run(
-            # f'ffmpeg -loop 1 -i {image} -i {filepath} -c:v libx264 -tune stillimage -c:a copy -shortest {out_video}'
-            f'ffmpeg -r 1 -loop 1 -y -i {image} -i {filepath} -c:a copy -r 1 -vcodec libx264 -shortest {out_video}',
-            shell=True
-        )
+    out_video = dest_vid / filepath.with_suffix('.avi').name
+
+    LOG.info(f'Generating media for "{filename}" ...')
+    progress.start_item(filename)
+
+    cover.result()
+    image = dest_img / f'{filename}.png'
+
+    generate_video(
+        fpath=out_video,
+        image=image,
+        audio=filepath,
+        duration=probe.get(filepath).duration if probe else 0,
+        progress=progress,
+    )
+    progress.finish_item(bytes_done=size)
+
+
+def generate_media_batched(
+    *,
+    items: List[Tuple[Path, Optional[Future]]],
+    batch: int,
+    dest_vid: Path,
+    dest_img: Path,
+    probe: Optional[ProbeIndex],
+    progress: Progress,
+):
+    jobs = []
+
+    def encode():
+        names = [job.audio.stem for job in jobs]
+        LOG.info(f'Generating media for "{names[0]}" .. "{names[-1]}" ({len(names)}) ...')
+        progress.start_item(f'{names[0]}..{names[-1]}' if len(names) > 1 else names[0])
+
+        generate_video_batch(jobs=jobs, progress=progress)
+
+        for job in jobs:
+            progress.finish_item(bytes_done=job.size)
+
+        jobs.clear()
+
+    for filepath, cover in items:
+        filename = filepath.stem
+
+        if not cover:
+            LOG.warning(f'No annotation for "{filename}". Skipped.')
+            progress.skip_item(bytes_total=filepath.stat().st_size)
+            continue
+
+        cover.result()
+
+        jobs.append(EncodeJob(
+            fpath=dest_vid / filepath.with_suffix('.avi').name,
+            image=dest_img / f'{filename}.png',
+            audio=filepath,
+            duration=probe.get(filepath).duration if probe else 0,
+        ))
+
+        if len(jobs) >= batch:
+            encode()
+
+    if jobs:
+        encode()
 
 
 def generate(
     *,
-    path_resources: Path,
-    path_audio_in: Path,
-    path_out_vid: Path,
-    path_out_img: Path,
+    project: Project,
+    text_box: TypeBox = None,
+    batch: int = 1,
 ):
-    LOG.debug(f'{path_resources=}')
-    LOG.debug(f'{path_audio_in=}')
-    LOG.debug(f'{path_out_vid=}')
-    LOG.debug(f'{path_out_img=}')
-
-    generate_media(
-        audio_files=list_files(path_audio_in, ext='mp3'),
-        annotations=Annotations(index_fpath=PATH_FILE_INDEX),
-        cover_template=path_resources / 'bg.png',
-        dest_vid=path_out_vid,
-        dest_img=path_out_img,
-    )
+    LOG.debug(f'{project=}')
+
+    probe = ProbeIndex(project.path_file_probe)
+
+    try:
+        generate_media(
+            audio_files=list_files(project.path_out_audio, ext='mp3'),
+            annotations=Annotations(index_fpath=project.path_file_index),
+            cover_template=project.path_resources / 'bg.png',
+            dest_vid=project.path_out_video,
+            dest_img=project.path_out_images,
+            probe=probe,
+            text_box=text_box,
+            batch=batch,
+        )
+
+    finally:
+        probe.save()
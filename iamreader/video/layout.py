@@ -0,0 +1,180 @@
+from pathlib import Path
+from typing import Tuple, List, Dict
+
+from PIL import ImageFont, ImageDraw
+
+TypeBox = Tuple[int, int, int, int]
+
+
+class TextLayout:
+    """Lays out text into a box: wraps lines and shrinks font size to fit.
+
+    Fonts and glyph advance widths are cached per font size,
+    so that laying out many similar texts is cheap.
+
+    """
+    def __init__(
+        self,
+        *,
+        font: Path,
+        box: TypeBox,
+        size_max: int = 40,
+        size_min: int = 12,
+        spacing: float = 1.2,
+    ):
+        """
+        :param font: TrueType font file.
+        :param box: (x, y, width, height)
+        :param size_max: Max font size.
+        :param size_min: Min font size. Text not fitting with this size is truncated.
+        :param spacing: Line height to font height ratio.
+
+        """
+        self.font = font
+        self.box = box
+        self.size_max = size_max
+        self.size_min = size_min
+        self.spacing = spacing
+        self._fonts: Dict[int, ImageFont.FreeTypeFont] = {}
+        self._widths: Dict[int, Dict[str, float]] = {}
+
+    def get_font(self, size: int) -> ImageFont.FreeTypeFont:
+        font = self._fonts.get(size)
+
+        if font is None:
+            font = ImageFont.truetype(f'{self.font}', size=size)
+            # layouts are shared by threads: widths are to exist once the font is seen
+            self._widths.setdefault(size, {})
+            self._fonts[size] = font
+
+        return font
+
+    def get_line_height(self, size: int) -> int:
+        ascent, descent = self.get_font(size).getmetrics()
+        return int((ascent + descent) * self.spacing)
+
+    def measure(self, text: str, size: int) -> float:
+        """Returns text width for the given font size (kerning is not taken into account).
+
+        :param text:
+        :param size:
+
+        """
+        font = self.get_font(size)
+        widths = self._widths[size]
+        width = 0
+
+        for char in text:
+            char_width = widths.get(char)
+
+            if char_width is None:
+                char_width = widths[char] = font.getlength(char)
+
+            width += char_width
+
+        return width
+
+    def wrap(self, text: str, size: int) -> List[str]:
+        """Wraps text into lines fitting the box width.
+
+        :param text:
+        :param size:
+
+        """
+        width_max = self.box[2]
+        measure = self.measure
+        width_space = measure(' ', size)
+        lines = []
+
+        for paragraph in text.split('\n'):
+            line = []
+            width_line = 0
+
+            for word in paragraph.split():
+                width_word = measure(word, size)
+
+                while width_word > width_max and len(word) > 1:
+                    # break a word too long for a line
+                    if line:
+                        lines.append(' '.join(line))
+                        line, width_line = [], 0
+
+                    cut = 0
+                    width_cut = 0
+
+                    for char in word:
+                        width_cut += measure(char, size)
+                        if width_cut > width_max:
+                            break
+                        cut += 1
+
+                    cut = max(cut, 1)
+                    lines.append(word[:cut])
+                    word = word[cut:]
+                    width_word = measure(word, size)
+
+                width_candidate = width_line + (width_space if line else 0) + width_word
+
+                if line and width_candidate > width_max:
+                    lines.append(' '.join(line))
+                    line, width_line = [word], width_word
+
+                else:
+                    line.append(word)
+                    width_line = width_candidate
+
+            lines.append(' '.join(line))
+
+        return lines
+
+    def fit(self, text: str) -> Tuple[int, List[str]]:
+        """Returns the largest font size allowing the text to fit the box and the wrapped lines.
+
+        :param text:
+
+        """
+        height_max = self.box[3]
+        size_low, size_high = self.size_min, self.size_max
+        fitted = None
+
+        # binary search: text height grows with the font size
+        while size_low <= size_high:
+            size = (size_low + size_high) // 2
+            lines = self.wrap(text, size)
+
+            if len(lines) * self.get_line_height(size) <= height_max:
+                fitted = size, lines
+                size_low = size + 1
+
+            else:
+                size_high = size - 1
+
+        if fitted:
+            return fitted
+
+        size = self.size_min
+        lines = self.wrap(text, size)
+        lines_max = max(height_max // self.get_line_height(size), 1)
+
+        if len(lines) > lines_max:
+            lines = lines[:lines_max]
+            lines[-1] = f'{lines[-1]}…'
+
+        return size, lines
+
+    def draw(self, draw: ImageDraw.ImageDraw, text: str, *, fill: Tuple[int, int, int] = (255, 255, 255)):
+        """Draws text into the box.
+
+        :param draw:
+        :param text:
+        :param fill: Text color.
+
+        """
+        size, lines = self.fit(text)
+        font = self.get_font(size)
+        line_height = self.get_line_height(size)
+        x, y, _, _ = self.box
+
+        for idx, line in enumerate(lines):
+            if line:
+                draw.text(xy=(x, y + idx * line_height), text=line, fill=fill, font=font)
@@ -0,0 +1,334 @@
+import ctypes
+import ctypes.util
+import os
+import select
+from pathlib import Path
+from time import sleep, monotonic
+from typing import List, Dict, Tuple, Set, Iterable
+
+from .annotations import Annotations
+from .build import build
+from .exceptions import IamreaderException
+from .project import Project
+from .utils import LOG, list_files
+
+DEBOUNCE = 1
+"""Seconds without changes to wait for before rebuilding (editors and exporters write in bursts)."""
+
+POLL_INTERVAL = 1
+"""Seconds between directory scans if inotify is not available."""
+
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+TypeSnapshot = Dict[Path, Tuple[int, int]]
+TypeChapter = Tuple[int, str, str, Tuple[str, ...]]
+
+
+class Watcher:
+    """Base directories watcher. Only tells that something has changed,
+    actual changes are found by comparing snapshots (see get_snapshot)."""
+
+    def __init__(self, paths: List[Path]):
+        self.paths = paths
+
+    def wait(self, timeout: float = None) -> bool:
+        """Waits for changes. Returns False on timeout.
+
+        :param timeout: Seconds. None - wait forever.
+
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(Watcher):
+    """Uses Linux inotify API (through libc) to be notified on changes."""
+
+    mask = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+    def __init__(self, paths: List[Path]):
+        super().__init__(paths)
+
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('inotify is not available')
+
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        self._fd = fd
+
+        for path in paths:
+            if libc.inotify_add_watch(fd, os.fsencode(path), self.mask) < 0:
+                errno = ctypes.get_errno()
+                self.close()
+                raise OSError(errno, f'inotify_add_watch failed for {path}')
+
+    def wait(self, timeout: float = None) -> bool:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+
+        if not readable:
+            return False
+
+        # events themselves are not needed: drain them
+        try:
+            while os.read(self._fd, 65536):
+                pass
+
+        except BlockingIOError:
+            pass
+
+        return True
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher(Watcher):
+    """Scans directories periodically comparing file sizes and modification times."""
+
+    def __init__(self, paths: List[Path], *, interval: float = POLL_INTERVAL):
+        super().__init__(paths)
+        self.interval = interval
+        self._state = self._scan()
+
+    def _scan(self) -> TypeSnapshot:
+        state = {}
+
+        for path in self.paths:
+            for entry in os.scandir(path):
+                if entry.is_file():
+                    stat = entry.stat()
+                    state[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+
+        return state
+
+    def wait(self, timeout: float = None) -> bool:
+        started = monotonic()
+
+        while True:
+            state = self._scan()
+
+            if state != self._state:
+                self._state = state
+                return True
+
+            if timeout is not None and monotonic() - started >= timeout:
+                return False
+
+            sleep(self.interval)
+
+
+def get_watcher(paths: List[Path], *, poll: bool = False) -> Watcher:
+    """Returns inotify based watcher if available, polling one otherwise.
+
+    :param paths: Directories to watch (not recursively).
+    :param poll: Force polling.
+
+    """
+    if not poll:
+        try:
+            return InotifyWatcher(paths)
+
+        except OSError as e:
+            LOG.debug(f'Falling back to polling: {e}')
+
+    return PollingWatcher(paths)
+
+
+def get_snapshot(project: Project) -> TypeSnapshot:
+    """Returns sizes and modification times of the project files affecting the build.
+
+    :param project:
+
+    """
+    return get_stats([
+        project.path_file_index,
+        project.path_resources / 'cover.jpg',
+        project.path_resources / 'bg.png',
+        *list_files(project.path_out_audio, ext='mp3'),
+    ])
+
+
+def get_stats(files: Iterable[Path]) -> TypeSnapshot:
+    """Returns sizes and modification times of the existing files.
+
+    :param files:
+
+    """
+    snapshot = {}
+
+    for fpath in files:
+        try:
+            stat = fpath.stat()
+
+        except FileNotFoundError:
+            continue
+
+        snapshot[fpath] = (stat.st_size, stat.st_mtime_ns)
+
+    return snapshot
+
+
+def update_snapshot(snapshot: TypeSnapshot, *, project: Project, filenames: Set[str]):
+    """Updates the snapshot taken before a build with the files written by the build
+    (tags are written into the audio files of the chapters built).
+
+    Other files are left as they were before the build, so that changes made meanwhile are still found.
+
+    :param snapshot:
+    :param project:
+    :param filenames: File names of the chapters built.
+
+    """
+    snapshot.update(get_stats(project.path_out_audio / f'{filename}.mp3' for filename in filenames))
+
+
+def get_chapters(annotations: Annotations, audio_files: List[Path]) -> Dict[str, TypeChapter]:
+    """Returns chapters data used in tags and covers (track number, author, album, full title)
+    by file names.
+
+    :param annotations:
+    :param audio_files:
+
+    """
+    chapters = {}
+
+    for idx, (filename, _, annotation) in enumerate(annotations.iter_for_files(audio_files), 1):
+        if annotation:
+            chapters[filename] = (
+                idx,
+                annotation.get_author_first(),
+                annotation.get_title_first(),
+                tuple(annotation.get_full_title(root_title=True)),
+            )
+
+    return chapters
+
+
+def get_affected(
+    *,
+    project: Project,
+    snapshot_old: TypeSnapshot,
+    snapshot_new: TypeSnapshot,
+    chapters_old: Dict[str, TypeChapter],
+    chapters_new: Dict[str, TypeChapter],
+) -> Set[str]:
+    """Returns file names of the chapters to be rebuilt.
+
+    A chapter is affected if its audio file, its data derived from the index
+    (a title change affects all the descendants) or a common cover has changed.
+
+    :param project:
+    :param snapshot_old:
+    :param snapshot_new:
+    :param chapters_old:
+    :param chapters_new:
+
+    """
+    changed = {
+        fpath for fpath in snapshot_old.keys() | snapshot_new.keys()
+        if snapshot_old.get(fpath) != snapshot_new.get(fpath)
+    }
+
+    covers = {project.path_resources / 'cover.jpg', project.path_resources / 'bg.png'}
+
+    if changed & covers:
+        return set(chapters_new)
+
+    affected = {
+        filename for filename, chapter in chapters_new.items()
+        if chapters_old.get(filename) != chapter
+    }
+
+    for fpath in changed:
+        if fpath.parent == project.path_out_audio and fpath.stem in chapters_new:
+            affected.add(fpath.stem)
+
+    return affected
+
+
+def watch(*, project: Project, workers: int = None, debounce: float = DEBOUNCE, poll: bool = False):
+    """Watches project resources and rebuilds (tags audio, renders covers and videos)
+    only the chapters affected by changes. Runs until interrupted.
+
+    :param project:
+    :param workers: Number of CPU bound workers.
+    :param debounce: Seconds without changes to wait for before rebuilding.
+    :param poll: Use polling instead of inotify.
+
+    """
+    project.validate()
+    project.path_out_audio.mkdir(parents=True, exist_ok=True)
+
+    def load() -> Tuple[TypeSnapshot, Dict[str, TypeChapter]]:
+        snapshot = get_snapshot(project)
+        audio_files = [fpath for fpath in snapshot if fpath.suffix == '.mp3']
+        return snapshot, get_chapters(Annotations(index_fpath=project.path_file_index), audio_files)
+
+    snapshot, chapters = load()
+    watcher = get_watcher([project.path_resources, project.path_out_audio], poll=poll)
+
+    LOG.info(f'Watching {project} for changes. Press CTRL+C to stop ...')
+
+    try:
+        while True:
+            watcher.wait()
+
+            while watcher.wait(debounce):
+                pass
+
+            try:
+                snapshot_new, chapters_new = load()
+
+            except Exception as e:
+                # e.g. the index is being edited
+                LOG.error(f'Unable to load project state: {e}')
+                continue
+
+            affected = get_affected(
+                project=project,
+                snapshot_old=snapshot,
+                snapshot_new=snapshot_new,
+                chapters_old=chapters,
+                chapters_new=chapters_new,
+            )
+            chapters = chapters_new
+            snapshot = snapshot_new
+
+            if not affected:
+                continue
+
+            LOG.info(f"Rebuilding {len(affected)} chapter(s): {', '.join(sorted(affected)[:10])} ...")
+
+            try:
+                build(projects=[project], workers=workers, filenames=affected)
+
+            except IamreaderException as e:
+                LOG.error(f'{e}')
+
+            except Exception:
+                # e.g. a broken chapter file: the rest is still to be watched
+                LOG.exception('Rebuilding failed')
+
+            # own changes (tags written into audio files) are not to trigger rebuilding
+            update_snapshot(snapshot, project=project, filenames=affected)
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        watcher.close()
@@ -43,7 +43,6 @@ setup(
     install_requires=[ 
         'click',
         'Pillow',
-        'eyed3',
         'requests',
     ],
 
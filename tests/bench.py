@@ -0,0 +1,271 @@
+"""Media pipeline benchmarks.
+
+Generates synthetic index files and media fixtures of several scales
+and times pipeline hot paths. Results are written as JSON to be compared between releases.
+
+    python tests/bench.py --scales 10,1000 --out bench.json
+
+The largest scale (SCALE_LARGE) writes about 800 MB of fixtures and is only run on request:
+
+    python tests/bench.py --large
+
+The package is expected to be installed (e.g. `pip install -e .`).
+
+"""
+import json
+import platform
+import sys
+from argparse import ArgumentParser
+from datetime import datetime
+from pathlib import Path
+from shutil import which, disk_usage
+from tempfile import TemporaryDirectory, gettempdir
+from time import perf_counter
+from typing import Callable, Dict, List, Type
+
+from PIL import Image
+
+from iamreader import VERSION_STR
+from iamreader.annotations import Annotations
+from iamreader.audio.annotator import annotate_single
+from iamreader.project import Project
+from iamreader.publishing import ProjectConfig
+from iamreader.publishing.services import Service
+from iamreader.utils import list_files
+from iamreader.video.generator import generate_cover, generate_video, get_cover_text, generate_video_batch, EncodeJob
+
+MP3_FRAME = b'\xff\xfb\x90\x00' + b'\x00' * 413
+"""MPEG-1 Layer III, 128 kbps, 44100 Hz silent frame."""
+
+MP3_FRAMES_PER_SEC = 38
+
+CHAPTERS_PER_PART = 100
+
+SCALES = '10,1000'
+
+SCALE_LARGE = 50000
+"""Index size run with --large only: its fixtures take about 800 MB."""
+
+LIMITS = {
+    'generate_cover': 200,
+    'annotate_single': 500,
+    'generate_video': 8,
+}
+"""Max items for heavy operations, to keep runs short on large scales."""
+
+
+def get_service_cls() -> Type[Service]:
+    """Defines the benchmark service. Services are registered on definition,
+    so it's done on run, not to alter the registry on import.
+
+    """
+    if service_cls := Service.registry.get('bench'):
+        return service_cls
+
+    class BenchService(Service):
+
+        alias = 'bench'
+        file_ext = 'mp3'
+
+    return BenchService
+
+
+def get_fixtures_size(*, scale: int, seconds: int = 1) -> int:
+    return scale * len(MP3_FRAME) * MP3_FRAMES_PER_SEC * seconds
+
+
+def make_fixtures(path: Path, *, scale: int, seconds: int = 1) -> Dict[str, Path]:
+
+    size = get_fixtures_size(scale=scale, seconds=seconds)
+    free = disk_usage(path).free
+
+    if size * 2 > free:
+        # annotated copies and covers take space as well
+        raise SystemExit(
+            f'Not enough disk space for scale {scale}: {size / 1024 / 1024:.0f} MB of fixtures, '
+            f'{free / 1024 / 1024:.0f} MB free')
+
+    path_aud = path / 'aud'
+    path_aud.mkdir(parents=True)
+
+    lines = ['[Some Author] Some book']
+    audio = MP3_FRAME * (MP3_FRAMES_PER_SEC * seconds)
+
+    for idx in range(1, scale + 1):
+
+        if idx % CHAPTERS_PER_PART == 1:
+            lines.append(f'    Part {idx // CHAPTERS_PER_PART + 1}')
+
+        filename = f'{idx:05}'
+        lines.append(f'        {filename} Chapter number {idx} with a rather long title')
+        (path_aud / f'{filename}.mp3').write_bytes(audio)
+
+    fpath_index = path / 'titles.txt'
+    fpath_index.write_text('\n'.join(lines))
+
+    fpath_template = path / 'bg.png'
+    Image.new('RGB', (1280, 720), color=(40, 40, 60)).save(f'{fpath_template}')
+
+    fpath_config = path / 'iamreader.json'
+    fpath_config.write_text('{}')
+
+    return {
+        'aud': path_aud,
+        'index': fpath_index,
+        'template': fpath_template,
+        'config': fpath_config,
+        'img': path / 'img',
+        'vid': path / 'vid',
+    }
+
+
+def timeit(func: Callable, items: List = None, *, count: int = 1) -> dict:
+    """Times function calls: once if no items given, otherwise once per item.
+
+    :param func:
+    :param items:
+    :param count: Number of items processed by a single call (if no items given).
+
+    """
+    started = perf_counter()
+
+    if items is None:
+        func()
+
+    else:
+        for item in items:
+            func(item)
+        count = len(items)
+
+    total = perf_counter() - started
+
+    return {
+        'count': count,
+        'total': total,
+        'per_item': total / count if count else 0,
+    }
+
+
+def bench_scale(scale: int, *, service_cls: Type[Service]) -> Dict[str, dict]:
+
+    results = {}
+
+    with TemporaryDirectory(prefix='iamreader_bench_') as tmp:
+        fixtures = make_fixtures(Path(tmp), scale=scale)
+
+        results['list_files'] = timeit(lambda: list_files(fixtures['aud'], ext='mp3'))
+        audio_files = sorted(list_files(fixtures['aud'], ext='mp3'))
+
+        results['Annotations.parse'] = timeit(lambda: Annotations(index_fpath=fixtures['index']))
+        annotations = Annotations(index_fpath=fixtures['index'])
+        annotated = [item for item in annotations.iter_for_files(audio_files) if item[2]]
+
+        service = service_cls(
+            config=ProjectConfig(fixtures['config']),
+            annotations=annotations,
+            project=Project(Path(tmp)),
+        )
+        results['materialize_template'] = timeit(lambda: service.materialize_template(fixtures['aud']))
+
+        fixtures['img'].mkdir()
+
+        def cover(item):
+            filename, _, annotation = item
+            generate_cover(
+                fpath=fixtures['img'] / f'{filename}.png',
+                text=get_cover_text(annotation),
+                template=fixtures['template'],
+            )
+
+        results['generate_cover'] = timeit(cover, annotated[:LIMITS['generate_cover']])
+
+        def annotate(item):
+            _, filepath, annotation = item
+            annotate_single(
+                filepath=filepath,
+                artist=annotation.get_author_first(),
+                album=annotation.get_title_first(),
+                title=annotation.title,
+                idx=1,
+                cover=fixtures['template'],
+            )
+
+        results['annotate_single'] = timeit(annotate, annotated[:LIMITS['annotate_single']])
+
+        if which('ffmpeg'):
+            fixtures['vid'].mkdir()
+
+            def video(item):
+                filename, filepath, _ = item
+                generate_video(
+                    fpath=fixtures['vid'] / f'{filename}.avi',
+                    image=fixtures['img'] / f'{filename}.png',
+                    audio=filepath,
+                )
+
+            videos = annotated[:LIMITS['generate_video']]
+            results['generate_video'] = timeit(video, videos)
+
+            def video_batch():
+                generate_video_batch(jobs=[
+                    EncodeJob(
+                        fpath=fixtures['vid'] / f'{filename}.b.avi',
+                        image=fixtures['img'] / f'{filename}.png',
+                        audio=filepath,
+                    )
+                    for filename, filepath, _ in videos
+                ])
+
+            results['generate_video_batch'] = timeit(video_batch, count=len(videos))
+
+    return results
+
+
+def main():
+    parser = ArgumentParser(description='iamreader media pipeline benchmarks')
+    parser.add_argument('--scales', default=SCALES, help='Comma separated index sizes')
+    parser.add_argument(
+        '--large', action='store_true', help=f'Also run scale {SCALE_LARGE} (about 800 MB of fixtures)')
+    parser.add_argument('--out', default='', help='JSON file to write results into')
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(',')]
+
+    if args.large:
+        scales.append(SCALE_LARGE)
+
+    print(f'Fixtures are written into {gettempdir()}', file=sys.stderr)
+
+    service_cls = get_service_cls()
+
+    report = {
+        'version': VERSION_STR,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'dt': f'{datetime.now()}',
+        'results': {},
+    }
+
+    for scale in scales:
+        print(f'Scale {scale} ...', file=sys.stderr)
+        results = bench_scale(scale, service_cls=service_cls)
+        report['results'][f'{scale}'] = results
+
+        for name, result in results.items():
+            print(
+                f"  {name:<22} {result['count']:>6} x {result['per_item'] * 1000:>9.3f} ms "
+                f"= {result['total']:>8.3f} s",
+                file=sys.stderr
+            )
+
+    dumped = json.dumps(report, indent=2)
+
+    if args.out:
+        Path(args.out).write_text(dumped)
+
+    else:
+        print(dumped)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+import os
+from pathlib import Path
+
+from iamreader.annotations import Annotations
+from iamreader.audio.labels import LabelIndex, iter_labels, dump_labels
+
+
+def test_labels(tmp_path):
+    fpath_labels = tmp_path / 'labels.txt'
+    fpath_labels.write_text(
+        '0.5\t0.5\t{"a": "c", "p": {}}\n'
+        '3.0\t3.0\t{"a": "p", "p": {}}\n'
+        '4.0\t4.0\t{"a": "f", "p": {"a": "b"}}\n'
+        '\\\t100.0\t200.0\n'
+        '5.5\t5.5\t{"a": "f", "p": {"a": "e"}}\n'
+        '7.0\t7.0\tplain text\n'
+        '10.0\t10.0\t{"a": "c", "p": {}}\n'
+    )
+
+    fpath_index = tmp_path / 'titles.txt'
+    fpath_index.write_text(
+        '[Author] Book\n'
+        '    01 First\n'
+        '    02 Second\n'
+    )
+
+    index = LabelIndex.from_file(fpath_labels)
+
+    assert [f'{chapter}' for chapter in index.chapters] == ['0.5-10.0', '10.0-']
+    assert index.checkpoints == [3.0]
+    assert [f'{footnote}' for footnote in index.footnotes] == ['4.0-5.5']
+
+    assert index.get_chapter(0.1) is None
+    assert index.get_chapter(9.9).start == 0.5
+    assert index.get_chapter(100).start == 10.0
+    assert len(index.get_footnotes(index.chapters[0])) == 1
+    assert not index.get_footnotes(index.chapters[1])
+
+    bound = index.bind_annotations(Annotations(index_fpath=fpath_index))
+    assert [chapter.filename for chapter, _ in bound] == ['01', '02']
+
+    fpath_dumped = tmp_path / 'dumped.txt'
+    dump_labels(iter_labels(fpath_labels), fpath_dumped)
+    assert len(fpath_dumped.read_text().splitlines()) == 6
+
+
+def test_silence(tmp_path, monkeypatch):
+    from subprocess import CompletedProcess
+    from iamreader.audio import trimmer
+    from iamreader.audio.trimmer import detect_silence, get_cuts
+
+    calls = []
+    log = (
+        'Stream mapping:\n'
+        '[silencedetect @ 0x55d0] silence_start: 1\n'
+        '[silencedetect @ 0x55d0] silence_end: 4 | silence_duration: 3\n'
+        'size=N/A time=00:00:05.00 bitrate=N/A speed= 900x\n'
+        '[silencedetect @ 0x55d0] silence_start: 5.3\n'
+    )
+
+    def ffmpeg(*args):
+        calls.append(args)
+        return CompletedProcess(args, 0, stdout='', stderr=log)
+
+    monkeypatch.setattr(trimmer, 'ffmpeg', ffmpeg)
+
+    fpath = tmp_path / 'some.mp3'
+    silences = detect_silence(fpath, threshold=-20, minimum=0.5, duration=6)
+    # the last one lasts till the end
+    assert silences == [(1.0, 4.0), (5.3, 6)]
+    assert 'silencedetect=noise=-20dB:d=0.5' in calls[0]
+
+    cuts = get_cuts(silences[:1], minimum=0.5, compress=20)
+    assert cuts == [(1.5, 3.5)]
+
+    assert get_cuts(silences[:1], minimum=0.5, compress=100) == []
+
+
+def test_id3(tmp_path):
+    from iamreader.audio.id3 import read_tag, write_tag, build_frames, text_frame, comment_frame, PADDING
+
+    frame = b'\xff\xfb\x90\x00' + b'\x00' * 413
+    fpath = tmp_path / 'some.mp3'
+    fpath.write_bytes(frame * 10)
+
+    write_tag(fpath, build_frames(artist='Автор', album='Book', title='One', track=2, picture=(b'img', 'image/png')))
+
+    size, frames = read_tag(fpath)
+    frames = dict(frames)
+    assert frames['TPE1'] == b'\x01' + 'Автор'.encode('utf-16')
+    assert frames['TALB'] == b'\x00Book'
+    assert frames['TRCK'] == b'\x002'
+    assert frames['APIC'] == b'\x00image/png\x00\x03\x00img'
+    assert fpath.stat().st_size == size + len(frame) * 10
+    assert size > PADDING
+
+    # fits into padding: updated in place
+    write_tag(fpath, [text_frame('TIT2', 'Two'), comment_frame('x' * 100)])
+
+    size_new, frames = read_tag(fpath)
+    frames = dict(frames)
+    assert size_new == size
+    assert frames['TIT2'] == b'\x00Two'
+    assert frames['TALB'] == b'\x00Book'
+    assert fpath.read_bytes()[size:] == frame * 10
+
+    # the same frames: not written
+    os.utime(fpath, ns=(1, 1))
+    write_tag(fpath, [text_frame('TIT2', 'Two'), comment_frame('x' * 100)])
+    assert fpath.stat().st_mtime_ns == 1
+
+    # does not fit: rewritten
+    write_tag(fpath, [comment_frame('x' * PADDING * 2)])
+    size_new, frames = read_tag(fpath)
+    assert size_new > size
+    assert dict(frames)['TIT2'] == b'\x00Two'
+    assert fpath.read_bytes()[size_new:] == frame * 10
+
+
+def test_id3_v24(tmp_path):
+    from iamreader.audio.id3 import read_tag, write_tag, text_frame, comment_frame, syncsafe_encode
+
+    def frame(frame_id: str, data: bytes, *, flags: bytes = b'\x00\x00') -> bytes:
+        return frame_id.encode() + syncsafe_encode(len(data)) + flags + data
+
+    body = b''.join([
+        frame('TIT2', b'\x03' + 'Глава'.encode()),
+        frame('TPE1', b'\x02' + 'Автор'.encode('utf-16-be') + b'\x00\x00' + 'Второй'.encode('utf-16-be')),
+        frame('TALB', b'\x00Book'),
+        frame('COMM', b'\x03rus' + 'Описание'.encode() + b'\x00' + 'Текст'.encode()),
+        # unknown layout, with UTF-8 text
+        frame('SYLT', b'\x03rus\x02\x01' + 'Строка'.encode() + b'\x00\x00\x00\x00\x01'),
+        # data length indicator
+        frame('TCON', b'\x00\x00\x00\x05\x00Audio', flags=b'\x00\x01'),
+    ])
+    fpath = tmp_path / 'some.mp3'
+    fpath.write_bytes(b'ID3\x04\x00\x00' + syncsafe_encode(len(body)) + body + b'audio')
+
+    size, frames = read_tag(fpath)
+    assert size == 10 + len(body)
+    assert frames == [
+        text_frame('TIT2', 'Глава'),
+        text_frame('TPE1', 'Автор/Второй'),
+        ('TALB', b'\x00Book'),
+        comment_frame('Текст', description='Описание', language='rus'),
+    ]
+
+    # preserved frames are written as ID3v2.3
+    write_tag(fpath, [text_frame('TIT2', 'Two')])
+    size, frames = read_tag(fpath)
+    assert fpath.read_bytes()[3] == 3
+    assert dict(frames)['TPE1'] == text_frame('TPE1', 'Автор/Второй')[1]
+    assert dict(frames)['COMM'][:4] == b'\x01rus'
+    assert fpath.read_bytes()[size:] == b'audio'
+
+
+def test_cover_cache(tmp_path):
+    from PIL import Image
+    from iamreader.audio.covers import CoverCache
+
+    source_1 = tmp_path / '01.png'
+    source_2 = tmp_path / '02.png'
+    Image.new('RGB', (1000, 800)).save(f'{source_1}')
+    source_2.write_bytes(source_1.read_bytes())
+
+    cache = CoverCache(tmp_path / 'cache', size=100)
+    cover = cache.get(source_1)
+    assert cache.get(source_2) == cover
+
+    with Image.open(f'{cover}') as img:
+        assert img.format == 'JPEG'
+        assert img.size == (100, 80)
+
+    assert len(list((tmp_path / 'cache').iterdir())) == 1
+
+
+def test_split(tmp_path, monkeypatch):
+    from iamreader.audio import splitter
+
+    calls = []
+
+    def ffmpeg(*args):
+        calls.append(args)
+        Path(args[-1]).write_bytes(b'audio')
+
+    monkeypatch.setattr(splitter, 'ffmpeg', ffmpeg)
+    monkeypatch.setattr(splitter, 'validate_duration', lambda fpath, expected: None)
+
+    fpath_labels = tmp_path / 'labels.txt'
+    fpath_labels.write_text(
+        '0.5\t0.5\t{"a": "c", "p": {}}\n'
+        '3.0\t3.0\t{"a": "p", "p": {}}\n'
+        '10.25\t10.25\t{"a": "c", "p": {}}\n'
+    )
+
+    fpath_index = tmp_path / 'titles.txt'
+    fpath_index.write_text(
+        '[Author] Book\n'
+        '    01 First\n'
+        '    02 Second\n'
+    )
+
+    source = tmp_path / 'record.mp3'
+    dest = tmp_path / 'out'
+
+    fpaths = splitter.split_media(
+        source=source,
+        labels=LabelIndex.from_file(fpath_labels),
+        annotations=Annotations(index_fpath=fpath_index),
+        dest=dest,
+        workers=1,
+    )
+    assert fpaths == [dest / '01.mp3', dest / '02.mp3']
+    assert sorted(path.name for path in dest.iterdir()) == ['01.mp3', '02.mp3']
+
+    args_first, args_last = calls
+    # seeking before the input: cuts land on audio frame boundaries
+    assert list(args_first[:6]) == ['-ss', '0.5', '-i', f'{source}', '-t', '9.75']
+    assert list(args_last[:4]) == ['-ss', '10.25', '-i', f'{source}']
+    # the last chapter lasts till the end of the recording
+    assert '-t' not in args_last
+    assert args_last[-1] == f'{dest / ".02.part.mp3"}'
@@ -0,0 +1,64 @@
+from time import sleep
+
+import pytest
+
+from iamreader.exceptions import IamreaderException
+from iamreader.pipeline import Pipeline, POOL_CPU, POOL_NET
+
+
+def test_pipeline():
+    log = []
+
+    def step(name: str, fail: bool = False):
+        def func():
+            if fail:
+                raise ValueError(name)
+            log.append(name)
+            return name
+        return func
+
+    pipeline = Pipeline(pools={POOL_CPU: 2, POOL_NET: 1})
+    add = pipeline.add
+
+    a1 = add('a1', step('a1'))
+    b1 = add('b1', step('b1'), deps=[a1])
+    c1 = add('c1', step('c1'), deps=[b1, None], pool=POOL_NET)
+    a2 = add('a2', step('a2', fail=True))
+    b2 = add('b2', step('b2'), deps=[a2])
+    c2 = add('c2', step('c2'), deps=[b2, c1], pool=POOL_NET)
+
+    with pytest.raises(IamreaderException):
+        pipeline.run()
+
+    assert log.index('a1') < log.index('b1') < log.index('c1')
+    assert 'b2' not in log
+    assert c1.result == 'c1'
+    assert b2.skipped and c2.skipped
+    assert isinstance(a2.error, ValueError)
+
+
+def test_iter_concurrently():
+    from threading import Event
+    from iamreader.utils import iter_concurrently
+
+    started = Event()
+
+    def func(item: int) -> int:
+        if item == 2:
+            # fails while the first item is still running
+            started.wait(5)
+            raise ValueError(item)
+        if item == 1:
+            started.set()
+        sleep(0.2)
+        return item * 10
+
+    results = []
+
+    with pytest.raises(ValueError):
+        for item, result in iter_concurrently(func, [1, 2, 3, 4], workers=2):
+            results.append((item, result))
+
+    # running items are still yielded, those not yet started are cancelled
+    assert (1, 10) in results
+    assert (4, 40) not in results
@@ -0,0 +1,31 @@
+from iamreader.probe import probe_mp3, ProbeIndex
+
+FRAME = b'\xff\xfb\x90\x00' + b'\x00' * 413
+
+
+def test_probe(tmp_path):
+    fpath = tmp_path / 'cbr.mp3'
+    id3 = b'ID3\x03\x00\x00\x00\x00\x01\x00' + b'\x00' * 128  # 128 bytes tag
+    fpath.write_bytes(id3 + b'\x00' * 5 + FRAME * 100)
+
+    info = probe_mp3(fpath)
+    assert info.bitrate == 128000
+    assert info.sample_rate == 44100
+    assert info.channels == 2
+    assert not info.vbr
+    assert round(info.duration, 2) == 2.61
+    assert f'{info}' == '0:00:02'
+
+    fpath = tmp_path / 'vbr.mp3'
+    xing = FRAME[:36] + b'Xing' + (1).to_bytes(4, 'big') + (1000).to_bytes(4, 'big')
+    fpath.write_bytes(xing + FRAME[len(xing):] + FRAME * 10)
+
+    info = probe_mp3(fpath)
+    assert info.vbr
+    assert round(info.duration, 2) == 26.12
+
+    index = ProbeIndex(tmp_path / 'index.json')
+    assert index.get(fpath).duration == info.duration
+    index.save()
+
+    assert ProbeIndex(tmp_path / 'index.json').get(fpath).to_dict() == info.to_dict()
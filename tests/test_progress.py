@@ -0,0 +1,60 @@
+from io import BytesIO
+
+from iamreader.ffmpeg import run_with_progress
+from iamreader.progress import Progress, ProgressFile
+
+
+def test_progress():
+    progress = Progress('test', total=2, total_bytes=100)
+    progress.start_item('one')
+
+    body = ProgressFile(BytesIO(b'x' * 50), size=50, progress=progress)
+    assert len(body) == 50
+    assert b''.join(body) == b'x' * 50
+
+    stats = progress.get_stats()
+    assert stats['bytes'] == 50
+    assert stats['item'] == 'one'
+    assert 'rate' in stats['item_info']
+
+    progress.finish_item(bytes_done=50)
+    stats = progress.get_stats()
+    assert stats['done'] == 1
+    assert stats['eta'] is not None
+
+
+def test_ffmpeg_progress():
+    blocks = []
+
+    result = run_with_progress(
+        ['sh', '-c', 'printf "speed=2x\\nprogress=continue\\nspeed=3x\\nprogress=end\\n"; echo oops >&2'],
+        progress=blocks.append
+    )
+    assert result.returncode == 0
+    assert result.stderr == 'oops\n'
+    assert blocks == [{'speed': '2x', 'progress': 'continue'}, {'speed': '3x', 'progress': 'end'}]
+
+
+def test_progress_concurrent():
+    progress = Progress('test', total=2, total_bytes=100)
+    progress.start_item('one')
+    progress.start_item('two')
+
+    progress.update_item(item='one', bytes_done=30)
+    progress.update_item(item='two', bytes_done=20)
+    stats = progress.get_stats()
+    assert stats['bytes'] == 50
+    assert stats['items_active'] == 2
+
+    progress.finish_item(item='two', bytes_done=50)
+    stats = progress.get_stats()
+    assert stats['bytes'] == 80
+    assert stats['item'] == 'one'
+
+    # skipped ones are excluded from the total
+    progress.skip_item(bytes_total=50)
+    stats = progress.get_stats()
+    assert stats['done'] == 2
+    assert stats['bytes'] == 80
+    assert stats['bytes_total'] == 50
+    assert stats['item'] == 'one'
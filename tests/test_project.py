@@ -0,0 +1,36 @@
+import pytest
+
+from iamreader.build import build
+from iamreader.exceptions import IamreaderException
+from iamreader.project import Project
+from iamreader.publishing.services.base import get_http_session
+
+
+def test_project(tmp_path):
+    project = Project(tmp_path / 'book')
+    assert project.path_out_video == tmp_path / 'book' / 'res' / 'out' / 'vid'
+    assert project.path_file_index.name == 'titles.txt'
+
+    with pytest.raises(IamreaderException):
+        project.validate()
+
+
+def test_build_projects(tmp_path):
+    projects = []
+
+    for name in ('one', 'two'):
+        project = Project(tmp_path / name)
+        project.path_out_audio.mkdir(parents=True)
+        project.path_file_index.write_text('[Author] Book')
+        project.validate()
+        projects.append(project)
+
+    build(projects=projects)
+
+    for project in projects:
+        assert project.path_out_video.is_dir()
+
+
+def test_http_session():
+    assert get_http_session('some') is get_http_session('some')
+    assert get_http_session('some') is not get_http_session('other')
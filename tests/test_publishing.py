@@ -0,0 +1,654 @@
+import asyncio
+import threading
+from datetime import time
+from xml.etree import ElementTree
+from json import dumps
+from pathlib import Path
+from time import monotonic, sleep
+
+import pytest
+
+from iamreader.annotations import Annotations
+from iamreader.project import Project
+from iamreader.publishing import ProjectConfig
+from iamreader.publishing.services import Service, AsyncService, PodcastService
+from iamreader.publishing.shaping import RateLimiter, parse_rate
+from iamreader.publishing.services.podcast import FEED_TAIL
+from iamreader.publishing.services.base import (
+    OP_UPDATE, OP_LIST, STATUS_PENDING, STATUS_PROCESSED, QuotaPool, MultipartBody,
+)
+
+
+class DummyService(Service):
+
+    alias = 'dummy'
+    file_ext = 'mp3'
+
+    quota_limit = 100
+    quota_costs = {OP_UPDATE: 60, OP_LIST: 1}
+    status_batch = 2
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.updated = []
+        self.statuses = {}
+        self.status_calls = []
+        self.uploaded = []
+        self.crash = False
+
+    def _publish_item(self, item: dict) -> bool:
+        ident_remote = self._upload_once(item, upload=self.upload)
+        if self.crash:
+            raise RuntimeError('crashed')
+        self._wait_turn(item)
+        self._contribute_item(ident_remote=ident_remote, item=item)
+        return True
+
+    def upload(self, item: dict) -> str:
+        self.uploaded.append(item['ident'])
+        return f"r{item['ident']}"
+
+    def _get_statuses(self, idents_remote: list, *, credential: str = '') -> dict:
+        self.status_calls.append(idents_remote)
+        return {ident: self.statuses[ident] for ident in idents_remote if ident in self.statuses}
+
+    def _update_item(self, item: dict, *, fields: dict, credential: str = ''):
+        self.updated.append((item['ident_remote'], fields))
+
+
+class DummyAsyncService(AsyncService):
+
+    alias = 'dummy_async'
+    file_ext = 'mp3'
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.running = 0
+        self.running_max = 0
+        self.opened = 0
+
+    async def __aenter__(self):
+        self.opened += 1
+        return self
+
+    async def _publish_item(self, item: dict) -> bool:
+        self.running += 1
+        self.running_max = max(self.running_max, self.running)
+        await asyncio.sleep(0.02)
+        self.running -= 1
+        await self._wait_turn_async(item)
+        self._contribute_item(ident_remote=f"r{item['ident']}", item=item)
+        return True
+
+
+def make_service(tmp_path, *, published: list = None, cls=None) -> DummyService:
+    project = Project(tmp_path)
+    project.path_out_audio.mkdir(parents=True, exist_ok=True)
+    project.path_file_index.write_text('[Author] Book\n    Part\n        01 One\n        02 Two\n        03 Three\n')
+
+    if published is not None:
+        alias = (cls or DummyService).alias
+        project.path_file_config.write_text(dumps({'publish': {alias: {'template': {}, 'items': published}}}))
+
+    for filename in ('01', '02', '03'):
+        (project.path_out_audio / f'{filename}.mp3').write_bytes(b'x')
+
+    return (cls or DummyService)(
+        config=ProjectConfig(project.path_file_config),
+        annotations=Annotations(index_fpath=project.path_file_index),
+        project=project,
+    )
+
+
+def test_reconcile(tmp_path):
+    service = make_service(tmp_path, published=[])
+
+    items = service.materialize_template()
+    assert [item['ident'] for item in items] == ['01', '02', '03']
+    assert items[1]['title'] == '2. Book. Two'
+    assert items[0]['dt_pub'] < items[1]['dt_pub'] < items[2]['dt_pub']
+
+    published = [
+        dict(items[2], ident_remote='r3'),
+        dict(items[0], ident_remote='r1', title='outdated'),
+        dict(items[0], ident='00', ident_remote='r0'),
+    ]
+    service = make_service(tmp_path, published=published)
+
+    reconciliation = service.reconcile()
+    assert [item['ident'] for item in reconciliation.new] == ['02']
+    # publication date follows the latest published one
+    assert reconciliation.new[0]['dt_pub'] > items[2]['dt_pub']
+    assert [(old['ident_remote'], new['title']) for old, new in reconciliation.changed] == [('r1', '1. Book. One')]
+    assert [item['ident_remote'] for item in reconciliation.removed] == ['r0']
+
+    reconciliation = service.reconcile(changes=False)
+    assert not reconciliation.changed
+
+    # counters follow the index: removing a published file doesn't change titles of others
+    service_removed = make_service(
+        tmp_path / 'removed', published=[dict(item, ident_remote=f"r{item['ident']}") for item in items])
+    (service_removed._project.path_out_audio / '01.mp3').unlink()
+    reconciliation = service_removed.reconcile()
+    assert not reconciliation.changed
+    assert [item['ident_remote'] for item in reconciliation.removed] == ['r01']
+
+    # custom idents: published items are matched by rendered ones
+    service._cfg.get_pub_template('dummy')['ident'] = 'book-{{ ident }}'
+    items = service.materialize_template()
+    assert [item['ident'] for item in items] == ['book-01', 'book-02', 'book-03']
+
+    for item in items:
+        service._contribute_item(ident_remote=f"r{item['ident']}", item=item)
+
+    reconciliation = service.reconcile()
+    assert not reconciliation.new
+    assert [item['ident'] for item in reconciliation.removed] == ['03', '01', '00']
+
+
+def test_sync(tmp_path):
+    items = make_service(tmp_path, published=[]).materialize_template()
+    published = [
+        dict(items[0], ident_remote='r1', title='outdated'),
+        dict(items[1], ident_remote='r2', description='outdated', tags=['outdated']),
+        dict(items[2], ident_remote='r3'),
+    ]
+    service = make_service(tmp_path, published=published)
+
+    diffs = service.sync(dry_run=True)
+    assert [(item['ident'], sorted(diff)) for item, diff in diffs] == [('01', ['title']), ('02', ['description', 'tags'])]
+    assert diffs[0][1]['title'] == ('outdated', '1. Book. One')
+    assert not service.updated
+
+    # quota allows a single update a day
+    service.sync()
+    assert service.updated == [('r1', {'title': '1. Book. One'})]
+    synced = service._cfg.get_pub_items('dummy')[0]
+    assert synced['title'] == '1. Book. One'
+    assert 'dt_sync' in synced
+
+    service.sync()
+    assert len(service.updated) == 1
+
+
+def test_statuses(tmp_path):
+    service = make_service(tmp_path, published=[])
+
+    for idx, item in enumerate(service.materialize_template(), 1):
+        service._contribute_item(ident_remote=f'r{idx}', item=item)
+
+    service.statuses = {'r1': STATUS_PROCESSED, 'r2': STATUS_PENDING}
+
+    assert service.track_statuses() == 1
+    assert service.status_calls == [['r1', 'r2'], ['r3']]
+    assert service._quota.used == 2
+
+    # unknown to the remote means failed, to be published again
+    assert [item['ident'] for item in service.materialize_template()] == ['03']
+
+    item = service.materialize_template()[0]
+    service._contribute_item(ident_remote='r3new', item=item)
+
+    items = service._cfg.get_pub_items('dummy')
+    assert [item['ident'] for item in items] == ['01', '02', '03']
+    assert items[-1]['failed'] == ['r3']
+    assert items[-1]['status'] == STATUS_PENDING
+
+    service.statuses.update({'r2': STATUS_PROCESSED, 'r3new': STATUS_PROCESSED})
+    assert service.track_statuses(wait=True, interval=0) == 0
+    assert service.status_calls[-1] == ['r2', 'r3new']
+
+
+def test_upload_once(tmp_path):
+    service = make_service(tmp_path, published=[])
+    fpath_audio = service._project.path_out_audio
+    (fpath_audio / '02.mp3').write_bytes(b'other')
+
+    service.crash = True
+
+    with pytest.raises(RuntimeError):
+        service.publish()
+
+    assert service.uploaded == ['01']
+
+    # an item is never uploaded twice, other items with the same contents (01 and 03) are
+    service = make_service(tmp_path)
+    (fpath_audio / '02.mp3').write_bytes(b'other')
+    service.publish()
+
+    assert service.uploaded == ['02', '03']
+    assert [item['ident_remote'] for item in service._cfg.get_pub_items('dummy')] == ['r01', 'r02', 'r03']
+
+    # a renamed file takes over the upload of the item no longer among the sources
+    project = service._project
+    project.path_file_index.write_text(project.path_file_index.read_text().replace('03 Three', '04 Three'))
+    (fpath_audio / '03.mp3').rename(fpath_audio / '04.mp3')
+    service = DummyService(
+        config=ProjectConfig(project.path_file_config),
+        annotations=Annotations(index_fpath=project.path_file_index),
+        project=project,
+    )
+    service.publish()
+
+    assert not service.uploaded
+    assert service._cfg.get_pub_items('dummy')[-1]['ident_remote'] == 'r03'
+    digest = service._cfg.get_pub_items('dummy')[-1]['hash']
+    assert service._cfg.get_pub_ledger('dummy')[digest] == {'01': 'r01', '04': 'r03'}
+
+
+def test_upload_once_concurrent(tmp_path):
+    service = make_service(tmp_path, published=[])
+    project = service._project
+    project.path_file_index.write_text('[Author] Book\n' + ''.join(f'    {idx:02} Chapter\n' for idx in range(1, 40)))
+
+    for idx in range(1, 40):
+        (project.path_out_audio / f'{idx:02}.mp3').write_bytes(f'{idx}'.encode())
+
+    service._ann = Annotations(index_fpath=project.path_file_index)
+
+    # config is saved by workers while others record their items
+    service.publish(concurrency=8)
+    assert len(service._cfg.get_pub_items('dummy')) == 39
+
+
+def test_rate_limiter():
+    assert parse_rate('512K') == 512 * 1024
+    assert parse_rate(100) == 100
+
+    limiter = RateLimiter.from_config([
+        {'from': '22:00', 'till': '06:00', 'rate': 0},
+        {'rate': '100K'},
+    ])
+    assert limiter.get_rate(time(23, 30)) == 0
+    assert limiter.get_rate(time(12, 0)) == 100 * 1024
+
+    limiter = RateLimiter.from_config([{'rate': '100K'}])
+    started = monotonic()
+
+    for _ in range(4):
+        limiter.consume(5 * 1024)
+
+    assert 0.15 < monotonic() - started < 0.5
+    stats = limiter.get_stats()
+    assert stats['bytes'] == 20 * 1024
+    assert stats['waited'] > 0.15
+
+
+def test_multipart_body():
+    from email.parser import BytesParser
+    from io import BytesIO
+
+    import requests
+
+    from iamreader.progress import ProgressFile
+
+    file = ProgressFile(BytesIO(b'v' * 100000), size=100000)
+    body = MultipartBody(
+        fields=[('metadata', b'{"a": 1}', 'application/json')],
+        file=file,
+        size=100000,
+        filename='01.avi',
+        content_type='video/avi',
+    )
+
+    request = requests.Request(
+        'POST', 'https://example.com/', data=body, headers={'Content-Type': body.content_type}).prepare()
+    assert request.headers['Content-Length'] == f'{len(body)}'
+
+    chunks = list(iter(lambda: body.read(8192), b''))
+    assert max(map(len, chunks)) == 8192
+    assert file.bytes_read == 100000
+
+    data = b''.join(chunks)
+    assert len(data) == len(body)
+
+    message = BytesParser().parsebytes(f'Content-Type: {body.content_type}\r\n\r\n'.encode() + data)
+    metadata, video = message.get_payload()
+    assert metadata.get_content_type() == 'application/json'
+    assert metadata.get_payload(decode=True) == b'{"a": 1}'
+    assert video.get_filename() == '01.avi'
+    assert video.get_payload(decode=True) == b'v' * 100000
+
+
+def test_prioritize(tmp_path):
+    service = make_service(tmp_path, published=[])
+    (service._project.path_out_audio / '03.mp3').write_bytes(b'')
+
+    items = service.materialize_template()
+    assert [item['ident'] for item in service.prioritize(items[::-1])] == ['01', '02', '03']
+
+    service._cfg._raw['publish']['dummy']['priority'] = 'size'
+    assert [item['ident'] for item in service.prioritize(items)] == ['03', '01', '02']
+
+
+def test_quota_pool(tmp_path, monkeypatch):
+    data = {}
+    pool = QuotaPool(data, limit=100, credentials=['a', 'b'])
+
+    # units are reserved on pick
+    assert pool.pick(60) == 'a'
+    assert pool.pick(60) == 'b'
+    assert pool.pick(60) is None
+    assert pool.pick(40, credentials=['b']) == 'b'
+    assert pool.pick(40) == 'a'
+
+    pool.refund(40, credential='a')
+    assert data['credentials']['a']['used'] == 60
+
+    # units of an exhausted credential are not refunded
+    pool.exhaust('a')
+    pool.refund(60, credential='a')
+    assert pool.pick(10) is None
+    assert data['credentials']['b']['used'] == 100
+    assert pool.used == 200
+
+    # concurrent picks never overrun a quota
+    pool = QuotaPool({}, limit=100, credentials=['a', 'b'])
+    picked = []
+    threads = [threading.Thread(target=lambda: picked.append(pool.pick(30))) for _ in range(8)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert sorted(map(str, picked)) == ['None', 'None', 'a', 'a', 'a', 'b', 'b', 'b']
+
+    # every credential has its own daily quota: throughput scales
+    monkeypatch.setattr(DummyService, 'get_credentials', lambda self: ['a', 'b'])
+
+    items = make_service(tmp_path, published=[]).materialize_template()
+    service = make_service(tmp_path, published=[
+        dict(item, ident_remote=f'r{idx}', title='outdated') for idx, item in enumerate(items)
+    ])
+
+    service.sync()
+    assert len(service.updated) == 2
+
+    quota = service._cfg.get_pub_quota('dummy')
+    assert [quota['credentials'][ident]['used'] for ident in ('a', 'b')] == [60, 60]
+
+
+def test_publish_concurrently(tmp_path):
+    service = make_service(tmp_path, published=[], cls=DummyAsyncService)
+    service.publish(concurrency=2)
+
+    assert service.running_max == 2
+    assert service.opened == 1
+    assert sorted(item['ident'] for item in service._cfg.get_pub_items('dummy_async')) == ['01', '02', '03']
+
+    # build publishes items one by one outside of an event loop
+    service = make_service(tmp_path, published=[], cls=DummyAsyncService)
+    service.publish_item(service.materialize_template()[0])
+    assert service.opened == 1
+    assert len(service._cfg.get_pub_items('dummy_async')) == 1
+
+    # synchronous services are run in a thread pool
+    service = make_service(tmp_path, published=[])
+
+    for idx, fpath in enumerate(sorted(service._project.path_out_audio.iterdir())):
+        fpath.write_bytes(f'{idx}'.encode())
+
+    threads = set()
+    upload = service.upload
+
+    def upload_tracked(item):
+        threads.add(threading.current_thread().name)
+        # the first one is the slowest
+        sleep(0.05 if item['ident'] == '01' else 0)
+        return upload(item)
+
+    service.upload = upload_tracked
+    service.publish(concurrency=3)
+
+    assert service.uploaded[-1] == '01'
+    assert all(name.startswith('iamreader-publish') for name in threads)
+
+    # items are recorded in priority order
+    assert [item['ident'] for item in service._cfg.get_pub_items('dummy')] == ['01', '02', '03']
+
+
+def test_podcast(tmp_path):
+    service = make_service(tmp_path, published=[], cls=PodcastService)
+    service._cfg.get_pub_template('podcast')['dt_pub'] = '+0d 00:00:00'
+    service._cfg.get_pub_feed('podcast').update({'title': 'Book & Co', 'url_media': 'https://example.com/aud/'})
+
+    fpath_audio = service._project.path_out_audio / '03.mp3'
+    fpath_audio.rename(fpath_audio.with_suffix('.bak'))
+
+    for idx, fpath in enumerate(sorted(service._project.path_out_audio.iterdir())):
+        fpath.write_bytes(f'{idx}'.encode())
+
+    # not yet due
+    service._cfg.get_pub_template('podcast')['dt_pub'] = '+1d 00:00:00'
+    assert not service.materialize_template()
+    service._cfg.get_pub_template('podcast')['dt_pub'] = '+0d 00:00:00'
+
+    service.publish()
+    fpath_feed = service._project.path_file_feed
+    feed = fpath_feed.read_bytes()
+    assert feed.endswith(FEED_TAIL)
+
+    # new items are appended, the rest of the feed is kept as is
+    fpath_audio.with_suffix('.bak').rename(fpath_audio)
+    fpath_audio.write_bytes(b'2')
+    service.publish()
+    assert fpath_feed.read_bytes().startswith(feed[:-len(FEED_TAIL)])
+
+    channel = ElementTree.parse(fpath_feed).getroot().find('channel')
+    assert channel.find('title').text == 'Book & Co'
+    entries = channel.findall('item')
+    assert [entry.find('title').text for entry in entries] == ['1. Book. One', '2. Book. Two', '3. Book. Three']
+    assert entries[0].find('enclosure').get('url') == 'https://example.com/aud/01.mp3'
+
+    # interrupted append
+    fpath_feed.write_bytes(fpath_feed.read_bytes()[:-5])
+    service.append_items([])
+    assert len(ElementTree.parse(fpath_feed).getroot().find('channel').findall('item')) == 3
+
+    service._cfg.get_pub_items('podcast')[0]['title'] = 'outdated'
+    assert len(service.sync()) == 1
+    assert ElementTree.parse(fpath_feed).getroot().find('channel').find('item').find('title').text == '1. Book. One'
+
+
+def test_render_duration(tmp_path):
+    from iamreader.publishing.services import YoutubeService
+
+    service = make_service(tmp_path, published=[])
+    project = service._project
+    template = {'description': '{{ duration }}'}
+
+    # about 2 seconds of MPEG frames
+    (project.path_out_audio / '01.mp3').write_bytes((b'\xff\xfb\x90\x00' + b'\x00' * 413) * 80)
+    annotation = next(service._ann.iter_for_files([project.path_out_audio / '01.mp3']))[2]
+
+    def render(service: Service, filepath: Path) -> str:
+        return service._render_item(template=template, filepath=filepath, annotation=annotation, counter='1')
+
+    # audio services probe the source files themselves
+    assert render(service, project.path_out_audio / '01.mp3')['description'] == '0:00:02'
+
+    youtube = YoutubeService(config=service._cfg, annotations=service._ann, project=project)
+    # videos are probed by their audio
+    assert render(youtube, project.path_out_video / '01.avi')['description'] == '0:00:02'
+    assert render(youtube, project.path_out_video / '04.avi')['description'] == ''
+
+
+def test_youtube_credentials(tmp_path):
+    from datetime import date
+    from iamreader.publishing.services import YoutubeService
+
+    project = make_service(tmp_path, published=[])._project
+    path = project.path_resources
+
+    # client ids are taken from configs, not file names
+    (path / 'client_secret_downloaded.json').write_text(dumps({'web': {'client_id': 'one.apps'}}))
+    (path / 'client_secret_two.json').write_text(dumps({'web': {'client_id': 'two.apps'}}))
+    (path / 'client_token_one.apps.json').write_text(dumps({'access_token': 'token1'}))
+
+    config = ProjectConfig(project.path_file_config)
+    config.get_pub_quota('youtube').update({'date': f'{date.today()}', 'used': 1600})
+
+    service = YoutubeService(
+        config=config,
+        annotations=Annotations(index_fpath=project.path_file_index),
+        project=project,
+    )
+    assert list(service._quota.quotas) == ['one.apps', 'two.apps']
+    assert service._get_token(credential='one.apps') == 'token1'
+
+    # usage recorded before credentials got named is kept
+    quota = config.get_pub_quota('youtube')
+    assert 'used' not in quota
+    assert quota['credentials']['one.apps']['used'] == 1600
+    assert service._quota.pick(1600) == 'two.apps'
+
+
+def test_youtube_tokens(tmp_path, monkeypatch):
+    from iamreader.publishing.services import YoutubeService
+
+    project = make_service(tmp_path, published=[])._project
+    service = YoutubeService(
+        config=ProjectConfig(project.path_file_config),
+        annotations=Annotations(index_fpath=project.path_file_index),
+        project=project,
+    )
+    fetched = []
+
+    def get_token(*, credential: str = '', drop: bool = False) -> str:
+        sleep(0.02)
+        fetched.append(drop)
+        return f't{len(fetched)}'
+
+    monkeypatch.setattr(service, '_get_token', get_token)
+
+    def run(func):
+        threads = [threading.Thread(target=func) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    # concurrent items get a token (e.g. go through a consent page) once
+    run(lambda: service._get_auth(''))
+    assert fetched == [False]
+
+    # a stale token is refreshed once
+    run(lambda: service._refresh_token('', auth='Bearer t1'))
+    assert fetched == [False, True]
+    assert service._get_auth('') == 'Bearer t2'
+
+
+def test_youtube_quota(tmp_path, monkeypatch):
+    import requests
+    from iamreader.exceptions import ServiceException, QuotaException
+    from iamreader.publishing.services import YoutubeService
+
+    project = make_service(tmp_path, published=[])._project
+    path = project.path_resources
+
+    for client_id in ('one.apps', 'two.apps'):
+        (path / f'client_secret_{client_id}.json').write_text(dumps({'web': {'client_id': client_id}}))
+
+    service = YoutubeService(
+        config=ProjectConfig(project.path_file_config),
+        annotations=Annotations(index_fpath=project.path_file_index),
+        project=project,
+    )
+    monkeypatch.setattr(service, '_get_auth', lambda credential: f'Bearer {credential}')
+
+    def respond(status: int, data: dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response._content = dumps(data).encode()
+        return response
+
+    def error(reason: str) -> requests.Response:
+        return respond(403, {'error': {'errors': [{'reason': reason}]}})
+
+    class Session:
+
+        def __init__(self):
+            self.calls = []
+            self.responses = []
+
+        def request(self, method, url, *, headers, **kwargs):
+            self.calls.append((method, headers['Authorization']))
+            return self.responses.pop(0)
+
+        def get(self, url, **kwargs):
+            return self.request('get', url, **kwargs)
+
+        def put(self, url, **kwargs):
+            return self.request('put', url, **kwargs)
+
+        def post(self, url, **kwargs):
+            return self.request('post', url, **kwargs)
+
+    session = service._session = Session()
+
+    fpath = project.path_out_audio / '01.mp3'
+    item = {'ident': '01', 'fpath': f'{fpath}', 'title': 'One', 'description': '', 'tags': [], 'dt_pub': '2026-01-01'}
+
+    # the exhausted client is told by the error reason, the upload is retried with another one
+    session.responses = [error('quotaExceeded'), respond(200, {'id': 'v1'})]
+    assert service.upload(item) == 'v1'
+    assert session.calls == [('post', 'Bearer one.apps'), ('post', 'Bearer two.apps')]
+    assert service._quota.quotas['one.apps'].exhausted
+    assert service._quota.quotas['two.apps'].used == 1600
+
+    # the video is operated on with the client it's uploaded with
+    service._contribute_item(ident_remote='v1', item=item, credential=service._uploaded_with['v1'])
+    session.responses = [respond(200, {'items': [{'id': 'v1', 'status': {'uploadStatus': 'processed'}}]})]
+    assert service.check_statuses() == 0
+    assert session.calls[-1] == ('get', 'Bearer two.apps')
+
+    # other errors are not quota ones, reserved units are refunded
+    session.responses = [error('forbidden')]
+
+    with pytest.raises(ServiceException) as e:
+        service.add_to_playlist(video='v1', playlist='p1', owner='two.apps')
+
+    assert not isinstance(e.value, QuotaException)
+    assert service._quota.quotas['two.apps'].used == 1601
+
+    # a video of an exhausted client is not operated on with another one
+    with pytest.raises(ServiceException):
+        service.add_to_playlist(video='v2', playlist='p1', owner='one.apps')
+
+
+def test_podcast_schedule(tmp_path, monkeypatch):
+    from datetime import datetime, timedelta, timezone
+    from iamreader.publishing.services import podcast
+
+    class Clock(datetime):
+        current = datetime(2026, 1, 10, 13, 0, tzinfo=timezone.utc)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.current
+
+    monkeypatch.setattr(podcast, 'datetime', Clock)
+
+    def publish() -> list:
+        service = make_service(tmp_path, cls=PodcastService)
+        for idx, fpath in enumerate(sorted(service._project.path_out_audio.iterdir())):
+            fpath.write_bytes(f'{idx}'.encode())
+        service.publish()
+        service._cfg.save()
+        return [item['ident'] for item in service._cfg.get_pub_items('podcast')]
+
+    # default template: an item a day starting the day after the first run
+    make_service(tmp_path, published=[], cls=PodcastService)
+    assert publish() == []
+
+    Clock.current += timedelta(days=1)
+    assert publish() == ['01']
+
+    Clock.current += timedelta(hours=12)
+    assert publish() == ['01']
+
+    Clock.current += timedelta(hours=12)
+    assert publish() == ['01', '02']
+    assert ProjectConfig(tmp_path / 'res' / 'iamreader.json').get_pub_schedule('podcast') == {'start': '2026-01-10'}
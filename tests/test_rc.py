@@ -0,0 +1,36 @@
+from iamreader.rc.session import SessionStats
+
+
+def test_session_stats(tmp_path):
+    fpath = tmp_path / 'sessions.log'
+    fpath.write_text(
+        '0\tsession\t2023-01-02T10:00:00\n'
+        '1000\trerec\n'
+        '11000\tlbl\t{"a": "p", "p": {}}\n'
+        '21000\tstop\n'
+        '22000\trerec\n'  # drops 10 seconds after the label
+        '32000\tlbl\t{"a": "p", "p": {}}\n'
+        '36000\tstop\n'
+        '0\tsession\t2023-01-10T10:00:00\n'
+        '0\trerec\n'
+        '3600000\tstop\n'
+    )
+    stats = SessionStats(fpath)
+
+    sessions = list(stats.iter_sessions())
+    assert len(sessions) == 2
+
+    first = sessions[0]
+    assert first.duration == 36
+    assert first.recorded == 34
+    assert first.utterances == [10, 10, 4]
+    assert first.discarded == [10]
+
+    metrics = stats.aggregate()
+    assert list(metrics) == ['2023-W01', '2023-W02']
+
+    week = metrics['2023-W01']
+    assert week['finished'] == 24
+    assert week['rerecord_ratio'] == 0.25
+    assert week['utterance_avg'] == 8
+    assert metrics['2023-W02']['finished_per_hour'] == 60
@@ -0,0 +1,98 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from iamreader.exceptions import FfmpegException
+from iamreader.ffmpeg import atomic_output
+from iamreader.utils import list_files
+from iamreader.video import generator
+from iamreader.video.generator import FONT_DEFAULT, EncodeJob, generate_video_batch
+from iamreader.video.layout import TextLayout
+
+
+def test_layout():
+    layout = TextLayout(font=FONT_DEFAULT, box=(10, 10, 300, 100), size_max=40, size_min=10)
+
+    size, lines = layout.fit('Short')
+    assert size == 40
+    assert lines == ['Short']
+
+    text = 'Part one\n\nA chapter with a rather long title to be wrapped into several lines'
+    size, lines = layout.fit(text)
+    assert size < 40
+    assert lines[:2] == ['Part one', '']
+    assert all(layout.measure(line, size) <= 300 for line in lines)
+    assert len(lines) * layout.get_line_height(size) <= 100
+
+    size, lines = layout.fit('x' * 1000)
+    assert size == 10
+    assert lines[-1].endswith('…')
+
+
+def test_video_batch(tmp_path, monkeypatch):
+    calls = []
+    validated = []
+
+    def ffmpeg(*args, progress=None):
+        calls.append(args)
+        for arg in args:
+            if arg.endswith('.avi'):
+                Path(arg).write_bytes(b'video')
+
+    monkeypatch.setattr(generator, 'ffmpeg', ffmpeg)
+    monkeypatch.setattr(generator, 'validate_duration', lambda fpath, expected: validated.append(expected))
+
+    jobs = []
+    for idx, duration in enumerate((2.5, 0)):
+        audio = tmp_path / f'{idx}.mp3'
+        audio.write_bytes(b'x')
+        jobs.append(EncodeJob(
+            fpath=tmp_path / f'{idx}.avi', image=tmp_path / f'{idx}.png', audio=audio, duration=duration))
+
+    generate_video_batch(jobs=jobs)
+
+    assert len(calls) == 1
+    args = list(calls[0])
+    assert args.count('-i') == 4
+    assert args.index(f'{tmp_path / "0.png"}') < args.index(f'{tmp_path / "1.png"}')
+    assert args[-1] == f'{tmp_path / ".1.part.avi"}'
+
+    out_first = args.index(f'{tmp_path / ".0.part.avi"}')
+    assert args[out_first - 2:out_first] == ['-t', '2.500']
+    assert args[args.index('-map'):args.index('-map') + 4] == ['-map', '0:v', '-map', '1:a']
+    assert ['-map', '2:v', '-map', '3:a'] == args[out_first + 1:out_first + 5]
+
+    assert validated == [2.5, 0]
+    assert sorted(path.name for path in tmp_path.glob('*.avi')) == ['0.avi', '1.avi']
+
+
+def test_atomic_output(tmp_path):
+    fpath = tmp_path / 'out.avi'
+
+    with atomic_output(fpath) as fpath_tmp:
+        assert fpath_tmp.suffix == '.avi'
+        fpath_tmp.write_bytes(b'done')
+
+    assert fpath.read_bytes() == b'done'
+
+    with pytest.raises(FfmpegException):
+        with atomic_output(fpath) as fpath_tmp:
+            fpath_tmp.write_bytes(b'partial')
+            raise FfmpegException('failed')
+
+    assert fpath.read_bytes() == b'done'
+    assert list_files(tmp_path, ext='avi') == [fpath]
+    assert list(tmp_path.iterdir()) == [fpath]
+
+
+def test_template_reloaded(tmp_path):
+    from PIL import Image
+
+    fpath = tmp_path / 'bg.png'
+    Image.new('RGB', (4, 4), (255, 0, 0)).save(fpath)
+    os.utime(fpath, ns=(1, 1))
+    assert generator.get_template(fpath).getpixel((0, 0)) == (255, 0, 0)
+
+    Image.new('RGB', (4, 4), (0, 0, 255)).save(fpath)
+    assert generator.get_template(fpath).getpixel((0, 0)) == (0, 0, 255)
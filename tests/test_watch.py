@@ -0,0 +1,116 @@
+import pytest
+
+from iamreader import watch as watch_module
+from iamreader.annotations import Annotations
+from iamreader.project import Project
+from iamreader.watch import get_snapshot, get_chapters, get_affected, PollingWatcher, InotifyWatcher
+
+INDEX = '''[Author] Book
+    Part one
+        01 First
+        02 Second
+    Part two
+        03 Third
+'''
+
+
+def test_affected(tmp_path):
+    project = Project(tmp_path)
+    project.path_out_audio.mkdir(parents=True)
+    project.path_file_index.write_text(INDEX)
+
+    for filename in ('01', '02', '03'):
+        (project.path_out_audio / f'{filename}.mp3').write_bytes(b'x')
+
+    def load():
+        snapshot = get_snapshot(project)
+        audio_files = [fpath for fpath in snapshot if fpath.suffix == '.mp3']
+        return snapshot, get_chapters(Annotations(index_fpath=project.path_file_index), audio_files)
+
+    def affected():
+        nonlocal snapshot, chapters
+        snapshot_new, chapters_new = load()
+        result = get_affected(
+            project=project,
+            snapshot_old=snapshot, snapshot_new=snapshot_new,
+            chapters_old=chapters, chapters_new=chapters_new,
+        )
+        snapshot, chapters = snapshot_new, chapters_new
+        return result
+
+    snapshot, chapters = load()
+    assert affected() == set()
+
+    # a title change affects all the descendants
+    project.path_file_index.write_text(INDEX.replace('Part one', 'Part 1'))
+    assert affected() == {'01', '02'}
+
+    (project.path_out_audio / '03.mp3').write_bytes(b'xx')
+    assert affected() == {'03'}
+
+    (project.path_resources / 'cover.jpg').write_bytes(b'x')
+    assert affected() == {'01', '02', '03'}
+
+
+@pytest.mark.parametrize('watcher_cls', [PollingWatcher, InotifyWatcher])
+def test_watcher(tmp_path, watcher_cls):
+    try:
+        watcher = watcher_cls([tmp_path])
+
+    except OSError:
+        pytest.skip('inotify is not available')
+
+    if isinstance(watcher, PollingWatcher):
+        watcher.interval = 0.01
+
+    try:
+        assert not watcher.wait(0.05)
+        (tmp_path / 'titles.txt').write_text('changed')
+        assert watcher.wait(1)
+        assert not watcher.wait(0.05)
+
+    finally:
+        watcher.close()
+
+
+def test_watch(tmp_path, monkeypatch):
+    project = Project(tmp_path)
+    project.path_out_audio.mkdir(parents=True)
+    project.path_file_index.write_text(INDEX)
+
+    for filename in ('01', '02', '03'):
+        (project.path_out_audio / f'{filename}.mp3').write_bytes(b'x')
+
+    class Watcher:
+
+        def wait(self, timeout=None):
+            if timeout is None:
+                # a change of the first chapter
+                (project.path_out_audio / '01.mp3').write_bytes(b'xx')
+                return True
+            return False
+
+        def close(self):
+            pass
+
+    builds = []
+
+    def build(*, filenames, **kwargs):
+        builds.append(filenames)
+
+        if len(builds) > 1:
+            raise KeyboardInterrupt
+
+        # own change, then a user change while building; an unexpected error is not to stop watching
+        (project.path_out_audio / '01.mp3').write_bytes(b'xxx')
+        project.path_file_index.write_text(INDEX.replace('Third', 'Last'))
+        raise ValueError('broken')
+
+    monkeypatch.setattr(watch_module, 'get_watcher', lambda *args, **kwargs: Watcher())
+    monkeypatch.setattr(watch_module, 'build', build)
+    monkeypatch.setattr(Project, 'validate', lambda self: None)
+
+    watch_module.watch(project=project, debounce=0)
+
+    # the first one is changed again by the watcher stub
+    assert builds == [{'01'}, {'01', '03'}]